@@ -0,0 +1,295 @@
+'''
+Compact typed binary encoding of meta, alternative to JSON for small control messages in Envelope.
+Every value starts with one byte tag. Small values are packed into the tag (like MessagePack):
+    0x80-0xBF int 0..63, 0xC0-0xDF str of 0..31 bytes, 0xE0-0xEF dict of 0..15 items, 0xF0-0xFF list of 0..15 items.
+Other values have ASCII tag followed by big-endian content:
+    N None, T True, F False, i int64, I big int (length + signed bytes), d float64,
+    s str (uint8 length), S str (uint32 length), y bytes (uint32 length),
+    l list, t tuple, m dict (uint32 count + keys and values),
+    n NumPy scalar (dtype + bytes), a NumPy array (dtype, shape + C-ordered bytes).
+Dataclasses and MetaView are encoded as dicts, as MetaEncoder does for JSON.
+'''
+import struct
+from dataclasses import is_dataclass, fields
+from typing import Any, Callable
+
+import numpy as np
+
+from .meta import MetaView
+
+_TAGGED_INT = struct.Struct(">cq")
+_TAGGED_FLOAT = struct.Struct(">cd")
+_TAGGED_SHORT = struct.Struct(">cB")
+_TAGGED_LENGTH = struct.Struct(">cI")
+_INT = struct.Struct(">q")
+_FLOAT = struct.Struct(">d")
+_SHORT = struct.Struct(">B")
+_LENGTH = struct.Struct(">I")
+_MIN_INT, _MAX_INT = -2 ** 63, 2 ** 63 - 1
+_FIXINT, _FIXSTR, _FIXMAP, _FIXLIST = 0x80, 0xC0, 0xE0, 0xF0
+
+# encoded short strings: keys and commands are repeated in every message
+_STRINGS: dict[str, bytes] = {}
+_MAX_STRINGS = 4096
+
+
+def _encode_none(value: None, out: bytearray):
+    out += b'N'
+
+
+def _encode_bool(value: bool, out: bytearray):
+    out += b'T' if value else b'F'
+
+
+def _encode_int(value: int, out: bytearray):
+    if 0 <= value < _FIXSTR - _FIXINT:
+        out.append(_FIXINT + value)
+    elif _MIN_INT <= value <= _MAX_INT:
+        out += _TAGGED_INT.pack(b'i', value)
+    else:
+        data = value.to_bytes(value.bit_length() // 8 + 1, "big", signed=True)
+        out += _TAGGED_LENGTH.pack(b'I', len(data))
+        out += data
+
+
+def _encode_float(value: float, out: bytearray):
+    out += _TAGGED_FLOAT.pack(b'd', value)
+
+
+def _encode_str(value: str, out: bytearray):
+    encoded = _STRINGS.get(value)
+    if encoded is not None:
+        out += encoded
+        return
+    data = value.encode("utf8")
+    if len(data) < _FIXMAP - _FIXSTR:
+        encoded = bytes((_FIXSTR + len(data),)) + data
+        if len(_STRINGS) < _MAX_STRINGS:
+            _STRINGS[value] = encoded
+        out += encoded
+        return
+    if len(data) < 256:
+        out += _TAGGED_SHORT.pack(b's', len(data))
+    else:
+        out += _TAGGED_LENGTH.pack(b'S', len(data))
+    out += data
+
+
+def _encode_bytes(value: bytes, out: bytearray):
+    out += _TAGGED_LENGTH.pack(b'y', len(value))
+    out += value
+
+
+def _encode_list(value: list, out: bytearray):
+    if len(value) < 0x100 - _FIXLIST:
+        out.append(_FIXLIST + len(value))
+    else:
+        out += _TAGGED_LENGTH.pack(b'l', len(value))
+    encoders = _ENCODERS
+    for item in value:
+        encoders.get(type(item), _encode_other)(item, out)
+
+
+def _encode_tuple(value: tuple, out: bytearray):
+    out += _TAGGED_LENGTH.pack(b't', len(value))
+    encoders = _ENCODERS
+    for item in value:
+        encoders.get(type(item), _encode_other)(item, out)
+
+
+def _encode_dict(value: dict, out: bytearray):
+    if len(value) < _FIXLIST - _FIXMAP:
+        out.append(_FIXMAP + len(value))
+    else:
+        out += _TAGGED_LENGTH.pack(b'm', len(value))
+    encoders = _ENCODERS
+    for key, item in value.items():
+        encoders.get(type(key), _encode_other)(key, out)
+        encoders.get(type(item), _encode_other)(item, out)
+
+
+def _encode_dtype(dtype: np.dtype, out: bytearray):
+    if dtype.hasobject:
+        raise TypeError(f"Array of {dtype} is not serializable")
+    name = dtype.str.encode("ascii")
+    out += _SHORT.pack(len(name))
+    out += name
+
+
+def _encode_numpy(value: Any, out: bytearray):
+    if isinstance(value, np.generic):
+        out += b'n'
+        _encode_dtype(value.dtype, out)
+        out += value.tobytes()
+        return
+    out += b'a'
+    _encode_dtype(value.dtype, out)
+    out += _SHORT.pack(value.ndim)
+    for size in value.shape:
+        out += _INT.pack(size)
+    out += np.ascontiguousarray(value).tobytes()
+
+
+_ENCODERS: dict[type, Callable[[Any, bytearray], None]] = {
+    type(None): _encode_none, bool: _encode_bool, int: _encode_int, float: _encode_float,
+    str: _encode_str, bytes: _encode_bytes, bytearray: _encode_bytes,
+    list: _encode_list, tuple: _encode_tuple, dict: _encode_dict, np.ndarray: _encode_numpy
+}
+
+
+def _encode_other(value: Any, out: bytearray):
+    if isinstance(value, (np.generic, np.ndarray)):
+        _encode_numpy(value, out)
+    elif isinstance(value, MetaView):
+        _encode_dict(dict(value), out)
+    elif is_dataclass(value) and not isinstance(value, type):
+        _encode_dict({field.name: getattr(value, field.name) for field in fields(value)}, out)
+    elif isinstance(value, memoryview):
+        _encode_bytes(value.tobytes(), out)
+    else: # subclasses of builtin types
+        for base, encoder in _ENCODERS.items():
+            if isinstance(value, base):
+                encoder(value, out)
+                return
+        raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def dumps(meta: Any) -> bytearray:
+    out = bytearray()
+    _ENCODERS.get(type(meta), _encode_other)(meta, out)
+    return out
+
+
+# decoders by tag return value and position after it
+
+def _decode_length(buffer: memoryview, position: int) -> tuple[int, int]:
+    return _LENGTH.unpack_from(buffer, position)[0], position + 4
+
+
+def _decode_int(buffer: memoryview, position: int) -> tuple[Any, int]:
+    return _INT.unpack_from(buffer, position)[0], position + 8
+
+
+def _decode_big_int(buffer: memoryview, position: int) -> tuple[Any, int]:
+    length, position = _decode_length(buffer, position)
+    return int.from_bytes(buffer[position:position + length], "big", signed=True), position + length
+
+
+def _decode_float(buffer: memoryview, position: int) -> tuple[Any, int]:
+    return _FLOAT.unpack_from(buffer, position)[0], position + 8
+
+
+def _decode_short_str(buffer: memoryview, position: int) -> tuple[Any, int]:
+    end = position + 1 + buffer[position]
+    return str(buffer[position + 1:end], "utf8"), end
+
+
+def _decode_str(buffer: memoryview, position: int) -> tuple[Any, int]:
+    length, position = _decode_length(buffer, position)
+    return str(buffer[position:position + length], "utf8"), position + length
+
+
+def _decode_bytes(buffer: memoryview, position: int) -> tuple[Any, int]:
+    length, position = _decode_length(buffer, position)
+    return buffer[position:position + length].tobytes(), position + length
+
+
+def _decode_items(buffer: memoryview, position: int, length: int) -> tuple[Any, int]:
+    items = []
+    for _ in range(length):
+        item, position = _decode(buffer, position)
+        items.append(item)
+    return items, position
+
+
+def _decode_list(buffer: memoryview, position: int) -> tuple[Any, int]:
+    length, position = _decode_length(buffer, position)
+    return _decode_items(buffer, position, length)
+
+
+def _decode_tuple(buffer: memoryview, position: int) -> tuple[Any, int]:
+    items, position = _decode_list(buffer, position)
+    return tuple(items), position
+
+
+def _decode_pairs(buffer: memoryview, position: int, length: int) -> tuple[Any, int]:
+    items = {}
+    for _ in range(length):
+        tag = buffer[position]
+        if _FIXSTR <= tag < _FIXMAP: # short string key is decoded inline
+            end = position + 1 + tag - _FIXSTR
+            key = str(buffer[position + 1:end], "utf8")
+            position = end
+        else:
+            key, position = _decode(buffer, position)
+        items[key], position = _decode(buffer, position)
+    return items, position
+
+
+def _decode_dict(buffer: memoryview, position: int) -> tuple[Any, int]:
+    length, position = _decode_length(buffer, position)
+    return _decode_pairs(buffer, position, length)
+
+
+def _decode_dtype(buffer: memoryview, position: int) -> tuple[np.dtype, int]:
+    end = position + 1 + buffer[position]
+    dtype = np.dtype(str(buffer[position + 1:end], "ascii"))
+    if dtype.hasobject:
+        raise ValueError(f"Array of {dtype} can't be decoded")
+    return dtype, end
+
+
+def _decode_scalar(buffer: memoryview, position: int) -> tuple[Any, int]:
+    dtype, position = _decode_dtype(buffer, position)
+    end = position + dtype.itemsize
+    return np.frombuffer(buffer[position:end], dtype)[0], end
+
+
+def _decode_array(buffer: memoryview, position: int) -> tuple[Any, int]:
+    dtype, position = _decode_dtype(buffer, position)
+    ndim = buffer[position]
+    shape = struct.unpack_from(f">{ndim}q", buffer, position + 1)
+    position += 1 + 8 * ndim
+    end = position + dtype.itemsize * int(np.prod(shape))
+    if end > len(buffer):
+        raise ValueError("Meta is truncated")
+    return np.frombuffer(buffer[position:end], dtype).reshape(shape).copy(), end
+
+
+_DECODERS: dict[int, Callable[[memoryview, int], tuple[Any, int]]] = {
+    ord('N'): lambda buffer, position: (None, position),
+    ord('T'): lambda buffer, position: (True, position),
+    ord('F'): lambda buffer, position: (False, position),
+    ord('i'): _decode_int, ord('I'): _decode_big_int, ord('d'): _decode_float,
+    ord('s'): _decode_short_str, ord('S'): _decode_str, ord('y'): _decode_bytes,
+    ord('l'): _decode_list, ord('t'): _decode_tuple, ord('m'): _decode_dict,
+    ord('n'): _decode_scalar, ord('a'): _decode_array
+}
+
+
+def _decode(buffer: memoryview, position: int) -> tuple[Any, int]:
+    tag = buffer[position]
+    if tag >= _FIXINT:
+        if tag < _FIXSTR:
+            return tag - _FIXINT, position + 1
+        if tag < _FIXMAP:
+            end = position + 1 + tag - _FIXSTR
+            return str(buffer[position + 1:end], "utf8"), end
+        if tag < _FIXLIST:
+            return _decode_pairs(buffer, position + 1, tag - _FIXMAP)
+        return _decode_items(buffer, position + 1, tag - _FIXLIST)
+    decoder = _DECODERS.get(tag)
+    if decoder is None:
+        raise ValueError(f"Unknown tag {bytes(buffer[position:position + 1])!r} at {position}")
+    return decoder(buffer, position + 1)
+
+
+def loads(buffer: Any) -> Any:
+    buffer = memoryview(buffer).cast("B")
+    try:
+        meta, position = _decode(buffer, 0)
+    except (IndexError, TypeError, struct.error, UnicodeDecodeError) as e: # unknown dtype, unhashable key
+        raise ValueError(f"Meta is truncated or malformed: {e}") from e
+    if position != len(buffer):
+        raise ValueError(f"Meta is truncated or malformed: {len(buffer) - position} bytes after the end")
+    return meta
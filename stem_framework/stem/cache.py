@@ -0,0 +1,284 @@
+'''
+Cache of task results.
+Result of the node is identified by key: hash of the workspace TaskPath of the task, its code fingerprint,
+canonical hash of the meta slice received by the node and keys of the results of its dependencies.
+After editing of the task only this task and tasks downstream of it get new keys.
+So the key of the root is known before any computation and reruns of unchanged pipeline compute nothing.
+'''
+import copy
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from itertools import chain
+from pathlib import Path
+from typing import Any, Optional, Iterator, Union
+
+import numpy as np
+
+from .envelope import Envelope, AUTO
+from .meta import Meta, meta_fingerprint
+
+logger = logging.getLogger(__name__)
+
+MISSING = object() # returned by get if key is absent in the cache
+
+
+# return None if the task can't be identified in own workspace, task or meta has values without fingerprint
+# or any dependency has no key
+def node_key(task_path: Optional[str], fingerprint: Optional[str], meta: Meta,
+             dependency_keys: list[Optional[str]]) -> Optional[str]:
+    if task_path is None or fingerprint is None or None in dependency_keys:
+        return None
+    try:
+        meta_part = meta_fingerprint(meta)
+    except TypeError as e:
+        logger.debug("Result of %s isn't cached: %s", task_path, e)
+        return None
+    digest = hashlib.sha256()
+    for part in [task_path, fingerprint, meta_part, *dependency_keys]:
+        digest.update(part.encode("utf8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResultCache(ABC):
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        pass
+
+    # return value which should be used instead of the stored result (materialized iterator)
+    @abstractmethod
+    def put(self, key: str, value: Any) -> Any:
+        pass
+
+
+class DiskCache(ResultCache):
+    '''
+    Each result is stored in own Envelope file in the directory:
+    binary values and arrays as data of envelope, other values are pickled.
+    Large files (> Envelope._MAX_SIZE) are read through memory mapping.
+    Least recently used files are removed if the total size exceeds max_size.
+    compression of envelopes (name of registered Compression or AUTO) reduces size of files of compressible results.
+    '''
+    SUFFIX = ".envelope"
+
+    def __init__(self, path: Union[str, Path], max_size: int = 1024*1024*1024, compression: Optional[str] = None):
+        super().__init__()
+        self.compression = compression
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        files = sorted(self.path.glob("*" + DiskCache.SUFFIX), key=lambda file: file.stat().st_mtime)
+        for file in files:
+            self._entries[file.name[:-len(DiskCache.SUFFIX)]] = file.stat().st_size
+
+    @property
+    def size(self) -> int:
+        return sum(self._entries.values())
+
+    def _file(self, key: str) -> Path:
+        return self.path / (key + DiskCache.SUFFIX)
+
+    def get(self, key: str) -> Any:
+        if key not in self._entries:
+            self.misses += 1
+            return MISSING
+        file = self._file(key)
+        try:
+            with open(file, "rb") as input:
+                envelope = Envelope.read(input)
+            os.utime(file)
+        except FileNotFoundError:
+            del self._entries[key]
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._decode(envelope)
+
+    def put(self, key: str, value: Any) -> Any:
+        if isinstance(value, Iterator):
+            value = list(value)
+        try:
+            envelope = self._encode(value, self.compression)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning("Result isn't cached: %s", e)
+            return value
+        size = memoryview(envelope.data).nbytes
+        if size > self.max_size:
+            return value
+        if envelope.compression not in (None, AUTO) and size > Envelope._MAX_SIZE:
+            envelope.compression = None # compressed payload is limited by the size of decompressed data
+
+        output = tempfile.NamedTemporaryFile(dir=self.path, delete=False)
+        try:
+            with output:
+                envelope.write_to(output)
+            os.replace(output.name, self._file(key))
+        except BaseException as e:
+            Path(output.name).unlink(missing_ok=True)
+            if not isinstance(e, OSError):
+                raise
+            logger.warning("Result isn't cached: %s", e)
+            return value
+        self._entries[key] = self._file(key).stat().st_size
+        self._entries.move_to_end(key)
+        self._evict()
+        return value
+
+    def _evict(self):
+        size = self.size
+        while size > self.max_size and self._entries:
+            key, file_size = self._entries.popitem(last=False)
+            self._file(key).unlink(missing_ok=True)
+            size -= file_size
+
+    def clear(self):
+        for key in self._entries:
+            self._file(key).unlink(missing_ok=True)
+        self._entries.clear()
+
+    @staticmethod
+    def _encode(value: Any, compression: Optional[str] = None) -> Envelope:
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return Envelope(dict(format="bytes"), value, compression)
+        if isinstance(value, np.ndarray) and not value.dtype.hasobject:
+            value = np.ascontiguousarray(value)
+            return Envelope(dict(format="ndarray", dtype=value.dtype.str, shape=value.shape), value, compression)
+        return Envelope(dict(format="pickle"), pickle.dumps(value, pickle.HIGHEST_PROTOCOL), compression)
+
+    # decompressed data is bytearray: results are the same as read without compression (bytes, read-only arrays)
+    @staticmethod
+    def _decode(envelope: Envelope) -> Any:
+        meta = envelope.meta
+        if meta["format"] == "bytes":
+            return bytes(envelope.data) if isinstance(envelope.data, bytearray) else envelope.data
+        if meta["format"] == "ndarray":
+            array = np.frombuffer(envelope.data, meta["dtype"]).reshape(meta["shape"])
+            array.flags.writeable = False
+            return array
+        return pickle.loads(envelope.data)
+
+
+# approximate size of value in bytes: buffers and arrays by their data, containers recursively
+def sizeof(value: Any) -> int:
+    if isinstance(value, np.ndarray):
+        return max(sys.getsizeof(value), value.nbytes) # views don't own data
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class _Replay:
+    # iterator result stored as tuple, every get returns new iterator over it
+    def __init__(self, values: tuple):
+        self.values = values
+
+
+_IMMUTABLE = (type(None), bool, int, float, complex, str, bytes, np.generic)
+
+
+# value which the producer can't change, so it is stored without copying
+def _is_immutable(value: Any) -> bool:
+    if isinstance(value, _IMMUTABLE):
+        return True
+    if isinstance(value, np.ndarray):
+        return not value.flags.writeable and not value.dtype.hasobject
+    if isinstance(value, (tuple, frozenset)):
+        return all(_is_immutable(item) for item in value)
+    if isinstance(value, _Replay):
+        return _is_immutable(value.values)
+    return False
+
+
+class MemoryCache(ResultCache):
+    '''
+    In-process cache with memory budget max_bytes, least recently used results are evicted.
+    Iterator results are materialized and replayed by new iterator on each get,
+    iterator larger than the budget isn't cached and is returned as it is consumed.
+    Arrays are stored as read-only copies, other mutable results (lists, dicts, objects) as deep copies,
+    so changes of the result by the producer aren't seen in the cache. put returns the original result.
+    get returns the stored value without copying: cached results are shared by all executions
+    and must not be changed by tasks (arrays can't be changed).
+    '''
+
+    def __init__(self, max_bytes: int = 256*1024*1024):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict() # value, size
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+        value = entry[0]
+        return iter(value.values) if isinstance(value, _Replay) else value
+
+    # items of the iterator until they exceed the budget: (replay, size) or (None, iterator over all items)
+    def _materialize(self, iterator: Iterator) -> tuple[Optional[_Replay], Any]:
+        items, size = [], 0
+        for item in iterator:
+            items.append(item)
+            size += sizeof(item)
+            if size > self.max_bytes:
+                return None, chain(items, iterator)
+        return _Replay(tuple(items)), size
+
+    def put(self, key: str, value: Any) -> Any:
+        if isinstance(value, Iterator):
+            replay, size = self._materialize(value)
+            if replay is None:
+                return size
+            value = replay
+        else:
+            size = sizeof(value)
+        if size > self.max_bytes:
+            return value
+        stored = value
+        if isinstance(value, np.ndarray) and not value.dtype.hasobject:
+            stored = value.copy()
+            stored.flags.writeable = False
+        elif not _is_immutable(stored):
+            try:
+                stored = copy.deepcopy(stored)
+            except Exception as e: # e.g. objects with locks or open files
+                logger.warning("Result isn't cached: %s", e)
+                return iter(value.values) if isinstance(value, _Replay) else value
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            self._entries[key] = (stored, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self.size -= self._entries.popitem(last=False)[1][1]
+        return iter(value.values) if isinstance(value, _Replay) else value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
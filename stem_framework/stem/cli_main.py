@@ -1,75 +1,113 @@
 import argparse
 import json
+from importlib import import_module
+from importlib.util import spec_from_file_location, module_from_spec
 from pathlib import Path
 import sys
+from typing import Optional
 
-from stem.task_master import TaskMaster, TaskStatus
+from stem.plugins import discover, load_manifest, entry_point_plugins
+from stem.snapshot import SnapshotCache
 from stem.workspace import IWorkspace, TaskPath
-    
+
+
+#Workspace is given by JSON manifest of plugins, path to python file or name of module for module workspace.
+#Without workspace plugins registered by entry points are used. Modules of plugins are imported lazily.
+def load_workspace(workspace: Optional[str]) -> IWorkspace:
+    if workspace is None:
+        return discover()
+    path = Path(workspace)
+    if path.suffix == ".json":
+        return load_manifest(path)
+    if path.suffix == ".py":
+        spec = spec_from_file_location(path.stem, path)
+        module = module_from_spec(spec)
+        sys.modules[path.stem] = module
+        spec.loader.exec_module(module)
+        return IWorkspace.module_workspace(module)
+    return IWorkspace.module_workspace(import_module(workspace))
+
+
+# key of the cached structure snapshot and files of the workspace argument
+def snapshot_key(workspace: Optional[str]) -> tuple[str, tuple[str, ...]]:
+    if workspace is None:
+        plugins = sorted(f"{plugin.name}={plugin.module}:{plugin.attribute}{plugin.task_names or ''}"
+                         for plugin in entry_point_plugins())
+        return "entry_points:" + ",".join(plugins), ()
+    path = Path(workspace)
+    if path.suffix in (".json", ".py"):
+        return str(path.resolve()), (str(path.resolve()),)
+    return f"{Path.cwd()}:{workspace}", ()
+
+
+#Structure is printed from the snapshot cached until source files of the workspace are changed
 def print_structure(args: argparse.Namespace):
 
-    def pretty(d, indent=0):
-        for key, value in d.items():
-            print('\t' * indent + str(key))
-            if isinstance(value, dict):
-                pretty(value, indent + 1)
-            else:
-                print('\t' * (indent + 1) + str(value))
-                
-    pretty(workspace.structure()) # made it wrong
-
-def run_task(workspace: IWorkspace, args: argparse.Namespace): 
-    try:
-        task = workspace.find_task(TaskPath(args.TASKPATH))
-    except:
-        raise ValueError("smth with task")
-        
+    def pretty(structure, indent=0):
+        print('\t' * indent + str(structure["name"]))
+        for task in structure["tasks"]:
+            print('\t' * (indent + 1) + str(task))
+        for sub_structure in structure["workspaces"]:
+            pretty(sub_structure, indent + 1)
+
+    if args.no_cache:
+        structure = load_workspace(args.workspace).structure()
+    else:
+        key, sources = snapshot_key(args.workspace)
+        structure = SnapshotCache().snapshot(key, lambda: load_workspace(args.workspace), sources).structure
+    pretty(structure)
+
+def run_task(args: argparse.Namespace):
+    from stem.task_master import TaskMaster, TaskStatus # runners aren't needed for structure
+
+    workspace = load_workspace(args.workspace)
+    task = workspace.find_task(TaskPath(args.task_path))
+    if task is None:
+        raise ValueError(f"Task {args.task_path} isn't found")
+
     if args.meta is None:
-        info = {}
+        meta = {}
     else:
         try:
-            info = json.loads(args.meta)
+            meta = json.loads(args.meta)
         except json.JSONDecodeError:
             with open(args.meta) as f:
-                info = json.load(f)
-        except:
-            raise ValueError("smth with meta")
-    
-    try:
-        task_results = TaskMaster().execute(meta, task, workspace)
-    except:
-        raise ValueError("smth with TaskMaster")
-    
+                meta = json.load(f)
+
+    task_results = TaskMaster().execute(meta, task, workspace)
+
     if task_results.status == TaskStatus.CONTAINS_DATA:
         print(task_results.lazy_data())
     else:
-        print(task_results)   
-    
+        print(task_results)
+
 
 def create_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description='Run task in workspace')
-    parser.add_argument("-w", "--workspace", metavar="WORKSPACE", required=True,
-                        help="Add path to workspace or file for module workspace")
-    
-    subparser = parser.add_subparsers(metavar="command", required=True)    
+    parser.add_argument("-w", "--workspace", metavar="WORKSPACE", default=None,
+                        help="Add path to workspace or file for module workspace, "
+                             "JSON manifest of plugins (plugins from entry points by default)")
+
+    subparser = parser.add_subparsers(metavar="command", required=True)
     parser_str = subparser.add_parser("structure", help="Print workspace structure")
     parser_str.set_defaults(func=print_structure)
+    parser_str.add_argument("--no-cache", action="store_true", help="Don't use cached structure of the workspace")
 
     parser_run = subparser.add_parser("run", help="Run task")
     parser_run.set_defaults(func=run_task)
-    parser_run.add_argument("sds", metavar='TASKPATH')
-    
+    parser_run.add_argument("task_path", metavar='TASKPATH')
+
     parser_run.add_argument("-m", "--meta", metavar="META", required=True,
                             help="Metadata for task or path to file with metadata in JSON format")
-    
+
 
     return parser
-        
 
-def stem_cli_main():
+
+def stem_cli_main(argv: Optional[list[str]] = None):
     parser = create_parser()
-    args = parser.parse_args()
-    args.func(args)        
-        
+    args = parser.parse_args(argv)
+    args.func(args)
+
 if __name__ == "__main__":
-    stem_cli_main()
\ No newline at end of file
+    stem_cli_main()
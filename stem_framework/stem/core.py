@@ -1,4 +1,4 @@
-from typing import Optional , Protocol
+from typing import Optional , Protocol, Any
 
 import re
 
@@ -1,10 +1,16 @@
 import array
+import bz2
+import json
+import lzma
 import mmap
+import struct
+import zlib
 from asyncio import StreamReader, StreamWriter
 from io import RawIOBase, BufferedReader
 from json import JSONEncoder
-from typing import Optional, Union, Any
-from .meta import Meta
+from typing import Optional, Union, Any, AsyncIterator, Callable, Iterable, Iterator
+from . import binary_meta
+from .meta import Meta, MetaView
 
 from dataclasses import is_dataclass, asdict
 
@@ -14,83 +20,362 @@ Binary = Union[bytes, bytearray, memoryview, array.array, mmap.mmap]
 class MetaEncoder(JSONEncoder):
             
     def default(self, obj: Meta) -> Any:
+        if isinstance(obj, MetaView):
+            return dict(obj)
         if is_dataclass(obj):
             return asdict(obj)
         else:
             return json.JSONEncoder.default(self, obj)          
 
-# 2 format for transferring data via byte stream
+_JSON_ENCODER = MetaEncoder()
+
+# encodings of meta by name: code in the header, encode and decode functions
+_META_TYPES: dict[str, tuple[bytes, Callable[[Meta], Binary], Callable[[Binary], Any]]] = {
+    "json": (b'.', lambda meta: _JSON_ENCODER.encode(meta).encode('utf8'), lambda buffer: json.loads(bytes(buffer))),
+    "binary": (b'b', binary_meta.dumps, binary_meta.loads)
+}
+_META_CODES = {code: name for name, (code, _, _) in _META_TYPES.items()}
+
+class Compression:
+    '''
+    Codec of the payload registered by name, its one-byte code is written to the header of envelope.
+    compressor and decompressor are factories of incremental objects with interface
+    of zlib.compressobj (compress, flush) and zlib.decompressobj (decompress with max_length, eof).
+    Decompressed data is limited by max_size: output of every chunk is bounded by max_length,
+    so compressed payload can't expand in memory beyond the limit.
+    '''
+
+    def __init__(self, name: str, code: bytes, compressor: Callable[[], Any], decompressor: Callable[[], Any]):
+        self.name = name
+        self.code = code
+        self.compressor = compressor
+        self.decompressor = decompressor
+
+    def compress(self, data: memoryview, chunk_size: int) -> bytes:
+        compressor = self.compressor()
+        chunks = [compressor.compress(data[start:start + chunk_size]) for start in range(0, data.nbytes, chunk_size)]
+        chunks.append(compressor.flush())
+        return b"".join(chunks)
+
+    def decompress(self, chunks: Iterable[Binary], max_size: int) -> Iterator[bytes]:
+        decompressor = self.decompressor()
+        for chunk in chunks:
+            output = _decompress_chunk(decompressor, chunk, max_size)
+            max_size -= len(output)
+            yield output
+        _check_eof(decompressor)
+
+    async def decompress_async(self, chunks: AsyncIterator[Binary], max_size: int) -> AsyncIterator[bytes]:
+        decompressor = self.decompressor()
+        async for chunk in chunks:
+            output = _decompress_chunk(decompressor, chunk, max_size)
+            max_size -= len(output)
+            yield output
+        _check_eof(decompressor)
+
+    def __repr__(self):
+        return f"Compression({self.name})"
+
+
+# output shorter than max_length means that the whole chunk is decompressed
+def _decompress_chunk(decompressor: Any, chunk: Binary, max_size: int) -> bytes:
+    output = decompressor.decompress(chunk, max_size + 1)
+    if len(output) > max_size:
+        raise ValueError("Decompressed payload is too large")
+    return output
+
+
+def _check_eof(decompressor: Any):
+    if not decompressor.eof:
+        raise ValueError("Compressed payload is truncated")
+
+
+AUTO = "auto" # compression of Envelope: zlib if the payload is large and compressible
+_NO_COMPRESSION = b'.'
+_COMPRESSIONS: dict[str, Compression] = {}
+_CODES: dict[bytes, Compression] = {}
+
+
+def register_compression(compression: Compression):
+    if len(compression.code) != 1 or compression.code == _NO_COMPRESSION:
+        raise ValueError(f"Code of compression must be one byte except {_NO_COMPRESSION!r}")
+    registered = _CODES.get(compression.code)
+    if registered is not None and registered.name != compression.name:
+        raise ValueError(f"Code {compression.code!r} is already used by {registered.name}")
+    _COMPRESSIONS[compression.name] = compression
+    _CODES[compression.code] = compression
+
+
+def unregister_compression(name: str):
+    compression = get_compression(name)
+    del _COMPRESSIONS[name]
+    del _CODES[compression.code]
+
+
+def get_compression(name: str) -> Compression:
+    try:
+        return _COMPRESSIONS[name]
+    except KeyError:
+        raise ValueError(f"Unknown compression {name}, registered: {', '.join(_COMPRESSIONS)}") from None
+
+
+register_compression(Compression("zlib", b'z', zlib.compressobj, zlib.decompressobj))
+register_compression(Compression("lzma", b'x', lzma.LZMACompressor, lzma.LZMADecompressor))
+register_compression(Compression("bz2", b'b', bz2.BZ2Compressor, bz2.BZ2Decompressor))
+
+
+class AsyncPayload:
+    '''
+    Data of the envelope transferred by chunks: async iterator over decompressed chunks,
+    nbytes is the size of the payload in the stream (compressed by compression).
+    Payload read by Envelope.async_read(stream=True) must be consumed before the next read from the stream,
+    it can be forwarded by async_write_to of another envelope with constant memory and without recompression.
+    '''
+
+    def __init__(self, chunks: AsyncIterator[Binary], nbytes: int, compression: Optional[Compression] = None):
+        self._chunks = chunks
+        self.nbytes = nbytes
+        self.compression = compression
+
+    # chunks as they are transferred
+    def raw(self) -> AsyncIterator[Binary]:
+        return self._chunks.__aiter__()
+
+    def __aiter__(self) -> AsyncIterator[Binary]:
+        if self.compression is None:
+            return self.raw()
+        return self.compression.decompress_async(self.raw(), Envelope._MAX_SIZE)
+
+    async def read(self) -> bytearray:
+        if self.compression is not None:
+            buffer = bytearray()
+            async for chunk in self:
+                buffer += chunk
+            return buffer
+        buffer = bytearray(self.nbytes)
+        position = 0
+        async for chunk in self:
+            size = memoryview(chunk).nbytes
+            buffer[position:position + size] = chunk
+            position += size
+        return buffer
+
+
+# 2 format for transferring data via byte stream: "#~" + type (4 bytes) + meta type (1 byte) + compression (1 byte)
+# + meta length + data length (4 bytes big-endian) + meta + data (compressed) + "~#"
 class Envelope:
-    
+    '''
+    meta_type is encoding of meta: "json" or "binary" (compact typed encoding of binary_meta).
+    JSON is the default: binary is faster for small flat control messages,
+    but gives no gain on nested messages, where decoding of every value in Python dominates.
+    compression is name of registered Compression of the data, AUTO or None.
+    AUTO compresses by zlib payloads larger than _AUTO_MIN_SIZE if their sample is compressed well.
+    Compressed payload is decompressed in memory, so its size is limited by _MAX_SIZE,
+    larger payloads aren't compressed by AUTO and are mapped by read from file.
+    Lengths of meta and data (as written) are 4-byte fields of the header, so each is limited by _MAX_LENGTH.
+    '''
+
     _MAX_SIZE = 128*1024*1024 # 128 Mb
+    _HEADER = struct.Struct(">2s4sccII")
+    _MAX_LENGTH = 2**32 - 1
+    _BEGIN = b'#~'
+    _END = b'~#'
+    _TYPE = b'DF02'
+    _CHUNK_SIZE = 1024*1024 # 1 Mb, async transfer and compression
+    _AUTO_MIN_SIZE = 4*1024
+    _AUTO_SAMPLE = 64*1024
+    _AUTO_RATIO = 0.9
 
-    def __init__(self, meta: Meta, data : Optional[Binary] = None):
+    def __init__(self, meta: Meta, data : Union[Binary, AsyncPayload, None] = None, compression: Optional[str] = None,
+                 meta_type: str = "json"):
+        if compression is not None and compression != AUTO:
+            get_compression(compression)
+        if meta_type not in _META_TYPES:
+            raise ValueError(f"Unknown meta type {meta_type}, expected one of {', '.join(_META_TYPES)}")
         self.meta = meta
         self.data = data
+        self.compression = compression
+        self.meta_type = meta_type
 
     def __str__(self):
         return str(self.meta)
-    
+
+    @staticmethod
+    def _unpack_header(header: Binary) -> tuple[str, Optional[Compression], int, int]:
+        if len(header) < Envelope._HEADER.size:
+            raise ValueError("Envelope is truncated")
+        begin, _type, meta_code, code, meta_length, data_length = Envelope._HEADER.unpack_from(header)
+        if begin != Envelope._BEGIN:
+            raise ValueError(f"Envelope must begin with {Envelope._BEGIN!r}, not {begin!r}")
+        if meta_code not in _META_CODES:
+            raise ValueError(f"Unknown meta type code {meta_code!r}")
+        if code == _NO_COMPRESSION:
+            return _META_CODES[meta_code], None, meta_length, data_length
+        if code not in _CODES:
+            raise ValueError(f"Unknown compression code {code!r}")
+        return _META_CODES[meta_code], _CODES[code], meta_length, data_length
+
+    # header is packed before anything is written, so too large envelope isn't written partially
+    def _header(self, meta: Binary, nbytes: int, compression: Optional[Compression]) -> tuple:
+        for part, length in (("Meta", len(meta)), ("Data", nbytes)):
+            if length > Envelope._MAX_LENGTH:
+                raise ValueError(f"{part} of envelope is {length} bytes, "
+                                 f"must not be larger than {Envelope._MAX_LENGTH} bytes")
+        code = _NO_COMPRESSION if compression is None else compression.code
+        return Envelope._BEGIN, Envelope._TYPE, _META_TYPES[self.meta_type][0], code, len(meta), nbytes
+
+    def _encode_meta(self) -> Binary:
+        return _META_TYPES[self.meta_type][1](self.meta)
+
+    @staticmethod
+    def _decode_meta(meta_type: str, buffer: Binary) -> Meta:
+        return _META_TYPES[meta_type][2](buffer)
+
+    @staticmethod
+    def _received(meta: Meta, data: Any, meta_type: str, compression: Optional[Compression]) -> "Envelope":
+        return Envelope(meta, data, None if compression is None else compression.name, meta_type)
+
+    def _compression(self, data: memoryview) -> Optional[Compression]:
+        if self.compression != AUTO:
+            if self.compression is not None and data.nbytes > Envelope._MAX_SIZE:
+                raise ValueError(f"Compressed payload must not be larger than {Envelope._MAX_SIZE} bytes")
+            return None if self.compression is None else get_compression(self.compression)
+        if data.nbytes < Envelope._AUTO_MIN_SIZE or data.nbytes > Envelope._MAX_SIZE:
+            return None
+        sample = data[:Envelope._AUTO_SAMPLE]
+        if len(zlib.compress(sample, 1)) > Envelope._AUTO_RATIO * sample.nbytes:
+            return None
+        return get_compression("zlib")
+
+    # meta, data as it is written (compressed) and its compression
+    def _pack(self) -> tuple[Binary, memoryview, Optional[Compression]]:
+        meta = self._encode_meta()
+        data = memoryview(b'' if self.data is None else self.data).cast("B")
+        compression = self._compression(data)
+        if compression is not None:
+            data = memoryview(compression.compress(data, Envelope._CHUNK_SIZE))
+        return meta, data, compression
+
+    @staticmethod
+    def _read_chunks(input: BufferedReader, length: int) -> Iterator[bytes]:
+        while length > 0:
+            chunk = input.read(min(length, Envelope._CHUNK_SIZE))
+            if not chunk:
+                raise ValueError("Envelope is truncated")
+            length -= len(chunk)
+            yield chunk
+
+    @staticmethod
+    def _decompress(compression: Compression, chunks: Iterable[Binary]) -> bytearray:
+        data = bytearray()
+        for chunk in compression.decompress(chunks, Envelope._MAX_SIZE):
+            data += chunk
+        return data
+
     # i (3 p.) create Envelope instance from stream.
     @staticmethod
     def read(input: BufferedReader) -> "Envelope":
-        _beginning = input.read(2) #beginning of binary string
-        assert b'#~' == _beginning        
-        _type  = input.read(4) #envelope format type and version. For default DF02 is used
-        #assert b'DF02'  == _type #other envelope types could use the same format.        
-        _metaType = input.read(2) #  metadata encoding type
-        
-        metaLength = int.from_bytes(input.read(4)) # metadata length in bytes 
-        dataLength = int.from_bytes(input.read(4)) # the data length in bytes
-        
-        meta = json.loads(input.read(metaLength))
-        
-        _end = input.read(2) # ending of binary string
-        assert b'#~'   == _end
-         
+        meta_type, compression, meta_length, data_length = Envelope._unpack_header(input.read(Envelope._HEADER.size))
+        meta = Envelope._decode_meta(meta_type, input.read(meta_length))
+
         #If data size less than Envelope._MAX_SIZE store data in the memory,
         #otherwise on disk using memory mapping
-        if dataLength >= Envelope._MAX_SIZE:
-            data = mmap.mmap(input.fileno(), dataLength, offset = input.tell())
+        if compression is not None:
+            data = Envelope._decompress(compression, Envelope._read_chunks(input, data_length))
+        elif data_length >= Envelope._MAX_SIZE:
+            # offset of mapping must be multiple of ALLOCATIONGRANULARITY
+            offset = input.tell()
+            start = offset - offset % mmap.ALLOCATIONGRANULARITY
+            mapped = mmap.mmap(input.fileno(), data_length + offset - start, offset = start, access = mmap.ACCESS_READ)
+            data = memoryview(mapped)[offset - start:]
+            input.seek(data_length, 1)
         else:
-            data = input.read(dataLength)            
-            
-        return Envelope(meta, data)
+            data = input.read(data_length)
+
+        if input.read(2) != Envelope._END:
+            raise ValueError(f"Envelope must end with {Envelope._END!r}")
+        return Envelope._received(meta, data, meta_type, compression)
 
     # ii (3 p.) write Envelope instance to stream
     def write_to(self, output: RawIOBase):
-        # as read function
-        output.write(b'#~' + b'DF02' + b'..') #beginning + _type + _metaType(empty)
-        
-        meta = bytes(json.dumps(self.meta), 'utf8')
-        
-        output.write(len(meta).to_bytes(4)) # metadata length in bytes 
-        output.write(len(self.data).to_bytes(4)) # the data length in bytes
-        
+        meta, data, compression = self._pack()
+        output.write(Envelope._HEADER.pack(*self._header(meta, data.nbytes, compression)))
         output.write(meta)
-        output.write(self.data)
+        output.write(data)
+        output.write(Envelope._END)
 
-        output.write(b'~#') # ending
-    
     # iii (1 p.) create Envelope instance from binary string
+    # data of the envelope is a read-only memoryview of the buffer without copying (if it isn't compressed)
     @staticmethod
-    def from_bytes(buffer: bytes) -> "Envelope":
-        # and that's all ,isn't it?
-        return Envelope.read(BytesIO(buffer)) 
-    
+    def from_bytes(buffer: Binary) -> "Envelope":
+        view = memoryview(buffer).cast("B").toreadonly()
+        meta_type, compression, meta_length, data_length = Envelope._unpack_header(view)
+        meta_end = Envelope._HEADER.size + meta_length
+        data_end = meta_end + data_length
+        if view[data_end:data_end + 2] != Envelope._END:
+            raise ValueError(f"Envelope must end with {Envelope._END!r}")
+        meta = Envelope._decode_meta(meta_type, view[Envelope._HEADER.size:meta_end])
+        if compression is None:
+            return Envelope._received(meta, view[meta_end:data_end], meta_type, compression)
+        chunks = (view[start:min(start + Envelope._CHUNK_SIZE, data_end)]
+                  for start in range(meta_end, data_end, Envelope._CHUNK_SIZE))
+        return Envelope._received(meta, Envelope._decompress(compression, chunks), meta_type, compression)
+
+    # header, meta, data (compressed) and ending of the envelope
+    def _parts(self) -> tuple[Binary, ...]:
+        meta, data, compression = self._pack()
+        return Envelope._HEADER.pack(*self._header(meta, data.nbytes, compression)), meta, data, Envelope._END
+
     #convert Envelope instance to binary string.
-    #Note: Use module struct for work with binary values
-    # iv (1 p.)
+    # iv (1 p.) data is copied once: join allocates the result and copies the parts into it
     def to_bytes(self) -> bytes:
-        _read = BytesIO()
-        self.write_to(_read)
-        # return to start
-        _read.seek(0) 
-        return _read.read()
+        return b"".join(self._parts())
+
+    # the same as to_bytes in mutable buffer
+    def to_buffer(self) -> bytearray:
+        return bytearray().join(self._parts())
 
     @staticmethod
-    async def async_read(reader: StreamReader) -> "Envelope":
-        pass  # TODO(Assignment 11)
+    async def _read_chunks_async(reader: StreamReader, length: int, chunk_size: int) -> AsyncIterator[bytes]:
+        while length > 0:
+            chunk = await reader.readexactly(min(length, chunk_size))
+            length -= len(chunk)
+            yield chunk
+        if await reader.readexactly(2) != Envelope._END:
+            raise ValueError(f"Envelope must end with {Envelope._END!r}")
 
-    async def async_write_to(self, writer: StreamWriter):
-        pass  # TODO(Assignment 11)
\ No newline at end of file
+    # the same format as read, data is received (and decompressed) by chunks of chunk_size
+    # or is returned as AsyncPayload if stream is True
+    @staticmethod
+    async def async_read(reader: StreamReader, stream: bool = False, chunk_size: Optional[int] = None) -> "Envelope":
+        header = await reader.readexactly(Envelope._HEADER.size)
+        meta_type, compression, meta_length, data_length = Envelope._unpack_header(header)
+        meta = Envelope._decode_meta(meta_type, await reader.readexactly(meta_length))
+        chunks = Envelope._read_chunks_async(reader, data_length, chunk_size or Envelope._CHUNK_SIZE)
+        payload = AsyncPayload(chunks, data_length, compression)
+        return Envelope._received(meta, payload if stream else await payload.read(), meta_type, compression)
+
+    # the same format as write_to, writer is drained after every chunk, so the memory of the transport is bounded.
+    # AsyncPayload is forwarded as it is received, with its own compression
+    async def async_write_to(self, writer: StreamWriter, chunk_size: Optional[int] = None):
+        chunk_size = chunk_size or Envelope._CHUNK_SIZE
+        if isinstance(self.data, AsyncPayload):
+            meta = self._encode_meta()
+            writer.write(Envelope._HEADER.pack(*self._header(meta, self.data.nbytes, self.data.compression)))
+            writer.write(meta)
+            written = 0
+            async for chunk in self.data.raw():
+                writer.write(chunk)
+                written += memoryview(chunk).nbytes
+                await writer.drain()
+            if written != self.data.nbytes:
+                raise ValueError(f"Payload has {written} bytes instead of {self.data.nbytes}")
+        else:
+            meta, data, compression = self._pack()
+            writer.write(Envelope._HEADER.pack(*self._header(meta, data.nbytes, compression)))
+            writer.write(meta)
+            for start in range(0, data.nbytes, chunk_size):
+                writer.write(data[start:start + chunk_size])
+                await writer.drain()
+        writer.write(Envelope._END)
+        await writer.drain()
@@ -0,0 +1,171 @@
+'''
+Stable fingerprints of the code of tasks.
+Fingerprint of the function is built from its bytecode, constants, names, default values,
+closure values and fingerprints of used global functions and values of user modules,
+so it changes when the task body, anything it calls or any value it uses changes, but not when the code is only moved.
+Values are hashed by content, other objects by their pickle, fingerprint is None if an object can't be pickled.
+Fingerprint doesn't depend on the process (ids and addresses aren't used), so it can be used by persistent cache.
+'''
+import dataclasses
+import functools
+import hashlib
+import pickle
+import sys
+import sysconfig
+import types
+from importlib import metadata
+from typing import Any, Optional
+
+import numpy as np
+
+_LIBRARY_PATHS = tuple({sysconfig.get_path(name) for name in ("stdlib", "platstdlib", "purelib", "platlib")})
+_SIMPLE = (type(None), bool, int, float, complex, str, bytes, type(Ellipsis))
+
+
+# top-level packages of installed plugins (stem.plugins entry points): their code is user code
+@functools.lru_cache(maxsize=None)
+def _plugin_packages() -> frozenset[str]:
+    from .plugins import ENTRY_POINT_GROUP
+    return frozenset(entry_point.module.partition(".")[0]
+                     for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP))
+
+
+# version of the distribution of the top-level package (python version for standard library)
+@functools.lru_cache(maxsize=None)
+def _library_version(package: str) -> str:
+    for distribution in metadata.packages_distributions().get(package, []):
+        try:
+            return f"{distribution}=={metadata.version(distribution)}"
+        except metadata.PackageNotFoundError:
+            pass
+    return sys.version
+
+
+# code of installed packages and standard library is identified by name and version of the distribution,
+# code of modules without file (__main__ of interactive session, exec) and of installed plugins is user code
+def _is_library(obj: Any) -> bool:
+    name = getattr(obj, "__module__", None) or ""
+    if name in sys.builtin_module_names:
+        return True
+    file = getattr(sys.modules.get(name), "__file__", None)
+    return file is not None and file.startswith(_LIBRARY_PATHS) and name.partition(".")[0] not in _plugin_packages()
+
+
+def _library_digest(kind: str, obj: Any) -> str:
+    return _hash(kind, _qualname(obj), _library_version((getattr(obj, "__module__", None) or "").partition(".")[0]))
+
+
+@functools.lru_cache(maxsize=None)
+def _code_digest(code: types.CodeType) -> str:
+    parts = [code.co_code, code.co_names, code.co_varnames, code.co_freevars, code.co_cellvars,
+             code.co_argcount, code.co_posonlyargcount, code.co_kwonlyargcount, code.co_flags]
+    consts = [_code_digest(const) if isinstance(const, types.CodeType) else _digest(const, set())
+              for const in code.co_consts]
+    return _hash(repr(parts), *consts)
+
+
+def _hash(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf8") if isinstance(part, str) else part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _function_digest(func: types.FunctionType, visited: set) -> str:
+    code = func.__code__
+    parts = [_code_digest(code), _digest(func.__defaults__, visited), _digest(func.__kwdefaults__, visited)]
+    for cell in func.__closure__ or ():
+        try:
+            parts.append(_digest(cell.cell_contents, visited))
+        except ValueError: # empty cell
+            parts.append("empty")
+    # global functions and values used by the function
+    for name in _global_names(code):
+        if name in func.__globals__:
+            parts.append(name + "=" + _digest(func.__globals__[name], visited))
+    return _hash(*parts)
+
+
+def _global_names(code: types.CodeType) -> list[str]:
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.extend(_global_names(const))
+    return sorted(set(names))
+
+
+def _digest(value: Any, visited: set) -> str:
+    if isinstance(value, _SIMPLE):
+        return _hash(type(value).__name__, repr(value))
+    if id(value) in visited: # recursive structures and functions
+        return "recursion"
+    visited = visited | {id(value)}
+
+    from .task import Task
+    if isinstance(value, Task):
+        if value.fingerprint is None:
+            raise _NoFingerprint(f"Task {value.name} has no fingerprint")
+        return value.fingerprint
+    if isinstance(value, (tuple, list)):
+        return _hash(type(value).__name__, *(_digest(item, visited) for item in value))
+    if isinstance(value, (set, frozenset)):
+        return _hash(type(value).__name__, *sorted(_digest(item, visited) for item in value))
+    if isinstance(value, dict):
+        return _hash("dict", *sorted(_digest(k, visited) + _digest(v, visited) for k, v in value.items()))
+    if isinstance(value, np.ndarray):
+        return _hash("ndarray", value.dtype.str, repr(value.shape),
+                     hashlib.sha256(np.ascontiguousarray(value).data).hexdigest()
+                     if not value.dtype.hasobject else _digest(value.tolist(), visited))
+    if isinstance(value, np.generic):
+        return _hash(type(value).__name__, repr(value))
+    if isinstance(value, types.ModuleType):
+        return _hash("module", value.__name__)
+    if isinstance(value, functools.partial):
+        return _hash("partial", _digest(value.func, visited), _digest(value.args, visited),
+                     _digest(value.keywords, visited))
+    if isinstance(value, types.MethodType):
+        return _hash("method", _digest(value.__func__, visited), _qualname(type(value.__self__)))
+    if isinstance(value, types.FunctionType):
+        if _is_library(value):
+            return _library_digest("function", value)
+        return _function_digest(value, visited)
+    if isinstance(value, type):
+        if _is_library(value):
+            return _library_digest("type", value)
+        methods = (types.FunctionType, classmethod, staticmethod, property)
+        return _hash("type", _qualname(value), *(name + "=" + _digest(attr, visited)
+                                                 for name, attr in sorted(vars(value).items())
+                                                 if isinstance(attr, methods)))
+    if isinstance(value, (classmethod, staticmethod)):
+        return _digest(value.__func__, visited)
+    if isinstance(value, property):
+        return _hash("property", *(_digest(f, visited) for f in (value.fget, value.fset, value.fdel) if f))
+    if dataclasses.is_dataclass(value):
+        return _hash(_qualname(type(value)), _digest(dataclasses.asdict(value), visited))
+    # state of other objects is their pickle
+    try:
+        state = pickle.dumps(value, protocol=4)
+    except Exception as e:
+        raise _NoFingerprint(f"Object of type {_qualname(type(value))} can't be pickled: {e}") from e
+    return _hash("object", _qualname(type(value)), hashlib.sha256(state).hexdigest())
+
+
+class _NoFingerprint(Exception):
+    pass
+
+
+def _qualname(obj: Any) -> str:
+    return f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', repr(obj))}"
+
+
+# None if any value (or value used by function) can't be pickled
+def fingerprint(*values: Any) -> Optional[str]:
+    try:
+        return _hash(*(_digest(value, set()) for value in values))
+    except _NoFingerprint:
+        return None
+
+
+def combine(own: str, dependencies: Optional[list[str]] = None) -> str:
+    return _hash(own, *(dependencies or []))
@@ -6,9 +6,16 @@ metadata processor principle - during the
 processing of data, only immutable initial data and metadata are allowed to be used as input -> declarative
 approach of describing data (no scripts, processing description in the form of metadata)
 '''
-from dataclasses import dataclass
+from dataclasses import dataclass, is_dataclass, fields
+from functools import partial
+import hashlib
+import json
 from .core import Dataclass
-from typing import Optional, Any, Union
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Optional, Any, Union, Callable, Sequence, Iterator, get_type_hints, get_origin, get_args
+
+import numpy as np
 
 #Meta --- union of the dict and the Dataclass type.
 Meta = Union[dict, Dataclass]
@@ -38,7 +45,7 @@ class MetaFieldError:
 #It contains list of instance of dataclass MetaFieldError or another MetaVerification in the field errors:
 class MetaVerification:
 
-    def __init__(self, *errors: Union[MetaFieldError, MetaVerification]):
+    def __init__(self, *errors: Union[MetaFieldError, "MetaVerification"]):
         self.error = errors
         pass
 
@@ -52,65 +59,407 @@ class MetaVerification:
         
     # verify meta by specification. Raise SpecificationError if verification impossible.
     #Metadata verification: each task has Specification which describes required meta and the metadata processor checks input meta the correspondence to the specification.
-    # I didn't get it at first (and second, and third) but then I got explained what I need to do here
+    #Specification is compiled once into validator (see compile_specification).
     @staticmethod
     def verify(meta: Meta,
                specification: Optional[Specification] = None) -> "MetaVerification":
-        #keys
-        spec = specification
-        meta_keys = meta.__dataclass_fields__.keys() if is_dataclass(meta) else dict(meta.keys())
-        spec_keys = spec.__dataclass_fields__.keys() if is_dataclass(spec) else dict(spec).keys()
-        
-        for spec_key in spec_keys:
-            spec_type = spec.__dataclass_fields__[spec_key].type if is_dataclass(spec) else spec[spec_key]
-            if spec_key not in meta_keys:
-                self.error.append(MetaFieldError(required_key = spec_key, required_types = spec_type ) )
-            else:
-                presented_value = get_meta_attr(meta, required_key)
-                presented_type = type(presented_value)
-                # Oh, I should count recursion. Painful
-                if (isinstance(spec_type, type) or (
-                    isinstance(spec_type, tuple) and isinstance(spec_type[0], type)
-                )):
-                    # types checking
-                    if not issubclass(presented_type, spec_type):
-                        errors.append( MetaFieldError(
-                                required_key = spec_key,
-                                required_types = spec_type,
-                                presented_value = presented_value,
-                                presented_type = presented_type ) )
+        if specification is None:
+            return MetaVerification()
+        return MetaVerification(*compile_specification(specification)(meta))
+
+    # see verify_batch
+    @staticmethod
+    def verify_batch(metas: Union[Sequence[Meta], dict[str, Any]],
+                     specification: Specification) -> "BatchVerification":
+        return verify_batch(metas, specification)
+
+
+_MISSING = object()
+
+
+def _is_meta(value: Any) -> bool:
+    return isinstance(value, (dict, MetaView)) or is_dataclass(value)
+
+
+def _fields(specification: Specification) -> list[tuple[str, Any]]:
+    if is_dataclass(specification):
+        try:
+            hints = get_type_hints(specification if isinstance(specification, type) else type(specification))
+        except Exception as e:
+            raise SpecificationError(f"Types of {specification} can't be resolved: {e}")
+        return [(field.name, hints.get(field.name, Any)) for field in fields(specification)]
+    if isinstance(specification, tuple) and all(isinstance(item, tuple) and len(item) == 2 for item in specification):
+        return list(specification)
+    raise SpecificationError(f"Specification must be dataclass or tuple of pairs (key, type): {specification}")
+
+
+# required types of the field as tuple for isinstance (None if any value is allowed)
+def _required_types(required: Any) -> Optional[tuple[type, ...]]:
+    if required is Any:
+        return None
+    if isinstance(required, type):
+        return (required,)
+    if get_origin(required) is Union:
+        args = [_required_types(arg) for arg in get_args(required)]
+        return None if None in args else tuple(t for arg in args for t in arg)
+    if get_origin(required) is not None: # generic alias: list[int] is checked as list
+        return _required_types(get_origin(required))
+    if isinstance(required, tuple) and all(isinstance(item, type) for item in required):
+        return required
+    raise SpecificationError(f"Unsupported type in specification: {required}")
+
+
+# NumPy scalars are checked as python values (np.int64 is int), as NumPy columns are checked by dtype kind
+def _is_instance(value: Any, types: tuple[type, ...]) -> bool:
+    return isinstance(value, types) or (isinstance(value, np.generic) and isinstance(value.item(), types))
+
+
+# dataclass or tuple of pairs as required type of the field is nested specification
+def _is_specification(required: Any) -> bool:
+    return is_dataclass(required) or \
+           (isinstance(required, tuple) and len(required) > 0 and all(isinstance(item, tuple) for item in required))
+
+
+#Validator returns empty tuple if meta corresponds to the specification, otherwise errors for MetaVerification.
+#The fast path checks fields without creation of any objects, errors are collected only after failure.
+def _compile(specification: Specification) -> Callable[[Meta], tuple]:
+    checks: list[tuple[str, Optional[tuple[type, ...]], Optional[Callable[[Meta], tuple]]]] = []
+    for key, required in _fields(specification):
+        if _is_specification(required):
+            checks.append((key, None, compile_specification(required)))
+        else:
+            checks.append((key, _required_types(required), None))
+    checks = tuple(checks)
+
+    def errors(meta: Meta) -> tuple:
+        found = []
+        get = meta.get if isinstance(meta, (dict, MetaView)) else partial(getattr, meta)
+        for key, types, nested in checks:
+            value = get(key, _MISSING)
+            if value is _MISSING:
+                found.append(MetaFieldError(required_key=key, required_types=types))
+            elif types is not None and not _is_instance(value, types):
+                found.append(MetaFieldError(required_key=key, required_types=types,
+                                            presented_type=type(value), presented_value=value))
+            elif nested is not None:
+                if not _is_meta(value):
+                    found.append(MetaFieldError(required_key=key, presented_type=type(value), presented_value=value))
                 else:
-                    # deeper ((())) (()) ()
-                    errors_next_level = MetaVerification.verify(
-                        get_meta_attr(meta, required_key),
-                        required_types).error
+                    nested_errors = nested(value)
+                    if nested_errors:
+                        found.append(MetaVerification(*nested_errors))
+        return tuple(found)
+
+    def validate(meta: Meta) -> tuple:
+        if isinstance(meta, (dict, MetaView)):
+            get = meta.get
+        elif is_dataclass(meta):
+            get = partial(getattr, meta)
+        else:
+            raise SpecificationError(f"Meta must be dict or dataclass: {meta!r}")
+        for key, types, nested in checks:
+            value = get(key, _MISSING)
+            if value is _MISSING or (types is not None and not _is_instance(value, types)) or \
+                    (nested is not None and (not _is_meta(value) or nested(value))):
+                return errors(meta)
+        return ()
 
-                    if errors_next_level != ():
-                        errors.append(errors_next_level)
+    return validate
 
-        return MetaVerification(*errors)
-            
 
+_validators: OrderedDict[int, tuple[Specification, Callable[[Meta], tuple]]] = OrderedDict()
+_MAX_VALIDATORS = 1024
+
+
+# validator of the specification is compiled once, specifications are cached by identity,
+# least recently used validators are evicted, so specifications created per call don't accumulate
+def compile_specification(specification: Specification) -> Callable[[Meta], tuple]:
+    key = id(specification)
+    cached = _validators.get(key)
+    if cached is not None and cached[0] is specification:
+        _validators.move_to_end(key)
+        return cached[1]
+    validator = _compile(specification)
+    _validators[key] = (specification, validator) # reference keeps id of the specification unique
+    _validators.move_to_end(key)
+    if len(_validators) > _MAX_VALIDATORS:
+        _validators.popitem(last=False)
+    return validator
+
+
+# values of numpy columns with these dtype kinds are checked by the type of the column
+_KIND_TYPES = {"b": bool, "i": int, "u": int, "f": float, "c": complex, "U": str, "S": bytes}
+
+
+def _column_length(columns: dict) -> int:
+    for column in columns.values():
+        return _column_length(column) if isinstance(column, dict) else len(column)
+    return 0
+
+
+def _row(columns: dict, i: int) -> dict:
+    return {key: _row(column, i) if isinstance(column, dict) else
+                 column.item(i) if isinstance(column, np.ndarray) else column[i]
+            for key, column in columns.items()}
+
+
+def _column_mask(column: Any, types: Optional[tuple[type, ...]], size: int) -> np.ndarray:
+    if types is None:
+        return np.ones(size, bool)
+    if isinstance(column, np.ndarray) and column.dtype.kind in _KIND_TYPES:
+        return np.full(size, issubclass(_KIND_TYPES[column.dtype.kind], types))
+    return np.fromiter((_is_instance(value, types) for value in column), bool, size)
+
+
+def _columns_mask(columns: dict, specification: Specification, size: int) -> np.ndarray:
+    mask = np.ones(size, bool)
+    for key, required in _fields(specification):
+        column = columns.get(key)
+        if column is None:
+            mask[:] = False
+        elif _is_specification(required):
+            if isinstance(column, dict):
+                mask &= _columns_mask(column, required, size)
+            else:
+                validator = compile_specification(required)
+                mask &= np.fromiter((_is_meta(value) and not validator(value) for value in column), bool, size)
+        else:
+            mask &= _column_mask(column, _required_types(required), size)
+    return mask
+
+
+#Result of verification of many metas: mask of rows which correspond to the specification
+#and MetaVerification only for failed rows by their indices.
+@dataclass
+class BatchVerification:
+    passed: np.ndarray
+    errors: dict[int, MetaVerification]
+
+    def __len__(self) -> int:
+        return len(self.passed)
+
+    @property
+    def checked_success(self) -> bool:
+        return bool(self.passed.all())
+
+
+#Verify list of metas or columnar table (dict of columns: sequences or NumPy arrays, nested dicts for nested specifications)
+#by one specification. Types of NumPy columns are checked by dtype once for the whole column.
+def verify_batch(metas: Union[Sequence[Meta], dict[str, Any]], specification: Specification) -> BatchVerification:
+    validator = compile_specification(specification)
+    if isinstance(metas, dict):
+        passed = _columns_mask(metas, specification, _column_length(metas))
+        errors = {int(i): MetaVerification(*validator(_row(metas, i))) for i in np.flatnonzero(~passed)}
+    else:
+        results = [validator(meta) for meta in metas]
+        passed = np.fromiter((not result for result in results), bool, len(results))
+        errors = {i: MetaVerification(*result) for i, result in enumerate(results) if result}
+    return BatchVerification(passed, errors)
+
+
+_FINGERPRINT = "__stem_fingerprint__" # attribute of frozen meta with memoized fingerprint
+
+
+# frozen metas can't be changed, so their fingerprint is computed once
+# (MetaView isn't frozen: the viewed meta can be changed)
+def _is_frozen(meta: Any) -> bool:
+    params = getattr(type(meta), "__dataclass_params__", None)
+    return params is not None and params.frozen
+
+
+# frozen dataclass with mutable field values (lists, dicts, arrays) can be changed through them
+def _is_deeply_frozen(value: Any) -> bool:
+    if type(value) in _SCALARS or isinstance(value, (str, int, float, bytes, np.generic)):
+        return True
+    if isinstance(value, (tuple, frozenset)):
+        return all(_is_deeply_frozen(item) for item in value)
+    return _is_frozen(value) and all(_is_deeply_frozen(getattr(value, field.name)) for field in fields(value))
+
+
+def _memoized(meta: Any, attribute: str) -> Any:
+    return getattr(meta, attribute, None) if _is_frozen(meta) else None
+
+
+def _memoize(meta: Any, attribute: str, value: Any):
+    if _is_frozen(meta) and _is_deeply_frozen(meta):
+        try:
+            object.__setattr__(meta, attribute, value)
+        except AttributeError: # dataclass with slots
+            pass
+
+
+_SCALARS = {str, int, float, bool, type(None)}
+_TAG = "\0" # prefix of tagged keys and containers, string keys with this prefix are escaped
+
+
+# JSON-compatible tree of the meta where types which JSON doesn't distinguish are tagged:
+# not string keys, tuples, arrays and bytes. Dataclass metas and views are encoded as dicts,
+# numpy scalars as python values.
+def _tagged(value: Any) -> Any:
+    kind = type(value)
+    if kind in _SCALARS:
+        return value
+    if kind is dict and all(type(key) is str and key[:1] != _TAG and type(item) in _SCALARS
+                            for key, item in value.items()): # flat dict is encoded as is
+        return value
+    if kind is dict or isinstance(value, (dict, MetaView)):
+        return {_tagged_key(key): _tagged(item) for key, item in value.items()}
+    if kind is list:
+        return [_tagged(item) for item in value]
+    if kind is tuple:
+        return {_TAG + "tuple": [_tagged(item) for item in value]}
+    if isinstance(value, np.generic):
+        return _tagged(value.item())
+    if is_dataclass(value) and not isinstance(value, type):
+        return {_tagged_key(field.name): _tagged(getattr(value, field.name)) for field in fields(value)}
+    if isinstance(value, (str, int, float)): # subclasses, e.g. enums
+        return value
+    if isinstance(value, (list, tuple)):
+        return _tagged(list(value) if isinstance(value, list) else tuple(value))
+    if isinstance(value, np.ndarray):
+        data = np.ascontiguousarray(value)
+        return {_TAG + "array": f"{data.dtype.str}{data.shape}" + hashlib.sha256(data.data).hexdigest()}
+    if isinstance(value, (bytes, bytearray)):
+        return {_TAG + "bytes": bytes(value).hex()}
+    # repr doesn't identify the value: default repr contains address, different values can have equal repr
+    raise TypeError(f"Object of type {type(value).__name__} has no meta fingerprint")
+
+
+def _tagged_key(key: Any) -> str:
+    if isinstance(key, str):
+        return _TAG + "str:" + key if key.startswith(_TAG) else key
+    if isinstance(key, np.generic):
+        key = key.item()
+    return _TAG + type(key).__name__ + ":" + _encoder.encode(_tagged(key))
+
+
+_encoder = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+#Canonical fingerprint of the meta: sha256 of JSON with sorted keys where dataclass metas are encoded as dicts,
+#so equal dict and dataclass metas have the same fingerprint regardless of key order,
+#numpy scalars are equal to python values, keys and tuples are tagged by type ({1: 1} differs from {"1": 1}).
+#Fingerprints of frozen dataclass metas without mutable values are memoized.
+#TypeError is raised for values of other types.
+def meta_fingerprint(meta: Meta) -> str:
+    fingerprint = _memoized(meta, _FINGERPRINT)
+    if fingerprint is None:
+        encoded = _encoder.encode(_tagged(meta))
+        fingerprint = hashlib.sha256(encoded.encode("utf8")).hexdigest()
+        _memoize(meta, _FINGERPRINT, fingerprint)
+    return fingerprint
+
+
+class MetaView(dict):
+    '''
+    Immutable view of the meta (dict, dataclass or another view): top level keys of the meta are copied
+    into the view, values are shared without copying, nested metas are returned as views of the same objects,
+    update returns new view which shares unchanged values with the original.
+    Values are available by key, by get_meta_attr and as attributes (like in dataclass meta).
+    View is dict (isinstance, json.dumps and ** work), methods which change dict raise TypeError,
+    so tasks executed concurrently can share the meta. Nested metas must not be changed while the view is used.
+    '''
+    __slots__ = ("_base",)
+
+    def __init__(self, base: Meta = None, changes: Optional[dict] = None):
+        if isinstance(base, MetaView):
+            items, base = base.items(), base._base
+        elif is_dataclass(base):
+            items = ((field.name, getattr(base, field.name)) for field in fields(base))
+        else:
+            items = () if base is None else base.items()
+        super().__init__(items)
+        if changes:
+            dict.update(self, changes)
+        object.__setattr__(self, "_base", base) # the viewed meta
+
+    def _lookup(self, key: Any) -> Any:
+        value = dict.get(self, key, _MISSING)
+        if isinstance(value, dict) and not isinstance(value, MetaView) or \
+                (is_dataclass(value) and not isinstance(value, type)):
+            return MetaView(value)
+        return value
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __getattr__(self, key: str) -> Any:
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise AttributeError(key)
+        return value
+
+    def __setattr__(self, key: str, value: Any):
+        raise AttributeError("MetaView is immutable, use update")
+
+    # iteration isn't inherited, so dict(view) and ** read values by __getitem__ (as views)
+    def __iter__(self) -> Iterator:
+        return dict.__iter__(self)
+
+    def __repr__(self) -> str:
+        return f"MetaView({dict(self)!r})"
+
+    def __reduce__(self):
+        return MetaView, (dict(dict.items(self)),)
+
+    get = Mapping.get
+    items = Mapping.items
+    values = Mapping.values
+
+    def copy(self) -> dict:
+        return dict(self)
+
+    def __or__(self, other: Any) -> dict:
+        return {**self, **other}
+
+    def __ror__(self, other: Any) -> dict:
+        return {**other, **self}
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("MetaView is immutable, use update")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = _immutable
+
+    def update(self, **kwargs) -> "MetaView":
+        return MetaView(self, kwargs)
+
+    # view without the keys
+    def without(self, *keys: Any) -> "MetaView":
+        if not any(key in self for key in keys):
+            return self
+        view = MetaView({key: value for key, value in dict.items(self) if key not in keys})
+        object.__setattr__(view, "_base", self._base)
+        return view
+
+    # meta of the dependency: view of the value by its name (empty if the value is absent or isn't meta)
+    def slice(self, key: Any) -> "MetaView":
+        value = self._lookup(key)
+        return value if isinstance(value, MetaView) else MetaView()
+
+
+def meta_view(meta: Meta) -> MetaView:
+    return meta if isinstance(meta, MetaView) else MetaView(meta)
 
 
 #3.(1 p.) get_meta_attr(meta : Meta, key : str, default : Optional[Any] = None) -> Optional[Any]: which return meta value by key from top level of meta or default if key don't exist in meta
 def get_meta_attr(meta : Meta, key : str, default : Optional[Any] = None) -> Optional[Any]:
-    try:
-        return getattr(meta, key)
+    if is_dataclass(meta):
+        return getattr(meta, key, default)
     else:
-        return default
-    
-    try:
-        return meta.get(key,default)
-    except:
-        return default
+        return meta.get(key, default)
     
 
 #4.(1 p.) function def update_meta(meta: Meta, **kwargs): which update meta from kwargs.
-def update_meta(meta: Meta, **kwargs):
+#MetaView isn't changed, new view is returned, dict and dataclass are updated in place and returned.
+def update_meta(meta: Meta, **kwargs) -> Meta:
+    if isinstance(meta, MetaView):
+        return meta.update(**kwargs)
     if is_dataclass(meta):
         for key in kwargs:
-            setattr(meta, key, kwargs[key])  
+            setattr(meta, key, kwargs[key])
     else:
-        for key in kwargs:
-            meta.update(kwargs, kwargs[key])
\ No newline at end of file
+        meta.update(kwargs)
+    return meta
\ No newline at end of file
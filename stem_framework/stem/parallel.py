@@ -0,0 +1,174 @@
+'''
+Parallel map over chunks of iterable on the process pool.
+Results are yielded in the original order, number of chunks in flight is bounded,
+so unbounded iterables are processed with bounded memory.
+Size of chunks is adapted so that one chunk takes about TARGET_CHUNK_TIME seconds.
+
+Workers are started by forkserver (spawn where it is not available), never by fork, which is unsafe
+in threads of ThreadingRunner, so func is pickled and must be picklable (module level function or partial of it).
+Lambdas and closures are mapped serially in the calling process.
+One pool of each size is reused by all calls and shut down at exit.
+'''
+import atexit
+import logging
+import multiprocessing
+import pickle
+import threading
+import time
+from collections import deque
+from concurrent import futures
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional, TypeVar, Any
+
+T = TypeVar("T")
+
+TARGET_CHUNK_TIME = 0.05
+MIN_CHUNK_SIZE = 1
+MAX_CHUNK_SIZE = 64*1024
+
+_log = logging.getLogger(__name__)
+
+_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+# state is kept in class attributes: module globals used by functions are fingerprinted (see stem.fingerprint)
+class _Pools:
+    _pools: dict[int, futures.ProcessPoolExecutor] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, workers: int) -> futures.ProcessPoolExecutor:
+        with cls._lock:
+            pool = cls._pools.get(workers)
+            if pool is None:
+                pool = cls._pools[workers] = futures.ProcessPoolExecutor(workers, mp_context=_CONTEXT)
+            return pool
+
+    @classmethod
+    def discard(cls, workers: int, pool: futures.ProcessPoolExecutor):
+        with cls._lock:
+            if cls._pools.get(workers) is pool:
+                del cls._pools[workers]
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def shutdown(cls):
+        with cls._lock:
+            pools = list(cls._pools.values())
+            cls._pools.clear()
+        for pool in pools:
+            pool.shutdown(cancel_futures=True)
+
+
+atexit.register(_Pools.shutdown)
+
+
+def _is_picklable(func: Callable) -> bool:
+    try:
+        pickle.dumps(func)
+    except Exception:
+        return False
+    return True
+
+
+def _map_chunk(func: Callable, chunk: list, vectorized: bool) -> tuple[float, list]:
+    start = time.perf_counter()
+    result = func(chunk) if vectorized else list(map(func, chunk))
+    return time.perf_counter() - start, result
+
+
+class _ChunkSize:
+    def __init__(self, size: Optional[int]):
+        self.fixed = size is not None
+        self.size = size or MIN_CHUNK_SIZE
+        self.element_time: Optional[float] = None
+
+    def update(self, elapsed: float, count: int):
+        if self.fixed or count == 0:
+            return
+        element_time = elapsed / count
+        # exponential moving average smooths noise of small chunks
+        self.element_time = element_time if self.element_time is None else (self.element_time + element_time) / 2
+        size = int(TARGET_CHUNK_TIME / self.element_time) if self.element_time > 0 else MAX_CHUNK_SIZE
+        self.size = max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, size))
+
+
+#In vectorized mode iterable must contain chunks (arrays) which are passed to func as is,
+#and chunks of results are yielded. Otherwise iterable is split in chunks of adaptive size (or fixed chunk_size).
+#If ordered is False chunks are yielded in order of completion.
+def parallel_map(func: Callable, iterable: Iterable, workers: int, chunk_size: Optional[int] = None,
+                 max_in_flight: Optional[int] = None, vectorized: bool = False, ordered: bool = True) -> Iterator:
+    if not _is_picklable(func):
+        _log.debug("%r can not be pickled, mapped serially", func)
+        return map(func, iterable)
+    return _parallel_map(func, iterable, workers, chunk_size, max_in_flight, vectorized, ordered)
+
+
+def _parallel_map(func: Callable, iterable: Iterable, workers: int, chunk_size: Optional[int],
+                  max_in_flight: Optional[int], vectorized: bool, ordered: bool) -> Iterator:
+    iterator = iter(iterable)
+    size = _ChunkSize(chunk_size)
+    max_in_flight = max_in_flight or 2 * workers
+
+    def next_chunk():
+        if vectorized:
+            return next(iterator, None)
+        chunk = list(islice(iterator, size.size))
+        return chunk if chunk else None
+
+    in_flight: deque[tuple[futures.Future, int]] = deque()
+    pool = _Pools.get(workers)
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < max_in_flight:
+                chunk = next_chunk()
+                if chunk is None:
+                    exhausted = True
+                else:
+                    in_flight.append((pool.submit(_map_chunk, func, chunk, vectorized), len(chunk)))
+            if not in_flight:
+                return
+            if ordered:
+                future, count = in_flight.popleft()
+            else:
+                done, _ = futures.wait([f for f, _ in in_flight], return_when=futures.FIRST_COMPLETED)
+                future, count = next(item for item in in_flight if item[0] in done)
+                in_flight.remove((future, count))
+            elapsed, result = future.result()
+            size.update(elapsed, count)
+            if vectorized:
+                yield result
+            else:
+                yield from result
+    except BrokenProcessPool:
+        # a crashed worker breaks the pool for good, next call starts a new one
+        _Pools.discard(workers, pool)
+        raise
+    finally:
+        for future, _ in in_flight:
+            future.cancel()
+
+
+NO_INITIAL = object()
+
+
+#Reduce of associative operation as balanced tree: neighbouring partial results of the same depth are combined
+#as soon as they are ready, so only O(log n) partial results are stored.
+def tree_reduce(func: Callable[[T, T], T], iterable: Iterable[T], initial: Any = NO_INITIAL) -> T:
+    stack: list[tuple[int, T]] = []
+    for value in iterable:
+        level = 0
+        while stack and stack[-1][0] == level:
+            value = func(stack.pop()[1], value)
+            level += 1
+        stack.append((level, value))
+    if not stack:
+        if initial is NO_INITIAL:
+            raise TypeError("reduce() of empty iterable with no initial value")
+        return initial
+    result = stack[0][1]
+    for _, value in stack[1:]:
+        result = func(result, value)
+    return result
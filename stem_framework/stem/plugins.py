@@ -0,0 +1,150 @@
+'''
+Declarative registration of plugin workspaces.
+Plugin is declared by the entry point of the group ENTRY_POINT_GROUP ("name = package.module:attribute"),
+its tasks by the entry points of the group ENTRY_POINT_GROUP + ".tasks" ("task_name = name"), in pyproject.toml:
+
+    [project.entry-points."stem.workspaces"]
+    int = "package.module:IntWorkspace"
+
+    [project.entry-points."stem.workspaces.tasks"]
+    int_range = "int"
+    int_scale = "int"
+
+or by the JSON manifest:
+
+    {"name": "plugins", "workspaces": [{"name": "int", "module": "package.module",
+                                         "attribute": "IntWorkspace", "tasks": ["int_range", "int_scale"]}]}
+
+Module of the plugin is imported only when its task is resolved (or it is asked for tasks),
+names of tasks listed in the manifest are used for structure and lookup without import.
+'''
+import json
+import sys
+from importlib import import_module
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import Optional, Union
+
+from .task import Task
+from .workspace import IWorkspace, TaskPath
+
+ENTRY_POINT_GROUP = "stem.workspaces"
+TASKS_GROUP_SUFFIX = ".tasks"
+
+
+class LazyWorkspace(IWorkspace):
+    '''
+    Workspace of the module which is imported on the first access to tasks.
+    attribute is name of the workspace in the module, module workspace is used if it is None.
+    task_names are all names which can be found by bare name in the workspace (None if unknown).
+    '''
+
+    def __init__(self, name: str, module: str, attribute: Optional[str] = None,
+                 task_names: Optional[list[str]] = None):
+        self._name = name
+        self.module = module
+        self.attribute = attribute
+        self.task_names = task_names
+        self._workspace: Optional[IWorkspace] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._workspace is not None
+
+    def load(self) -> IWorkspace:
+        if self._workspace is None:
+            module = import_module(self.module)
+            if self.attribute is None:
+                self._workspace = IWorkspace.module_workspace(module)
+            else:
+                self._workspace = getattr(module, self.attribute)
+        return self._workspace
+
+    @property
+    def tasks(self) -> dict[str, Task]:
+        return self.load().tasks
+
+    @property
+    def workspaces(self) -> set["IWorkspace"]:
+        return self.load().workspaces
+
+    def declares(self, task_path: TaskPath) -> bool:
+        return self.task_names is None or not task_path.is_leaf or task_path.name in self.task_names
+
+    def find_task(self, task_path: Union[str, TaskPath]) -> Optional[Task]:
+        if not isinstance(task_path, TaskPath):
+            task_path = TaskPath(task_path)
+        if not self.declares(task_path):
+            return None
+        return self.load().find_task(task_path)
+
+    # task from the module which isn't imported can't be in this workspace
+    def find_path(self, task: Task) -> Optional[TaskPath]:
+        if not self.is_loaded and self.module not in sys.modules:
+            return None
+        return self.load().find_path(task)
+
+    def structure(self) -> dict:
+        if self.task_names is None or self.is_loaded:
+            return {**self.load().structure(), "name": self.name}
+        return {"name": self.name, "tasks": list(self.task_names), "workspaces": []}
+
+
+class PluginWorkspace(IWorkspace):
+    '''
+    Root workspace of plugins: task path is resolved in the plugin with name of its head,
+    bare task name is resolved in the plugins which declare it, then in plugins without declared tasks.
+    '''
+
+    def __init__(self, name: str, plugins: list[LazyWorkspace]):
+        self._name = name
+        self._plugins = {plugin.name: plugin for plugin in plugins}
+
+    @property
+    def tasks(self) -> dict[str, Task]:
+        return {}
+
+    @property
+    def workspaces(self) -> list[LazyWorkspace]:
+        return list(self._plugins.values())
+
+    def get_workspace(self, name) -> Optional[IWorkspace]:
+        return self._plugins.get(name)
+
+    def find_task(self, task_path: Union[str, TaskPath]) -> Optional[Task]:
+        if not isinstance(task_path, TaskPath):
+            task_path = TaskPath(task_path)
+        if not task_path.is_leaf:
+            plugin = self._plugins.get(task_path.head)
+            return None if plugin is None else plugin.find_task(task_path.sub_path)
+        plugins = sorted(self._plugins.values(), key=lambda plugin: plugin.task_names is None)
+        for plugin in plugins:
+            task = plugin.find_task(task_path)
+            if task is not None:
+                return task
+        return None
+
+
+#Plugin without task entry points has unknown tasks and is imported on lookup of any bare task name
+def entry_point_plugins(group: str = ENTRY_POINT_GROUP) -> list[LazyWorkspace]:
+    task_names: dict[str, list[str]] = {}
+    for entry_point in entry_points(group=group + TASKS_GROUP_SUFFIX):
+        task_names.setdefault(entry_point.value, []).append(entry_point.name)
+    return [LazyWorkspace(entry_point.name, entry_point.module, entry_point.attr, task_names.get(entry_point.name))
+            for entry_point in entry_points(group=group)]
+
+
+def manifest_plugins(manifest: dict) -> list[LazyWorkspace]:
+    return [LazyWorkspace(item["name"], item["module"], item.get("attribute"), item.get("tasks"))
+            for item in manifest.get("workspaces", [])]
+
+
+def load_manifest(path: Union[str, Path]) -> PluginWorkspace:
+    path = Path(path)
+    with open(path) as file:
+        manifest = json.load(file)
+    return PluginWorkspace(manifest.get("name", path.stem), manifest_plugins(manifest))
+
+
+def discover(group: str = ENTRY_POINT_GROUP) -> PluginWorkspace:
+    return PluginWorkspace("plugins", entry_point_plugins(group))
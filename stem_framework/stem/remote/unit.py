@@ -4,6 +4,7 @@ import socketserver
 from socketserver import StreamRequestHandler
 from typing import Optional
 
+from stem.cache import MemoryCache
 from stem.envelope import Envelope
 from stem.task_master import TaskMaster
 from stem.task_runner import SimpleRunner
@@ -15,7 +16,7 @@ from multiprocessing import Process
 class UnitHandler(StreamRequestHandler):
     workspace: IWorkspace
     task_tree: TaskTree = TaskTree()
-    task_master = TaskMaster(SimpleRunner(), task_tree)
+    task_master = TaskMaster(SimpleRunner(), task_tree, MemoryCache()) # results are reused between requests
     powerfullity: int
 
     def handle(self) -> None:
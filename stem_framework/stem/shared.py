@@ -0,0 +1,106 @@
+'''
+Transfer of large binary values between processes through shared memory instead of pickling.
+The sender copies value into a shared memory block and sends only its SharedValue descriptor.
+The receiver copies value out of the block.
+Block is unlinked by its owner: blocks of inputs are owned by SharedBlocks of the runner and unlinked
+after the graph is finished, block of the result of worker is unlinked by the receiver (unshare with unlink).
+Blocks which aren't unlinked (e.g. failed receiver) are removed by the resource tracker at exit.
+'''
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Optional
+
+import numpy as np
+
+SHARED_MEMORY_THRESHOLD = 1024*1024 # 1 Mb
+
+
+@dataclass(frozen=True)
+class SharedValue:
+    name: str
+    size: int
+    dtype: Optional[str] = None # None for bytes
+    shape: tuple[int, ...] = ()
+
+    def load(self, unlink: bool = False) -> Any:
+        shm = SharedMemory(self.name)
+        try:
+            if self.dtype is None:
+                value = bytes(shm.buf[:self.size])
+            else:
+                value = np.ndarray(self.shape, self.dtype, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            if unlink:
+                shm.unlink()
+        return value
+
+
+def _is_shareable(value: Any) -> bool:
+    if isinstance(value, np.ndarray):
+        return not value.dtype.hasobject
+    return isinstance(value, (bytes, bytearray))
+
+
+# block with the copy of large array or bytes and its descriptor, (value, None) for other values
+def _create(value: Any, threshold: int) -> tuple[Any, Optional[SharedMemory]]:
+    if not _is_shareable(value) or (value.nbytes if isinstance(value, np.ndarray) else len(value)) < threshold:
+        return value, None
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        descriptor = SharedValue("", value.nbytes, value.dtype.str, value.shape)
+    else:
+        descriptor = SharedValue("", len(value))
+
+    shm = SharedMemory(create=True, size=max(descriptor.size, 1))
+    shm.buf[:descriptor.size] = memoryview(value).cast("B")
+    return SharedValue(shm.name, descriptor.size, descriptor.dtype, descriptor.shape), shm
+
+
+# return SharedValue for large arrays and bytes, other values are returned as is.
+# The receiver must unlink the block (unshare with unlink=True)
+def share(value: Any, threshold: int = SHARED_MEMORY_THRESHOLD) -> Any:
+    value, shm = _create(value, threshold)
+    if shm is not None:
+        shm.close()
+    return value
+
+
+def unshare(value: Any, unlink: bool = False) -> Any:
+    if isinstance(value, SharedValue):
+        return value.load(unlink)
+    return value
+
+
+class SharedBlocks:
+    '''
+    Blocks shared by the owner: receivers only read them, all blocks are unlinked by close.
+    Resource tracker is started before the worker processes, so they use the tracker of the owner.
+    '''
+
+    def __init__(self, threshold: int = SHARED_MEMORY_THRESHOLD):
+        self.threshold = threshold
+        self._blocks: list[SharedMemory] = []
+        resource_tracker.ensure_running()
+
+    def share(self, value: Any) -> Any:
+        value, shm = _create(value, self.threshold)
+        if shm is not None:
+            self._blocks.append(shm)
+        return value
+
+    def close(self):
+        for shm in self._blocks:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks.clear()
+
+    def __enter__(self) -> "SharedBlocks":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
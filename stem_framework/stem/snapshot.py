@@ -0,0 +1,155 @@
+'''
+Serializable snapshot of the workspace structure: names of tasks, their dependencies and specifications
+for workspace and all sub-workspaces, with content hash.
+Snapshot remembers source files of the workspace, it is valid while none of them is changed,
+so cached snapshot is used (listed, sent to remote clients) without import of the workspace.
+Plugins with declared task names aren't imported to build the snapshot.
+Clients which already have the snapshot with the same hash don't need to fetch it again.
+'''
+import dataclasses
+import hashlib
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional, Union, Callable
+
+from .plugins import LazyWorkspace
+from .task import Task
+from .workspace import IWorkspace
+
+
+def _type_name(value: Any) -> str:
+    if isinstance(value, str): # postponed annotation
+        return value
+    return getattr(value, "__qualname__", None) or repr(value)
+
+
+# JSON-compatible description of the specification (dataclass or tuple of pairs)
+def describe_specification(specification: Any) -> Any:
+    if specification is None:
+        return None
+    if dataclasses.is_dataclass(specification):
+        return {field.name: _type_name(field.type) for field in dataclasses.fields(specification)}
+    if isinstance(specification, tuple):
+        if all(isinstance(item, tuple) and len(item) == 2 for item in specification):
+            return {str(key): describe_specification(value) for key, value in specification}
+        return [_type_name(item) for item in specification]
+    return _type_name(specification)
+
+
+def _module_file(name: Optional[str]) -> Optional[str]:
+    file = getattr(sys.modules.get(name or ""), "__file__", None)
+    return None if file is None else os.path.abspath(file)
+
+
+def _file_state(file: str) -> Optional[list[int]]:
+    try:
+        stat = os.stat(file)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+@dataclass
+class StructureSnapshot:
+    structure: dict
+    hash: str
+    sources: dict[str, Optional[list[int]]] = field(default_factory=dict) # file -> [mtime, size]
+
+    @staticmethod
+    def of(workspace: IWorkspace, extra_sources: tuple[str, ...] = ()) -> "StructureSnapshot":
+        files = {os.path.abspath(file) for file in extra_sources}
+        structure = _structure(workspace, files)
+        encoded = json.dumps(structure, sort_keys=True).encode("utf8")
+        return StructureSnapshot(structure, hashlib.sha256(encoded).hexdigest(),
+                                 {file: _file_state(file) for file in sorted(files)})
+
+    # True if no source file is changed since the snapshot
+    @property
+    def is_current(self) -> bool:
+        return all(_file_state(file) == state for file, state in self.sources.items())
+
+    def to_json(self) -> str:
+        return json.dumps(dataclasses.asdict(self))
+
+    @staticmethod
+    def from_json(text: str) -> "StructureSnapshot":
+        return StructureSnapshot(**json.loads(text))
+
+
+# plugin which isn't imported is described by the task names of its manifest,
+# dependencies and specification of its tasks are unknown (None), the manifest is the source of the snapshot
+def _declared_structure(workspace: LazyWorkspace) -> dict:
+    return {
+        "name": workspace.name,
+        "tasks": {name: {"dependencies": None, "specification": None} for name in workspace.task_names},
+        "workspaces": []
+    }
+
+
+def _structure(workspace: IWorkspace, files: set[str]) -> dict:
+    if isinstance(workspace, LazyWorkspace) and not workspace.is_loaded and workspace.task_names is not None:
+        return _declared_structure(workspace)
+    for module in [workspace.name, getattr(workspace, "__module__", None), getattr(workspace, "module", None)]:
+        file = _module_file(module)
+        if file is not None:
+            files.add(file)
+    tasks = {}
+    for name, task in workspace.tasks.items():
+        file = _module_file(getattr(task, "__module__", None))
+        if file is not None:
+            files.add(file)
+        tasks[name] = {
+            "dependencies": [dependency.name if isinstance(dependency, Task) else str(dependency)
+                             for dependency in task.dependencies],
+            "specification": describe_specification(task.specification)
+        }
+    return {
+        "name": workspace.name,
+        "tasks": tasks,
+        "workspaces": [_structure(sub_workspace, files) for sub_workspace in workspace.workspaces]
+    }
+
+
+def default_cache_directory() -> Path:
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(root) / "stem" / "structure"
+
+
+class SnapshotCache:
+    '''
+    Snapshots in the directory by key (e.g. the workspace argument of CLI).
+    Snapshot is rebuilt by loader of the workspace if it is absent or its sources are changed.
+    '''
+
+    def __init__(self, path: Union[str, Path, None] = None):
+        self.path = Path(path) if path is not None else default_cache_directory()
+
+    def _file(self, key: str) -> Path:
+        return self.path / (hashlib.sha256(key.encode("utf8")).hexdigest() + ".json")
+
+    def get(self, key: str) -> Optional[StructureSnapshot]:
+        try:
+            snapshot = StructureSnapshot.from_json(self._file(key).read_text())
+        except (OSError, ValueError, TypeError):
+            return None
+        return snapshot if snapshot.is_current else None
+
+    def put(self, key: str, snapshot: StructureSnapshot):
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            temporary = self._file(key).with_suffix(".tmp")
+            temporary.write_text(snapshot.to_json())
+            os.replace(temporary, self._file(key))
+        except OSError: # cache is optional
+            pass
+
+    def snapshot(self, key: str, loader: Callable[[], IWorkspace],
+                 extra_sources: tuple[str, ...] = ()) -> StructureSnapshot:
+        snapshot = self.get(key)
+        if snapshot is None:
+            snapshot = StructureSnapshot.of(loader(), extra_sources)
+            self.put(key, snapshot)
+        return snapshot
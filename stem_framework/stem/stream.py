@@ -0,0 +1,127 @@
+'''
+Chunked iteration.
+Pipelined iteration: the source iterator is pulled by own thread,
+which pushes chunks of elements into the bounded queue.
+Consumer of the stream works simultaneously with the producer,
+full queue stops the producer (backpressure), so memory usage is bounded by maxsize * chunk_size elements.
+'''
+import queue
+import threading
+from itertools import islice, chain
+from typing import TypeVar, Iterator, Iterable, Generic, Optional
+
+import numpy as np
+
+T = TypeVar("T")
+
+CHUNK_SIZE = 64*1024 # default number of elements in the array chunk
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    iterator = iter(iterable)
+    return iter(lambda: list(islice(iterator, size)), [])
+
+
+# dtype of numbers is the common type of the first chunk, e.g. [1, 2.5] is float64.
+# Numbers of the next chunks must fit in it, they can't promote already produced chunks.
+def _number_chunks(iterator: Iterator, size: int) -> Iterator[np.ndarray]:
+    dtype = None
+    for chunk in chunked(iterator, size):
+        array = np.asarray(chunk)
+        if array.dtype.kind not in _NUMBER_KINDS:
+            raise TypeError(f"Chunk of numbers contains values of other types: {array.dtype}")
+        if dtype is None:
+            dtype = array.dtype
+        elif np.result_type(dtype, array.dtype) != dtype:
+            raise TypeError(f"Chunk of {array.dtype} doesn't fit in {dtype} of the previous chunks")
+        yield array.astype(dtype, copy=False)
+
+
+_NUMBER_KINDS = "biufc"
+
+
+#split values in NumPy arrays of size elements:
+#array is split on views, iterable of arrays is considered as already chunked,
+#numbers are packed in arrays with the common dtype of the first chunk.
+def array_chunks(values: Iterable, size: int) -> Iterator[np.ndarray]:
+    if isinstance(values, np.ndarray):
+        return (values[i:i + size] for i in range(0, len(values), size))
+    iterator = iter(values)
+    for first in iterator:
+        iterator = chain([first], iterator)
+        if isinstance(first, np.ndarray) and first.ndim > 0:
+            return iterator
+        if isinstance(first, (int, float, bool, np.number, np.bool_)):
+            return _number_chunks(iterator, size)
+        return (np.asarray(chunk) for chunk in chunked(iterator, size))
+    return iter(())
+
+
+# empty array of dtype (dtype of the source) if there are no chunks
+def concatenate(chunks: Iterable[np.ndarray], dtype: Optional[np.dtype] = None) -> np.ndarray:
+    chunks = list(chunks)
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype)
+
+
+class _StreamError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_END = object()
+_TIMEOUT = 0.1 # period of checking that the stream isn't closed by consumer
+
+
+def _put(items: queue.Queue, closed: threading.Event, item) -> bool:
+    while not closed.is_set():
+        try:
+            items.put(item, timeout=_TIMEOUT)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+# producer doesn't refer to the stream, so abandoned stream is collected and closed
+def _produce(iterable: Iterable, chunk_size: int, items: queue.Queue, closed: threading.Event):
+    try:
+        for chunk in chunked(iterable, chunk_size):
+            if not _put(items, closed, chunk):
+                return
+    except BaseException as e:
+        _put(items, closed, _StreamError(e))
+        return
+    _put(items, closed, _END)
+
+
+class Stream(Iterator[T], Generic[T]):
+
+    def __init__(self, iterable: Iterable[T], maxsize: int = 8, chunk_size: int = 256):
+        self._queue = queue.Queue(maxsize)
+        self._closed = threading.Event()
+        self._chunk: Iterator[T] = iter(())
+        self._finished = False
+        threading.Thread(target=_produce, args=(iterable, chunk_size, self._queue, self._closed), daemon=True).start()
+
+    def __next__(self) -> T:
+        while True:
+            item = next(self._chunk, _END)
+            if item is not _END:
+                return item
+            if self._finished:
+                raise StopIteration
+            chunk = self._queue.get()
+            if chunk is _END:
+                self._finished = True
+                raise StopIteration
+            if isinstance(chunk, _StreamError):
+                self._finished = True
+                raise chunk.error
+            self._chunk = iter(chunk)
+
+    # stop the producer if the consumer doesn't need more elements
+    def close(self):
+        self._closed.set()
+
+    def __del__(self):
+        self.close()
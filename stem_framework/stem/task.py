@@ -1,9 +1,14 @@
-from functools import reduce
+from functools import reduce, partial
+from itertools import chain
+from inspect import iscoroutinefunction
 from typing import TypeVar, Union, Tuple, Callable, Optional, Generic, Any, Iterator, Iterable
 
 from abc import ABC, abstractmethod
 from .core import Named
 from .meta import Specification, Meta
+from .fingerprint import fingerprint
+from .parallel import parallel_map, tree_reduce, NO_INITIAL
+from .stream import CHUNK_SIZE, array_chunks, chunked, concatenate
 
 '''
 1.Resolving the task dependencies and building the task tree.
@@ -21,6 +26,22 @@ class Task(ABC, Generic[T], Named):
     def check_by_meta(self, meta: Meta):
         pass
 
+    # True if transform returns coroutine
+    @property
+    def is_async(self) -> bool:
+        return False
+
+    #stable hash of the code of the task class, functions and parameters of the task (see stem.fingerprint),
+    #it is changed when the task body is edited. It is computed once per task instance,
+    #so parameters of the task mustn't be changed after the first execution.
+    #None if the task uses values which can't be pickled, results of such task aren't cached.
+    @property
+    def fingerprint(self) -> Optional[str]:
+        if "_stem_fingerprint" not in vars(self):
+            self._stem_fingerprint = fingerprint(type(self), {key: value for key, value in vars(self).items()
+                                                              if key not in ("_stem_workspace", "_stem_fingerprint")})
+        return self._stem_fingerprint
+
     @abstractmethod
     def transform(self, meta: Meta, /, **kwargs: Any) -> T:
         pass
@@ -32,6 +53,7 @@ class FunctionTask(Task[T]):
                  settings: Optional[Meta] = None):
         self._name = name
         self._func = func
+        self.__module__ = func.__module__ # default workspace is module of the function
         self.dependencies = dependencies
         self.specification = specification
         self.settings = settings
@@ -40,6 +62,10 @@ class FunctionTask(Task[T]):
     def __call__(self, *args, **kwargs):
         return self._func(*args, **kwargs)
 
+    @property
+    def is_async(self) -> bool:
+        return iscoroutinefunction(self._func)
+
     def transform(self, meta: Meta, /, **kwargs: Any) -> T:
         return self._func(meta, **kwargs)
 
@@ -51,6 +77,10 @@ class DataTask(Task[T]):
     def data(self, meta: Meta) -> T:
         pass
 
+    @property
+    def is_async(self) -> bool:
+        return iscoroutinefunction(self.data)
+
     def transform(self, meta: Meta, /, **kwargs: Any) -> T:
         return self.data(meta)
 
@@ -61,12 +91,17 @@ class FunctionDataTask(DataTask[T]):
                  settings: Optional[Meta] = None):
         self._name = name
         self._func = func
+        self.__module__ = func.__module__ # default workspace is module of the function
         self.specification = specification
         self.settings = settings
 
     def __call__(self, *args, **kwargs):
         return self._func(*args, **kwargs)
 
+    @property
+    def is_async(self) -> bool:
+        return iscoroutinefunction(self._func)
+
     def data(self, meta: Meta) -> T:
         return self._func(meta)
     
@@ -86,50 +121,105 @@ def task(func: Callable[[Meta, ...], T], specification: Optional[Specification]
     else:
         return lambda func : task(func, specification, **settings)
 
+def _dependence_name(dependence: Union[str, "Task"]) -> str:
+    return dependence if isinstance(dependence, str) else dependence.name
+
 #apply func for each element of the iterated dependence
+#In vectorized mode the dependence is consumed by NumPy arrays of chunk_size elements,
+#func receives and returns whole array, result is iterator of chunks or one array if concatenate is True.
+#If parallelism > 1 chunks are mapped on the pool of parallelism processes with ordered output,
+#in not vectorized mode size of chunks is adapted by measured time per element.
 class MapTask(Task[Iterator[T]]):
-    def __init__(self, func: Callable, dependence: Union[str, "Task"]):
-        self._name = "map_" + dependence.name #return the name of the dependence with the prefix "map_"
+    def __init__(self, func: Callable, dependence: Union[str, "Task"],
+                 vectorized: bool = False, chunk_size: int = CHUNK_SIZE, concatenate: bool = False,
+                 parallelism: int = 1):
+        self._name = "map_" + _dependence_name(dependence) #return the name of the dependence with the prefix "map_"
         self._func = func
-        self.dependencies = dependence
+        self.dependencies = (dependence,)
+        self.vectorized = vectorized
+        self.chunk_size = chunk_size
+        self.concatenate = concatenate
+        self.parallelism = parallelism
 
     def transform(self, meta: Meta, /, **kwargs: Any) -> T:
-        return map(self._func, kwargs[self.dependencies]) # corrected
+        values = kwargs[_dependence_name(self.dependencies[0])]
+        if not self.vectorized:
+            if self.parallelism > 1:
+                return parallel_map(self._func, values, self.parallelism)
+            return map(self._func, values) # corrected
+        chunks = array_chunks(values, self.chunk_size)
+        if self.parallelism > 1:
+            chunks = parallel_map(self._func, chunks, self.parallelism, vectorized=True)
+        else:
+            chunks = map(self._func, chunks)
+        return concatenate(chunks, getattr(values, "dtype", None)) if self.concatenate else chunks
 
 #4 (1p.)
 #filter iterated dependence using key function
+#In vectorized mode func receives array of chunk_size elements and returns boolean mask.
 class FilterTask(Task[Iterator[T]]):
-    def __init__(self, func: Callable, dependence: Union[str, "Task"]):
+    def __init__(self, func: Callable, dependence: Union[str, "Task"],
+                 vectorized: bool = False, chunk_size: int = CHUNK_SIZE, concatenate: bool = False):
         #return the name of the dependence with the prefix "filter_"
-        self._name = "filter_" + dependence.name 
+        self._name = "filter_" + _dependence_name(dependence)
         self._func = func
-        self.dependencies = dependence
+        self.dependencies = (dependence,)
+        self.vectorized = vectorized
+        self.chunk_size = chunk_size
+        self.concatenate = concatenate
 
     def transform(self, meta: Meta, /, **kwargs: Any) -> T:
-        return filter(self._func, kwargs[self.dependencies]) # corrected
+        values = kwargs[_dependence_name(self.dependencies[0])]
+        if not self.vectorized:
+            return filter(self._func, values) # corrected
+        chunks = (chunk[self._func(chunk)] for chunk in array_chunks(values, self.chunk_size))
+        return concatenate(chunks, getattr(values, "dtype", None)) if self.concatenate else chunks
 
 #5 (1p.)
 # reduce iterated dependence using func function.
+#If the operation is associative the dependence is split in partitions of chunk_size elements,
+#which are reduced (on the pool of parallelism processes if parallelism > 1), partial results are combined as tree
+#by combiner (func by default). initial is combined with the result once, as in functools.reduce.
+#Combiner is necessary if state differs from element type, then identity must be given: the neutral state
+#(combiner(identity, s) == s) which seeds every partition, for example mean as (sum, count):
+#ReduceTask(lambda s, x: (s[0] + x, s[1] + 1), dependence, associative=True, identity=(0, 0),
+#           combiner=lambda a, b: (a[0] + b[0], a[1] + b[1]))
+#Partial results of commutative operation are combined in order of completion.
 class ReduceTask(Task[Iterator[T]]):
-    def __init__(self, func: Callable, dependence: Union[str, "Task"]):
+    def __init__(self, func: Callable, dependence: Union[str, "Task"],
+                 associative: bool = False, commutative: bool = False, combiner: Optional[Callable] = None,
+                 initial: Any = NO_INITIAL, chunk_size: int = CHUNK_SIZE, parallelism: int = 1,
+                 identity: Any = NO_INITIAL):
         #return the name of the dependence with the prefix "reduce_"
-        self._name = "reduce_" + dependence.name 
+        self._name = "reduce_" + _dependence_name(dependence)
         self._func = func
-        self.dependencies = dependence
+        self.dependencies = (dependence,)
+        self.associative = associative
+        self.commutative = commutative
+        self.combiner = combiner
+        self.initial = initial
+        self.identity = identity
+        self.chunk_size = chunk_size
+        self.parallelism = parallelism
 
     def transform(self, meta: Meta, /, **kwargs: Any) -> T:
-        return reduce(self._func, kwargs[self.dependencies]) # corrected
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+        values = kwargs[_dependence_name(self.dependencies[0])]
+        if not self.associative:
+            if self.initial is NO_INITIAL:
+                return reduce(self._func, values) # corrected
+            return reduce(self._func, values, self.initial)
+
+        partition = partial(_reduce_partition, self._func, self.identity is not NO_INITIAL, self.identity)
+        partitions = chunked(values, self.chunk_size)
+        if self.parallelism > 1:
+            partials = parallel_map(partition, partitions, self.parallelism, vectorized=True,
+                                    ordered=not self.commutative)
+        else:
+            partials = map(partition, partitions)
+        if self.initial is not NO_INITIAL:
+            partials = chain([self.initial], partials)
+        return tree_reduce(self.combiner or self._func, partials, self.identity)
+
+
+def _reduce_partition(func: Callable, has_identity: bool, identity: Any, partition: list) -> Any:
+    return reduce(func, partition, identity) if has_identity else reduce(func, partition)
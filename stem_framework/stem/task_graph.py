@@ -0,0 +1,205 @@
+'''
+Execution graph of the task tree.
+TaskNode.dependencies is a tree: a dependency shared by several tasks appears once per path.
+TaskGraph flattens the tree into a DAG where each (task, workspace, meta) is presented by
+one GraphNode, orders it topologically and is used by all runners for invocation of tasks,
+so every node is computed exactly once per run.
+'''
+import asyncio
+from collections import Counter
+from typing import TypeVar, Generic, Any, Iterator, Optional
+
+from .cache import ResultCache, MISSING, node_key
+from .meta import Meta, MetaView, meta_view, meta_fingerprint
+from .task import Task
+from .task_tree import TaskNode, CompiledGraph, CyclicDependencyError
+
+T = TypeVar("T")
+
+
+class GraphNode(Generic[T]):
+
+    def __init__(self, task_node: TaskNode[T], meta: MetaView):
+        self.task_node = task_node
+        self.meta = meta
+        self.dependencies: list["GraphNode"] = []
+        self.consumers: list["GraphNode"] = []
+        self.key: Optional[str] = None # key of the result in the cache
+        self.cached: Any = MISSING # result loaded from the cache
+
+    @property
+    def task(self) -> Task[T]:
+        return self.task_node.task
+
+    @property
+    def name(self) -> str:
+        return self.task.name
+
+    # keyword arguments of transform: results of dependencies by their names
+    def inputs(self, results: dict["GraphNode", Any]) -> dict[str, Any]:
+        return {dependency.name: results[dependency] for dependency in self.dependencies}
+
+    @property
+    def is_cached(self) -> bool:
+        return self.cached is not MISSING
+
+    # coroutine of async task is executed in own event loop
+    def invoke(self, results: dict["GraphNode", Any]) -> T:
+        if self.is_cached:
+            return self.cached
+        result = self.task.transform(self.meta, **self.inputs(results))
+        if self.task.is_async:
+            return asyncio.run(result)
+        return result
+
+    async def invoke_async(self, results: dict["GraphNode", Any]) -> T:
+        if self.is_cached:
+            return self.cached
+        return await self.task.transform(self.meta, **self.inputs(results))
+
+    def __repr__(self):
+        return f"GraphNode({self.name})"
+
+
+# nodes with equal metas are shared, metas without fingerprint (values of unknown types) are identified by object
+def _meta_key(meta: Meta) -> str:
+    try:
+        return meta_fingerprint(meta)
+    except TypeError:
+        return f"\0id:{id(meta)}"
+
+
+class TaskGraph(Generic[T]):
+    '''
+    Meta is distributed between tasks by the rule: root task receives whole meta,
+    every dependency receives value of its parent meta by own name (or empty meta).
+    The rule is the same for all runners, SimpleRunner passed the whole meta to dependencies before the graph.
+    Tasks receive immutable MetaView slices which share values of the meta without copying,
+    so concurrent runners can share them, update_meta returns new view.
+    Graph is built over CompiledGraph of the root node (compiled once per TaskNode),
+    nodes are deduplicated by (task, workspace) and meta fingerprint.
+    Graph of the sweep has root node for every meta (roots of equal metas are the same node),
+    nodes with the same meta slice and inputs are shared by all metas and invoked once.
+    If cache is given, results found in it are loaded instead of invocation
+    and nodes which are needed only for them are removed from the graph.
+    '''
+
+    def __init__(self, root: TaskNode[T], meta: Meta, cache: Optional[ResultCache] = None):
+        self._build(root, [meta], cache)
+
+    @staticmethod
+    def sweep(root: TaskNode[T], metas: list[Meta], cache: Optional[ResultCache] = None) -> "TaskGraph[T]":
+        graph = TaskGraph.__new__(TaskGraph)
+        graph._build(root, metas, cache)
+        return graph
+
+    def _build(self, root: TaskNode[T], metas: list[Meta], cache: Optional[ResultCache]):
+        if not metas:
+            raise ValueError("Graph needs at least one meta")
+        compiled = root.compiled
+        compiled.check()
+        # meta of the node is known when all its consumers are processed, consumers have greater ids
+        instances: list[dict[str, GraphNode]] = [{} for _ in range(len(compiled))]
+        self.roots: list[GraphNode[T]] = [] # by metas
+        for meta in map(meta_view, metas):
+            self.roots.append(instances[compiled.root].setdefault(_meta_key(meta), GraphNode(root, meta)))
+        self.root: GraphNode[T] = self.roots[0]
+        for i in reversed(range(len(compiled))):
+            for node in instances[i].values():
+                for j in compiled.dependencies(i):
+                    dependency = self._instance(compiled, instances[j], j, node.meta.slice(compiled.tasks[j].name))
+                    node.dependencies.append(dependency)
+                    dependency.consumers.append(node)
+        self.order: list[GraphNode] = [node for nodes in instances for node in nodes.values()] # dependencies first
+        self.cache = cache
+        if cache is not None:
+            self._load_cached()
+
+    @staticmethod
+    def _instance(compiled: CompiledGraph, nodes: dict[str, GraphNode], i: int, meta: MetaView) -> GraphNode:
+        key = _meta_key(meta)
+        node = nodes.get(key)
+        if node is None:
+            node = GraphNode(next(iter(nodes.values())).task_node if nodes else compiled.task_node(i), meta)
+            nodes[key] = node
+        return node
+
+    @staticmethod
+    def _task_path(node: GraphNode) -> Optional[str]:
+        workspace = node.task_node.workspace
+        path = workspace.find_path(node.task)
+        return None if path is None else f"{workspace.name}.{path}"
+
+    def _load_cached(self):
+        # slices of dependencies are presented in the keys of dependencies, so they are excluded from own key
+        for node in self.order:
+            own_meta = node.meta.without(*(d.name for d in node.dependencies))
+            node.key = node_key(self._task_path(node), node.task.fingerprint, own_meta,
+                                [d.key for d in node.dependencies])
+
+        # dependencies of cached nodes aren't needed
+        needed = set()
+        stack = list(self.roots)
+        while stack:
+            node = stack.pop()
+            if node in needed:
+                continue
+            needed.add(node)
+            if node.key is not None:
+                node.cached = self.cache.get(node.key)
+            if node.is_cached:
+                node.dependencies = []
+            else:
+                stack.extend(node.dependencies)
+
+        self.order = [node for node in self.order if node in needed]
+        for node in self.order:
+            node.consumers = [consumer for consumer in node.consumers if consumer in needed]
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    # number of nodes which would be invoked if every root was executed by own graph
+    def separate_size(self) -> int:
+        size = 0
+        for root, count in Counter(self.roots).items():
+            reachable, stack = set(), [root]
+            while stack:
+                node = stack.pop()
+                if node not in reachable:
+                    reachable.add(node)
+                    stack.extend(node.dependencies)
+            size += len(reachable) * count
+        return size
+
+    def __iter__(self) -> Iterator[GraphNode]:
+        return iter(self.order)
+
+    # groups of nodes which can be invoked simultaneously: every node placed after all its dependencies
+    def levels(self) -> list[list[GraphNode]]:
+        depth: dict[GraphNode, int] = {}
+        levels: list[list[GraphNode]] = []
+        for node in self.order:
+            depth[node] = max((depth[d] + 1 for d in node.dependencies), default=0)
+            if depth[node] == len(levels):
+                levels.append([])
+            levels[depth[node]].append(node)
+        return levels
+
+    # number of nodes on the longest path from the node to the root (inclusive)
+    def critical_path(self) -> dict[GraphNode, int]:
+        length: dict[GraphNode, int] = {}
+        for node in reversed(self.order):
+            length[node] = 1 + max((length[c] for c in node.consumers), default=0)
+        return length
+
+    # must be called by runner for each result: the result is stored in the cache,
+    # iterator can be consumed only once, so it is materialized when the node has several consumers.
+    # Pipelining runner doesn't cache iterators (cache_iterators=False): cache would materialize them.
+    def share(self, node: GraphNode[T], result: T, cache_iterators: bool = True) -> T:
+        if self.cache is not None and node.key is not None and not node.is_cached and \
+                (cache_iterators or not isinstance(result, Iterator)):
+            result = self.cache.put(node.key, result)
+        if len(node.consumers) > 1 and isinstance(result, Iterator):
+            return list(result)
+        return result
@@ -1,13 +1,16 @@
+import asyncio
 from enum import Enum, auto
-from typing import Optional, Callable, TypeVar, Generic
+from typing import Optional, Callable, TypeVar, Generic, Iterator
 from functools import cached_property
 from dataclasses import dataclass, field
 
-from .meta import Meta, MetaVerification, Specification
+from .cache import ResultCache
+from .meta import Meta, MetaVerification, Specification, BatchVerification, verify_batch
 from .task import Task
 from .workspace import Workspace
 from .task_runner import TaskRunner, SimpleRunner
 from .task_tree import TaskNode, TaskTree
+from .task_graph import TaskGraph
 
 T = TypeVar("T")
 
@@ -56,11 +59,30 @@ class TaskResult(Generic[T]):
             raise e
 
 
+#Result of the sweep: data by metas and sizes of the combined graph
+#against total size of graphs of the separate executions of every meta.
+@dataclass
+class SweepResult(Generic[T]):
+    status: TaskStatus
+    task_node: TaskNode[T]
+    data: list[T] = field(default_factory=list)
+    meta_errors: Optional[BatchVerification] = None
+    nodes: int = 0
+    separate_nodes: int = 0
+
+    @property
+    def saved_nodes(self) -> int:
+        return self.separate_nodes - self.nodes
+
+
 class TaskMaster:
 
-    def __init__(self, task_runner: TaskRunner[T] = SimpleRunner(), task_tree: Optional[TaskTree] = None):
+    #cache: optional storage of task results which are reused by following executions
+    def __init__(self, task_runner: TaskRunner[T] = SimpleRunner(), task_tree: Optional[TaskTree] = None,
+                 cache: Optional[ResultCache] = None):
         self.task_runner = task_runner
         self.task_tree = task_tree
+        self.cache = cache
 
     #This method implement next algorithm:
     def execute(self, meta: Meta, task: Task[T], workspace: Optional[Workspace] = None) -> TaskResult[T]:
@@ -84,10 +106,61 @@ class TaskMaster:
             ver = MetaVerification.verify(meta, task.specification)
             if not ver.checked_success:
                 return TaskResult(status = TaskStatus.META_ERROR, task_node = task_node,
-                    TaskMetaError(task_node, ver) )
+                    meta_errors = TaskMetaError(task_node, ver) )
             
         #3)Return TaskResult with TaskStatus.CONTAINS_DATA if dependencies or meta error is absent today.
         #In argument lazy_data must be stored callable value which run invocation of the task 
         #in the task_runner.
-        return TaskResult(status = TaskStatus.CONTAINS_DATA, task_node = task_node,
-                          lazy_data = lambda: self.task_runner.run(meta, task_node) )
\ No newline at end of file
+        if asyncio.iscoroutinefunction(self.task_runner.run):
+            lazy_data = lambda: asyncio.run(self.task_runner.run(meta, task_node, self.cache))
+        else:
+            lazy_data = lambda: self.task_runner.run(meta, task_node, self.cache)
+        return TaskResult(status = TaskStatus.CONTAINS_DATA, task_node = task_node, lazy_data = lazy_data)
+
+    #Same as execute, but the task is invoked immediately inside running event loop
+    #and returned TaskResult already contains data.
+    #Synchronous runners are executed in the default executor of the loop.
+    async def execute_async(self, meta: Meta, task: Task[T], workspace: Optional[Workspace] = None) -> TaskResult[T]:
+        result = self.execute(meta, task, workspace)
+        if result.status != TaskStatus.CONTAINS_DATA:
+            return result
+        try:
+            if asyncio.iscoroutinefunction(self.task_runner.run):
+                data = await self.task_runner.run(meta, result.task_node, self.cache)
+            else:
+                data = await asyncio.get_running_loop().run_in_executor(
+                    None, self.task_runner.run, meta, result.task_node, self.cache)
+        except Exception as e:
+            result.status = TaskStatus.INVOCATION_ERROR
+            raise e
+        result.lazy_data = lambda: data
+        return result
+
+    #Execute the task for every meta of the grid in one combined graph, so nodes with the same meta slice
+    #and inputs are invoked once for all metas. All metas are verified in one batch before any invocation.
+    #Unlike execute, tasks are invoked immediately, iterator results of the same root are materialized.
+    def sweep(self, metas: list[Meta], task: Task[T], workspace: Optional[Workspace] = None) -> SweepResult[T]:
+        if self.task_tree is None:
+            task_node = TaskNode(task, workspace)
+        else:
+            task_node = self.task_tree.resolve_node(task, workspace)
+        if task_node.has_dependence_errors:
+            return SweepResult(status=TaskStatus.DEPENDENCIES_ERROR, task_node=task_node)
+        if not metas:
+            return SweepResult(status=TaskStatus.CONTAINS_DATA, task_node=task_node)
+
+        if task.specification is not None:
+            verification = verify_batch(metas, task.specification)
+            if not verification.checked_success:
+                return SweepResult(status=TaskStatus.META_ERROR, task_node=task_node, meta_errors=verification)
+
+        graph = TaskGraph.sweep(task_node, metas, self.cache)
+        if asyncio.iscoroutinefunction(self.task_runner.execute):
+            results = asyncio.run(self.task_runner.execute(graph))
+        else:
+            results = self.task_runner.execute(graph)
+        if len(set(graph.roots)) < len(graph.roots):
+            results = {root: list(value) if isinstance(value, Iterator) else value for root, value in results.items()}
+        return SweepResult(status=TaskStatus.CONTAINS_DATA, task_node=task_node,
+                           data=[results[root] for root in graph.roots],
+                           nodes=len(graph), separate_nodes=graph.separate_size())
@@ -1,69 +1,219 @@
 import os
 import asyncio
-from typing import Generic, TypeVar
+import heapq
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Generic, TypeVar, Any, Iterator, Optional, Callable
 from abc import ABC, abstractmethod
 from concurrent import futures
-from multiprocessing.pool import ThreadPool 
+from .cache import ResultCache
 from .meta import Meta
+from .shared import share, unshare, SharedBlocks
+from .stream import Stream
+from .task import Task
 from .task_tree import TaskNode
+from .task_graph import TaskGraph, GraphNode
+from .workspace import TaskReference
 
 T = TypeVar("T")
 
 
+#Statistics of the last run of the runner which use worker pool
+@dataclass
+class RunStatistics:
+    nodes: int = 0
+    workers: int = 0 # number of threads (processes) which executed at least one task
+    max_running: int = 0 # maximum number of simultaneously executed tasks
+    max_queue_depth: int = 0 # maximum number of ready tasks waiting for free worker
+
+
+#Runner implements execute(graph) which invokes the nodes of the graph and returns results of its roots,
+#run builds the graph of one meta and executes it (TaskMaster.sweep executes graph of many metas).
 class TaskRunner(ABC, Generic[T]):
+    statistics: Optional[RunStatistics] = None
+
+    def run(self, meta: Meta, task_node: TaskNode[T], cache: Optional[ResultCache] = None) -> T:
+        graph = TaskGraph(task_node, meta, cache)
+        return self.execute(graph)[graph.root]
 
+    # invoke all nodes of the graph, return results of its roots
     @abstractmethod
-    def run(self, meta: Meta, task_node: TaskNode[T]) -> T:
+    def execute(self, graph: TaskGraph[T]) -> dict[GraphNode[T], T]:
         pass
 
 
 class SimpleRunner(TaskRunner[T]):
     #his method run the method task_node.task.transform
-    def run(self, meta: Meta, task_node: TaskNode[T]) -> T:
-        assert not task_node.has_dependence_errors
-        _dict = {d.task.name: d.task.transform(meta) for d in task_node.dependencies} 
-        return task_node.task.transform(meta, **_dict)
+    def execute(self, graph: TaskGraph[T]) -> dict[GraphNode[T], T]:
+        results = {}
+        for node in graph:
+            results[node] = graph.share(node, node.invoke(results))
+        return {root: results[root] for root in graph.roots}
+
+#Ready-queue scheduler: node is submitted to the pool only when results of all its dependencies are known,
+#so workers never wait for each other. Ready nodes with the longest path to the root are submitted first.
+#submit(node, inputs) must return future of pair (worker id, result), receive converts result after transfer.
+def _schedule(graph: TaskGraph[T], submit: Callable[[GraphNode, dict], futures.Future], max_workers: int,
+              statistics: RunStatistics, receive: Callable[[Any], Any] = lambda result: result) -> dict[GraphNode, T]:
+    priority = graph.critical_path()
+    index = {node: i for i, node in enumerate(graph)}
+    waiting = {node: len(node.dependencies) for node in graph}
+    unconsumed = {node: len(node.consumers) for node in graph}
+    ready = [(-priority[node], index[node], node) for node in graph if waiting[node] == 0]
+    heapq.heapify(ready)
+    running: dict[futures.Future, GraphNode] = {}
+    results: dict[GraphNode, Any] = {}
+    workers = set()
+
+    while ready or running:
+        while ready and len(running) < max_workers:
+            node = heapq.heappop(ready)[2]
+            inputs = {dependency: results[dependency] for dependency in node.dependencies}
+            # result is released after submitting of the last consumer
+            for dependency in node.dependencies:
+                unconsumed[dependency] -= 1
+                if unconsumed[dependency] == 0:
+                    del results[dependency]
+            running[submit(node, inputs)] = node
+        statistics.max_running = max(statistics.max_running, len(running))
+        statistics.max_queue_depth = max(statistics.max_queue_depth, len(ready))
+
+        done, _ = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+        for future in done:
+            node = running.pop(future)
+            worker, result = future.result()
+            workers.add(worker)
+            results[node] = graph.share(node, receive(result))
+            statistics.nodes += 1
+            for consumer in node.consumers:
+                waiting[consumer] -= 1
+                if waiting[consumer] == 0:
+                    heapq.heappush(ready, (-priority[consumer], index[consumer], consumer))
+
+    statistics.workers = len(workers)
+    return {root: results[root] for root in graph.roots}
 
 #which execute every task in own thread
 # Use MAX_WORKERS class field as maximum number of threads that can be used to execute.
 class ThreadingRunner(TaskRunner[T]):
     MAX_WORKERS = 5
 
-    def run(self, meta: Meta, task_node: TaskNode[T]) -> T:
-        deps = task_node.dependencies
-        attrs = [get_meta_attr(meta, dep.task.name, {}) for dep in deps]
-        
-        with futures.ThreadPoolExecutor(max_workers = ThreadingRunner.MAX_WORKERS) as ex:
-            maps = list(ex.map(self.run, attrs, deps))
-        
-        #maps_dict = {}
-        #for i, dep in enumerate(deps): 
-        #    maps_dict[dep.task.name] =  maps[i]
-        maps_dict = {deps[i].task.name: maps[i] for i in range(len(maps))}
-        return task_node.task.transform(meta, **maps_dict)
+    @staticmethod
+    def _invoke(node: GraphNode, inputs: dict) -> tuple[int, Any]:
+        return threading.get_ident(), node.invoke(inputs)
+
+    def execute(self, graph: TaskGraph[T]) -> dict[GraphNode[T], T]:
+        self.statistics = RunStatistics()
+        # one pool for the whole graph
+        with futures.ThreadPoolExecutor(max_workers = self.MAX_WORKERS) as ex:
+            return _schedule(graph, lambda node, inputs: ex.submit(self._invoke, node, inputs),
+                             self.MAX_WORKERS, self.statistics)
+
+#which execute every iterator-producing task in own thread as stage of the pipeline.
+#Results of stages are pushed by chunks of chunk_size elements in bounded queues of queue_size chunks.
+#Other tasks are executed sequentially when their inputs are ready.
+#Results of stages aren't cached, so infinite and long iterators flow through the pipeline.
+class StreamingRunner(TaskRunner[T]):
+
+    def __init__(self, queue_size: int = 8, chunk_size: int = 256):
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+
+    def execute(self, graph: TaskGraph[T]) -> dict[GraphNode[T], T]:
+        results = {}
+        for node in graph:
+            result = graph.share(node, node.invoke(results), cache_iterators=False)
+            if isinstance(result, Iterator):
+                result = Stream(result, self.queue_size, self.chunk_size)
+            results[node] = result
+        return {root: results[root] for root in graph.roots}
+
+# tasks are resolved in the worker process once by reference and reused by following calls
+@lru_cache(maxsize=None)
+def _resolve_task(reference: TaskReference) -> Task:
+    return reference.resolve()
+
+
+def _load_tasks(references: tuple[TaskReference, ...]):
+    for reference in references:
+        _resolve_task(reference)
+
+
+def _invoke_task(reference: TaskReference, meta: Meta, inputs: dict[str, Any]) -> Any:
+    inputs = {name: unshare(value) for name, value in inputs.items()}
+    task = _resolve_task(reference)
+    result = task.transform(meta, **inputs)
+    if task.is_async:
+        result = asyncio.run(result)
+    if isinstance(result, Iterator): # generators can't be sent between processes
+        result = list(result)
+    return os.getpid(), share(result)
 
 #which execute every task in own process.
 #Use MAX_WORKERS class field as maximum number of processes that can be used to execute.
+#Tasks are sent to processes by TaskReference, tasks from workspaces which can't be imported by name
+#are executed in the main process. Iterator results are materialized in lists.
+#Large inputs are copied to shared memory once per node, blocks are owned by the runner
+#and unlinked when the graph is finished (or failed).
 class ProcessingRunner(TaskRunner[T]):
     MAX_WORKERS = os.cpu_count()
 
-    def run(self, meta: Meta, task_node: TaskNode[T]) -> T:
-        deps = task_node.dependencies
-        attrs = [get_meta_attr(meta, dep.task.name, {}) for dep in deps]
-        
-        with ThreadPool(ProcessingRunner.MAX_WORKERS) as Pool:
-            starmaps = Pool.starmap(self.run, list(zip(attrs, deps)))
-            
-        starmaps_dict = {deps[i].task.name: starmaps[i] for i in range(len(starmaps))}
-        return task_node.task.transform(meta, **starmaps_dict)    
+    def execute(self, graph: TaskGraph[T]) -> dict[GraphNode[T], T]:
+        self.statistics = RunStatistics()
+        references = {node: TaskReference.of(node.task, node.task_node.workspace) for node in graph}
+        preload = tuple({reference for reference in references.values() if reference is not None})
+        sent: dict[GraphNode, Any] = {} # shared result of the node, reused by all its consumers
+
+        def send(dependency: GraphNode, value: Any) -> Any:
+            if dependency not in sent:
+                sent[dependency] = blocks.share(list(value) if isinstance(value, Iterator) else value)
+            return sent[dependency]
+
+        def submit(node: GraphNode, inputs: dict) -> futures.Future:
+            if references[node] is None or node.is_cached:
+                future = futures.Future()
+                future.set_result((os.getpid(), node.invoke(inputs)))
+                return future
+            return pool.submit(_invoke_task, references[node], node.meta,
+                               {dependency.name: send(dependency, value) for dependency, value in inputs.items()})
+
+        # the pool is shut down before the blocks are unlinked
+        with SharedBlocks() as blocks, futures.ProcessPoolExecutor(self.MAX_WORKERS, initializer=_load_tasks,
+                                                                   initargs=(preload,)) as pool:
+            return _schedule(graph, submit, self.MAX_WORKERS, self.statistics,
+                             lambda result: unshare(result, unlink=True))
     
     
 #which execute every task in own coroutine
+#Independent tasks are executed concurrently. Async tasks are awaited in the event loop,
+#synchronous tasks are executed in the executor (default executor of the loop if None).
 class AsyncRunner(TaskRunner[T]):
-    async def run(self, meta: Meta, task_node: TaskNode[T]) -> T:
-        #attrs = [get_meta_attr(meta, dep.task.name, {}) for dep in deps]
-        #run_dict = {dep.task.name : await self.run(attr, dep) for dep,attr in zip(deps, attrs)}
-        deps = task_node.dependencies
-        _dict = {dep.task.name: await self.run(get_meta_attr(meta, dep.task.name, {}), dep) for dep in deps}
-        return task_node.task.transform(meta, **_dict)
 
+    def __init__(self, executor: Optional[futures.Executor] = None):
+        self.executor = executor
+
+    async def _invoke(self, graph: TaskGraph, node, pending: dict) -> Any:
+        await asyncio.gather(*(pending[dependency] for dependency in node.dependencies))
+        results = {dependency: pending[dependency].result() for dependency in node.dependencies}
+        if node.task.is_async:
+            result = await node.invoke_async(results)
+        else:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, node.invoke, results)
+        return graph.share(node, result)
+
+    async def run(self, meta: Meta, task_node: TaskNode[T], cache: Optional[ResultCache] = None) -> T:
+        graph = TaskGraph(task_node, meta, cache)
+        return (await self.execute(graph))[graph.root]
+
+    async def execute(self, graph: TaskGraph[T]) -> dict[GraphNode[T], T]:
+        pending = {}
+        for node in graph:
+            pending[node] = asyncio.ensure_future(self._invoke(graph, node, pending))
+        try:
+            roots = list(dict.fromkeys(graph.roots))
+            results = await asyncio.gather(*(pending[root] for root in roots))
+            return dict(zip(roots, results))
+        finally:
+            for future in pending.values():
+                future.cancel()
@@ -1,24 +1,133 @@
-from typing import TypeVar, Optional, Generic
+from array import array
+from typing import TypeVar, Optional, Generic, Any
 
+from . import workspace as workspace_module
 from .task import Task
 from .workspace import IWorkspace
 
 T = TypeVar("T")
 
 
+class CyclicDependencyError(Exception):
+    pass
+
+
+def _resolve(task: Task, workspace: IWorkspace) -> tuple[list[tuple[Task, IWorkspace]], list[str]]:
+    resolved, unresolved = [], []
+    for dependency in task.dependencies:
+        if isinstance(dependency, Task): # task object is resolved in its default workspace
+            resolved.append((dependency, IWorkspace.find_default_workspace(dependency)))
+        else:
+            found = workspace.find_task(dependency)
+            if found is None:
+                unresolved.append(dependency)
+            else:
+                resolved.append((found, workspace))
+    return resolved, unresolved
+
+
+class CompiledGraph(Generic[T]):
+    '''
+    Dependency graph of the root task resolved once: every (task, workspace) gets integer id,
+    ids are topologically ordered (dependencies before consumers, root is the last),
+    adjacency lists are stored in flat arrays (offsets of node i are offsets[i]:offsets[i + 1]).
+    Unresolved dependencies and cycles are collected during the same traversal,
+    edges closing cycles aren't included in the graph.
+    The graph is immutable, so it can be built once and shared by all runs.
+    '''
+
+    def __init__(self, root: "TaskNode[T]"):
+        ids: dict[tuple[Task, Any], int] = {}
+        keys: list[tuple[Task, IWorkspace]] = []
+        dependencies: list[list[int]] = []
+        unresolved: list[tuple[str, str]] = []
+        cycles: list[tuple[str, ...]] = []
+
+        # iterative depth-first traversal, id is assigned after all dependencies
+        path: dict[tuple[Task, Any], int] = {} # keys of the current path and their positions
+        root_key = (root.task, root.workspace)
+        stack = [(root_key, *_resolve(*root_key), 0)]
+        path[root_key] = 0
+        while stack:
+            key, resolved, missing, index = stack[-1]
+            if index < len(resolved):
+                stack[-1] = (key, resolved, missing, index + 1)
+                dependency = resolved[index]
+                if dependency in path:
+                    names = [task.name for task, _ in list(path)[path[dependency]:]]
+                    cycles.append(tuple(names + [dependency[0].name]))
+                elif dependency not in ids:
+                    path[dependency] = len(path)
+                    stack.append((dependency, *_resolve(*dependency), 0))
+                continue
+            stack.pop()
+            del path[key]
+            unresolved.extend((key[0].name, name) for name in missing)
+            ids[key] = len(keys)
+            keys.append(key)
+            dependencies.append([ids[d] for d in resolved if d in ids and d not in path])
+
+        self.tasks: tuple[Task, ...] = tuple(task for task, _ in keys)
+        self.workspaces: tuple[IWorkspace, ...] = tuple(workspace for _, workspace in keys)
+        self.unresolved: tuple[tuple[str, str], ...] = tuple(unresolved) # pairs (task name, dependency)
+        self.cycles: tuple[tuple[str, ...], ...] = tuple(cycles) # names of tasks from cycle start to itself
+        self._offsets, self._edges = self._flatten(dependencies)
+        consumers: list[list[int]] = [[] for _ in keys]
+        for i, edges in enumerate(dependencies):
+            for j in edges:
+                consumers[j].append(i)
+        self._consumer_offsets, self._consumer_edges = self._flatten(consumers)
+        self._root = root
+
+    @staticmethod
+    def _flatten(lists: list[list[int]]) -> tuple[memoryview, memoryview]:
+        offsets, edges = array("q", [0]), array("q")
+        for items in lists:
+            edges.extend(items)
+            offsets.append(len(edges))
+        return memoryview(offsets).toreadonly(), memoryview(edges).toreadonly()
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    @property
+    def root(self) -> int:
+        return len(self.tasks) - 1
+
+    @property
+    def has_errors(self) -> bool:
+        return bool(self.unresolved or self.cycles)
+
+    # ids of dependencies of the node in the order of task.dependencies
+    def dependencies(self, node: int) -> memoryview:
+        return self._edges[self._offsets[node]:self._offsets[node + 1]]
+
+    def consumers(self, node: int) -> memoryview:
+        return self._consumer_edges[self._consumer_offsets[node]:self._consumer_offsets[node + 1]]
+
+    def task_node(self, node: int) -> "TaskNode":
+        if node == self.root:
+            return self._root
+        return TaskNode(self.tasks[node], self.workspaces[node])
+
+    def check(self):
+        if self.cycles:
+            raise CyclicDependencyError("; ".join(" -> ".join(cycle) for cycle in self.cycles))
+        if self.unresolved:
+            raise LookupError("Unresolved dependencies: " +
+                              ", ".join(f"{task}: {name}" for task, name in self.unresolved))
+
+
 class TaskNode(Generic[T]):
     #task: Task[T]
     def __init__(self, task: Task[T], workspace: Optional[IWorkspace] = None):
         self.task = task
         self.workspace = IWorkspace.find_default_workspace(task) if workspace is None else workspace
+        self._compiled: Optional[tuple[int, CompiledGraph[T]]] = None # (generation of workspaces, graph)
 
     @property
     def dependencies(self) -> list["TaskNode"]:
-        resolved = []
-        for dependency in self.task.dependencies:
-            if self.workspace.has_task(dependency):
-                resolved.append(TaskNode(self.workspace.find_task(dependency), self.workspace) )
-        return resolved
+        return [TaskNode(task, workspace) for task, workspace in _resolve(self.task, self.workspace)[0]]
 
     @property
     def is_leaf(self) -> bool:
@@ -26,42 +135,50 @@ class TaskNode(Generic[T]):
 
     @property
     def unresolved_dependencies(self) -> list["str"]:
-        unresolved = []
-        for dependency in self.task.dependencies:
-            if not self.workspace.has_task(dependency):
-                unresolved.append(dependency)
-        return unresolved
+        return _resolve(self.task, self.workspace)[1]
+
+    # whole graph of the node is resolved on the first access and again after any change of workspaces
+    @property
+    def compiled(self) -> CompiledGraph[T]:
+        generation = workspace_module._generation
+        if self._compiled is None or self._compiled[0] != generation:
+            self._compiled = (generation, CompiledGraph(self))
+        return self._compiled[1]
 
     @property
     def has_dependence_errors(self) -> bool:
-        if self.unresolved_dependencies:
-            return True
-        for dependency in self.dependencies:
-            if dependency.has_dependence_errors:
-                return True  
-        return False
+        return self.compiled.has_errors
 
 class TaskTree:
-    def __init__(self, root: Task, workspace=None):
-        self.root = TaskNode(root, workspace)
+    '''
+    Index of resolved nodes by (task, workspace): nodes of the root graph and nodes resolved later
+    are stored once, so lookups are dict lookups and compiled graphs of nodes are shared by all executions.
+    '''
+    # tree without root is empty, nodes are added on resolving
+    def __init__(self, root: Optional[Task] = None, workspace=None):
+        self._index: dict[tuple[Task, Any], TaskNode] = {}
+        self.root = None if root is None else self._add(TaskNode(root, workspace))
+
+    @staticmethod
+    def build_node(task: Task[T], workspace: Optional[IWorkspace] = None) -> TaskNode[T]:
+        return TaskNode(task, workspace)
 
-    def find_task(self, task, workspace=None) -> TaskNode[T]:
+    # node and all nodes of its graph are indexed
+    def _add(self, node: TaskNode[T]) -> TaskNode[T]:
+        compiled = node.compiled
+        for i in range(len(compiled)):
+            key = (compiled.tasks[i], compiled.workspaces[i])
+            if key not in self._index:
+                self._index[key] = compiled.task_node(i)
+        return node
+
+    def find_task(self, task, workspace=None) -> Optional[TaskNode[T]]:
         _workspace = IWorkspace.find_default_workspace(task) if workspace is None else workspace
+        return self._index.get((task, _workspace))
 
-        if task == self.root.task and self.root.workspace == _workspace:
-            return self.root
-        else:
-            for dependency in self.root.dependencies:
-                tree = TaskTree(dependency.task, dependency.workspace)
-                node = tree.find_task(task, workspace)
-                if node is not None:
-                    return node
-        return None        
-        
     def resolve_node(self, task: Task[T], workspace: Optional[IWorkspace] = None) -> TaskNode[T]:
         _workspace = IWorkspace.find_default_workspace(task) if workspace is None else workspace
         node = self.find_task(task, _workspace)
         if node is None:
-            return TaskNode(task, workspace)
-        else:
-            return node
\ No newline at end of file
+            node = self._add(TaskNode(task, _workspace))
+        return node
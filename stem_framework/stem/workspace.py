@@ -5,7 +5,9 @@ only basic functionality for working with metadata and organizing the data proce
 functions are placed in separate plugins
 '''
 
+import sys
 from abc import abstractmethod, ABC, ABCMeta
+from dataclasses import dataclass
 from types import ModuleType
 from typing import Optional, Any, TypeVar, Union, Type
 from importlib import import_module
@@ -58,6 +60,10 @@ class ProxyTask(Task[T]):
     def specification(self):
         return self._task.specification
 
+    @property
+    def is_async(self) -> bool:
+        return self._task.is_async
+
     def check_by_meta(self, meta: Meta):
         self._task.check_by_meta(meta)
 
@@ -77,38 +83,46 @@ class IWorkspace(ABC, Named):
     def workspaces(self) -> set["IWorkspace"]:
         pass
     
+    _path_index: Optional["_PathIndex"] = None
+
+    # index is rebuilt if any workspace was changed by add_task/add_workspace or own tasks/workspaces were changed
+    def _index(self) -> "_PathIndex":
+        index = self._path_index
+        if index is None or not index.is_valid(self):
+            index = _PathIndex(self)
+            self._path_index = index
+        return index
+
     # return task from this workspace or from his sub-workspaces
     #task_path is special TaskPath object or string in next format
+    #every segment except the last is name of sub-workspace, the last is name of the task
+    #which is searched in the workspace and then in its sub-workspaces (depth first)
     def find_task(self, task_path: Union[str, TaskPath]) -> Optional[Task]:
-        
         if not isinstance(task_path, TaskPath):
             task_path = TaskPath(task_path)
-        
-        # start recursion again and again and again and again
-        if not task_path.is_leaf: # from TaskPath description : len(self._path) == 1
-            for work_space in self.workspaces: # find appropriate head
-                if work_space.name == task_path.head: # from TaskPath description  :self._path[0]
-                    return work_space.find_task(task_path.sub_path) # TaskPath(self._path[1:])
-            return None
-        # leaf case
-        else:
-            for task_name in self.tasks:
-                if task_name == task_path.name:
-                    return self.tasks[task_name]
-            # why is it possible ?....
-            for work_space in self.workspaces:
-                if work_space.find_task(task_path) is not None:
-                    return work_space.find_task(task_path)
-            return None
-                  
+        workspace = self
+        for head in task_path._path[:-1]:
+            workspace = workspace._index().children.get(head)
+            if workspace is None:
+                return None
+        return workspace._index().leaves.get(task_path.name)
+
     def has_task(self, task_path: Union[str, TaskPath]) -> bool:
         return self.find_task(task_path) is not None
     
-    def get_workspace(self, name) -> Optional["IWorkspace"]:
-        for workspace in self.workspaces:
-            if workspace.name == name:
-                return workspace
+    # return path of the task object in this workspace or in his sub-workspaces
+    def find_path(self, task: Task) -> Optional[TaskPath]:
+        for task_name, _task in self.tasks.items():
+            if _task is task:
+                return TaskPath(task_name)
+        for work_space in self.workspaces:
+            path = work_space.find_path(task)
+            if path is not None:
+                return TaskPath([work_space.name] + path._path)
         return None
+
+    def get_workspace(self, name) -> Optional["IWorkspace"]:
+        return self._index().children.get(name)
     
     def structure(self) -> dict:
         return {
@@ -131,7 +145,7 @@ class IWorkspace(ABC, Named):
     @staticmethod
     def module_workspace(module: ModuleType) -> Type["IWorkspace"]:      
         try: #if hasattr(module, "_stem_workspace"): 
-            return module.__stem_workspace
+            return module._stem_workspace
         # else create module-workspace and save it in this variable         
         except AttributeError: #else:
             tasks, workspaces = {}, []
@@ -139,10 +153,41 @@ class IWorkspace(ABC, Named):
                 _attr = getattr(module, attr)
                 if isinstance(_attr, Task): # which contain tasks
                     tasks[attr] = _attr
-                if isinstance(_attr, type) and issubclass(_attr, IWorkspace): # and workspaces
+                if IWorkspace in type(_attr).__mro__: # and workspaces (isinstance breaks on Workspace metaclass)
                     workspaces.append(_attr)
             setattr(module, "_stem_workspace", LocalWorkspace(module.__name__, tasks, workspaces)) 
-            return module.__stem_workspace
+            return module._stem_workspace
+
+_generation = 0 # incremented on every change of workspaces, indices of the previous generations are rebuilt
+
+
+class _PathIndex:
+    '''
+    Lookup tables of the workspace: sub-workspaces by name (next level of the trie over TaskPath segments)
+    and tasks by bare name, including tasks of sub-workspaces, own tasks have priority.
+    Index is checked by its owner: index of the class-workspace is inherited by its subclasses.
+    '''
+
+    def __init__(self, workspace: IWorkspace):
+        self.owner = workspace
+        self.generation = _generation
+        self.sizes = (len(workspace.tasks), len(workspace.workspaces))
+        self.children: dict[str, IWorkspace] = {}
+        self.leaves: dict[str, Task] = dict(workspace.tasks)
+        for sub_workspace in workspace.workspaces:
+            self.children.setdefault(sub_workspace.name, sub_workspace)
+            for name, task in sub_workspace._index().leaves.items():
+                self.leaves.setdefault(name, task)
+
+    def is_valid(self, workspace: IWorkspace) -> bool:
+        return (self.owner is workspace and self.generation == _generation
+                and self.sizes == (len(workspace.tasks), len(workspace.workspaces)))
+
+
+def _invalidate_indices():
+    global _generation
+    _generation += 1
+
 
 class ILocalWorkspace(IWorkspace):
 
@@ -154,6 +199,17 @@ class ILocalWorkspace(IWorkspace):
     def workspaces(self) -> set["IWorkspace"]:
         return self._workspaces
 
+    def add_task(self, name: str, task: Task):
+        self._tasks = {**self._tasks, name: task}
+        _invalidate_indices()
+
+    def add_workspace(self, workspace: IWorkspace):
+        if isinstance(self._workspaces, set):
+            self._workspaces = self._workspaces | {workspace}
+        else:
+            self._workspaces = [*self._workspaces, workspace]
+        _invalidate_indices()
+
 
 class LocalWorkspace(ILocalWorkspace):
 
@@ -196,5 +252,35 @@ class Workspace(ABCMeta, ILocalWorkspace):
         
         cls._workspaces, cls._tasks, cls._name  = workspaces, tasks, name
         return cls
-    
 
+
+#Picklable reference to the task: module, attribute of the workspace in the module and TaskPath in the workspace.
+#It is used to ship tasks to other processes, which import the workspace instead of unpickling the task.
+@dataclass(frozen=True)
+class TaskReference:
+    module: str
+    workspace: Optional[str] # None for module-workspace
+    path: str
+
+    # return None if the workspace can't be imported by name
+    @staticmethod
+    def of(task: Task, workspace: IWorkspace) -> Optional["TaskReference"]:
+        path = workspace.find_path(task)
+        if path is None:
+            return None
+        module = sys.modules.get(workspace.name)
+        if module is not None and getattr(module, "_stem_workspace", None) is workspace:
+            return TaskReference(workspace.name, None, str(path))
+        module = sys.modules.get(getattr(workspace, "__module__", None))
+        if module is not None and getattr(module, workspace.name, None) is workspace:
+            return TaskReference(module.__name__, workspace.name, str(path))
+        return None
+
+    def resolve_workspace(self) -> IWorkspace:
+        module = import_module(self.module)
+        if self.workspace is None:
+            return IWorkspace.module_workspace(module)
+        return getattr(module, self.workspace)
+
+    def resolve(self) -> Task:
+        return self.resolve_workspace().find_task(self.path)
@@ -0,0 +1,40 @@
+'''
+Messages per second of Envelope round trip (to_bytes + from_bytes) for small control messages
+with JSON and binary meta encoding, and of the meta encoding alone.
+Run: python -m tests.benchmark_binary_meta
+'''
+import json
+import time
+
+from stem import binary_meta
+from stem.envelope import Envelope, MetaEncoder
+
+REPEAT = 20000
+
+MESSAGES = {
+    "stop": dict(command="stop"),
+    "powerfullity": dict(command="powerfullity", powerfullity=4),
+    "run": dict(command="run", task_path="int_workspace.int_scale",
+                meta=dict(int_range=dict(start=0, stop=100, step=1), scale=dict(factor=10)))
+}
+
+
+def rate(function) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        function()
+    return REPEAT / (time.perf_counter() - start)
+
+
+def round_trip(meta, meta_type):
+    return lambda: Envelope.from_bytes(Envelope(meta, meta_type=meta_type).to_bytes())
+
+
+if __name__ == '__main__':
+    for name, meta in MESSAGES.items():
+        encoded = json.dumps(meta, cls=MetaEncoder).encode("utf8")
+        print(f"{name}: envelope json {rate(round_trip(meta, 'json')):,.0f}/s, "
+              f"binary {rate(round_trip(meta, 'binary')):,.0f}/s; "
+              f"json.dumps(cls=MetaEncoder) + loads {rate(lambda: json.loads(json.dumps(meta, cls=MetaEncoder))):,.0f}/s, "
+              f"binary_meta {rate(lambda: binary_meta.loads(binary_meta.dumps(meta))):,.0f}/s; "
+              f"size {len(encoded)} / {len(binary_meta.dumps(meta))} bytes")
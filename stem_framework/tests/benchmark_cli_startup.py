@@ -0,0 +1,59 @@
+'''
+Startup time of stem_cli_main structure with PLUGINS generated plugin workspaces:
+module workspace importing all plugins against JSON manifest with lazily imported plugins.
+Import of each plugin is made expensive (IMPORT_TIME seconds) to model plugins with heavy dependencies.
+Run: python -m tests.benchmark_cli_startup
+'''
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PLUGINS = 30
+IMPORT_TIME = 0.02
+REPEAT = 3
+
+PLUGIN = '''
+import time
+from stem.meta import Meta
+from stem.task import data
+
+time.sleep({import_time}) # heavy imports of the plugin
+
+
+@data
+def {name}_source(meta: Meta) -> int:
+    return 1
+'''
+
+
+def generate(path: Path):
+    for i in range(PLUGINS):
+        (path / f"plugin_{i}.py").write_text(PLUGIN.format(import_time=IMPORT_TIME, name=f"plugin_{i}"))
+    (path / "all_plugins.py").write_text("".join(f"import plugin_{i}\n" for i in range(PLUGINS)))
+    (path / "plugins.json").write_text(json.dumps(dict(name="plugins", workspaces=[
+        dict(name=f"plugin_{i}", module=f"plugin_{i}", tasks=[f"plugin_{i}_source"]) for i in range(PLUGINS)])))
+
+
+def measure(path: Path, *args: str) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "from stem.cli_main import stem_cli_main; stem_cli_main()", *args],
+                       cwd=path, check=True, stdout=subprocess.DEVNULL,
+                       env={"PYTHONPATH": f"{path}:{Path(__file__).parents[1]}"})
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory)
+        generate(path)
+        eager = measure(path, "-w", "all_plugins.py", "structure")
+        lazy = measure(path, "-w", "plugins.json", "structure")
+        run = measure(path, "-w", "plugins.json", "run", "plugin_0_source", "-m", "{}")
+        print(f"{PLUGINS} plugins: structure with imports {eager:.3f} s, lazy structure {lazy:.3f} s, "
+              f"lazy run of one task {run:.3f} s")
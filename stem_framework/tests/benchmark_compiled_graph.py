@@ -0,0 +1,41 @@
+'''
+Build time of CompiledGraph and TaskGraph on generated workspaces:
+layers of WIDTH tasks, each task depends on two tasks of the previous layer,
+so the task tree (with repeated subtrees) is exponential, but the graph is linear.
+Run: python -m tests.benchmark_compiled_graph
+'''
+import time
+
+from stem.task import FunctionTask
+from stem.task_graph import TaskGraph
+from stem.task_tree import TaskNode
+from stem.workspace import LocalWorkspace
+
+WIDTH = 100
+
+
+def generate(size: int) -> tuple[FunctionTask, LocalWorkspace]:
+    tasks = {}
+    for i in range(size):
+        layer, position = divmod(i, WIDTH)
+        dependencies = () if layer == 0 else \
+            (f"t{i - WIDTH}", f"t{(layer - 1) * WIDTH + (position + 1) % WIDTH}")
+        tasks[f"t{i}"] = FunctionTask(f"t{i}", lambda meta, **kwargs: 0, dependencies)
+    root = FunctionTask("root", lambda meta, **kwargs: 0, tuple(f"t{i}" for i in range(size - WIDTH, size)))
+    tasks["root"] = root
+    return root, LocalWorkspace("generated", tasks)
+
+
+if __name__ == '__main__':
+    for size in [1_000, 2_500, 5_000, 10_000]:
+        root, workspace = generate(size)
+        start = time.perf_counter()
+        node = TaskNode(root, workspace)
+        compiled = node.compiled
+        compiled_time = time.perf_counter() - start
+        start = time.perf_counter()
+        graph = TaskGraph(node, {})
+        graph_time = time.perf_counter() - start
+        assert len(compiled) == len(graph) == size + 1 and not compiled.has_errors
+        print(f"{size} nodes: compile {compiled_time:.3f} s ({compiled_time / size * 1e6:.1f} us/node), "
+              f"task graph {graph_time:.3f} s ({graph_time / size * 1e6:.1f} us/node)")
@@ -0,0 +1,40 @@
+'''
+Throughput of Envelope.to_bytes, to_buffer / from_bytes and write_to / read through BytesIO
+for payloads from 1 KB to 1 GB (largest sizes need ~3 GB of memory, limit by argument in MB).
+Run: python -m tests.benchmark_envelope [max_size_mb]
+'''
+import io
+import sys
+import time
+
+from stem.envelope import Envelope
+
+SIZES = [1024, 64 * 1024, 1024 ** 2, 16 * 1024 ** 2, 128 * 1024 ** 2, 1024 ** 3]
+
+
+def throughput(function, size: int) -> float:
+    repeat = max(1, (256 * 1024 ** 2) // size)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return size * repeat / (time.perf_counter() - start) / 1024 ** 2
+
+
+def stream_round_trip(envelope: Envelope):
+    output = io.BytesIO()
+    envelope.write_to(output)
+    output.seek(0)
+    return Envelope.read(output)
+
+
+if __name__ == '__main__':
+    max_size = int(sys.argv[1]) * 1024 ** 2 if len(sys.argv) > 1 else SIZES[-1]
+    Envelope._MAX_SIZE = 2 * 1024 ** 3 # memory mapping is only for files
+    for size in [size for size in SIZES if size <= max_size]:
+        envelope = Envelope(dict(size=size, dtype="uint8"), bytearray(size))
+        buffer = envelope.to_buffer()
+        print(f"{size / 1024:>10,.0f} KB: to_bytes {throughput(envelope.to_bytes, size):,.0f} MB/s, "
+              f"to_buffer {throughput(envelope.to_buffer, size):,.0f} MB/s, "
+              f"from_bytes {throughput(lambda: Envelope.from_bytes(buffer), size):,.0f} MB/s, "
+              f"stream {throughput(lambda: stream_round_trip(envelope), size):,.0f} MB/s")
+        del buffer
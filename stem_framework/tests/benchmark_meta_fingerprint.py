@@ -0,0 +1,50 @@
+'''
+meta_fingerprint against sha256 of json.dumps(sort_keys=True) for small flat meta,
+large nested dict meta and the same tree of frozen dataclass metas (memoized fingerprints).
+Run: python -m tests.benchmark_meta_fingerprint
+'''
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+
+from stem.envelope import MetaEncoder
+from stem.meta import meta_fingerprint
+
+REPEAT = 2000
+
+
+@dataclass(frozen=True)
+class Range:
+    start: int
+    stop: int
+    step: float
+
+
+@dataclass(frozen=True)
+class Group:
+    name: str
+    ranges: tuple
+
+
+def json_hash(meta) -> str:
+    return hashlib.sha256(json.dumps(meta, cls=MetaEncoder, sort_keys=True).encode("utf8")).hexdigest()
+
+
+def rate(function, meta) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        function(meta)
+    return REPEAT / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    flat = dict(start=0, stop=10, step=0.5, name="range")
+    nested = {f"group_{i}": dict(name=f"group_{i}",
+                                 ranges=tuple(dict(start=j, stop=j + 10, step=0.5) for j in range(20)))
+              for i in range(20)}
+    frozen = {key: Group(value["name"], tuple(Range(**r) for r in value["ranges"])) for key, value in nested.items()}
+    frozen_root = Group("root", tuple(frozen.values()))
+    assert meta_fingerprint(frozen) == meta_fingerprint(nested)
+    for name, meta in [("flat", flat), ("nested dict", nested), ("nested frozen", frozen_root)]:
+        print(f"{name}: json {rate(json_hash, meta):,.0f}/s, meta_fingerprint {rate(meta_fingerprint, meta):,.0f}/s")
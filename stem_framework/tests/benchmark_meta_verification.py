@@ -0,0 +1,42 @@
+'''
+Verifications per second of MetaVerification.verify for flat and nested specifications:
+validator compiled on every call (as without the cache) against cached compiled validator.
+Run: python -m tests.benchmark_meta_verification
+'''
+import time
+from dataclasses import dataclass
+
+from stem.meta import MetaVerification, _compile
+
+COUNT = 100_000
+
+
+@dataclass
+class Range:
+    start: int = 0
+    stop: int = 10
+    step: int = 1
+
+
+FLAT = (("start", int), ("stop", int), ("step", (int, float)), ("name", str))
+NESTED = (("range", Range), ("scale", (("factor", float), ("bounds", (("low", float), ("high", float))))))
+
+FLAT_META = dict(start=0, stop=10, step=1, name="range")
+NESTED_META = dict(range=dict(start=0, stop=10, step=1),
+                   scale=dict(factor=2.0, bounds=dict(low=0.0, high=1.0)))
+
+
+def rate(verify, meta, specification) -> float:
+    start = time.perf_counter()
+    for _ in range(COUNT):
+        verify(meta, specification)
+    return COUNT / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    uncached = lambda meta, specification: MetaVerification(*_compile(specification)(meta))
+    for name, meta, specification in [("flat", FLAT_META, FLAT), ("nested", NESTED_META, NESTED)]:
+        assert MetaVerification.verify(meta, specification).checked_success
+        compiled = rate(MetaVerification.verify, meta, specification)
+        every_call = rate(uncached, meta, specification)
+        print(f"{name}: compiled on every call {every_call:,.0f}/s, cached validator {compiled:,.0f}/s")
@@ -0,0 +1,43 @@
+'''
+Speedup of ProcessingRunner over SimpleRunner on CPU-bound fan-out DAG:
+BRANCHES independent data tasks reduced by one task.
+Run: python -m tests.benchmark_processing_runner
+'''
+import os
+import time
+
+from stem.meta import Meta, get_meta_attr
+from stem.task import FunctionDataTask, FunctionTask
+from stem.task_master import TaskMaster
+from stem.task_runner import SimpleRunner, ProcessingRunner, TaskRunner
+
+BRANCHES = 16
+
+
+def _branch(meta: Meta) -> int:
+    return sum(i * i % 7 for i in range(get_meta_attr(meta, "size", 2_000_000)))
+
+
+def _total(meta: Meta, **branches: int) -> int:
+    return sum(branches.values())
+
+
+for _i in range(BRANCHES):
+    globals()[f"branch_{_i}"] = FunctionDataTask(f"branch_{_i}", _branch)
+
+total = FunctionTask("total", _total, tuple(f"branch_{i}" for i in range(BRANCHES)))
+
+
+def measure(runner: TaskRunner) -> float:
+    start = time.perf_counter()
+    TaskMaster(runner).execute({}, total).data
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    simple = measure(SimpleRunner())
+    print(f"SimpleRunner: {simple:.2f} s")
+    for workers in sorted({1, 2, 4, os.cpu_count()}):
+        ProcessingRunner.MAX_WORKERS = workers
+        elapsed = measure(ProcessingRunner())
+        print(f"ProcessingRunner({workers}): {elapsed:.2f} s, speedup {simple / elapsed:.2f}")
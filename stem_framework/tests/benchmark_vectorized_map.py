@@ -0,0 +1,32 @@
+'''
+Per-element MapTask/FilterTask against vectorized mode on float_range-like source.
+Run: python -m tests.benchmark_vectorized_map
+'''
+import time
+
+import numpy as np
+
+from stem.task import MapTask, FilterTask
+
+SIZE = 5_000_000
+
+
+def measure(vectorized: bool, source) -> float:
+    scale = MapTask(lambda x: x * 10, "source", vectorized=vectorized)
+    positive = FilterTask(lambda x: x > 5, "map_source", vectorized=vectorized)
+    start = time.perf_counter()
+    values = positive.transform({}, map_source=scale.transform({}, source=source))
+    if vectorized:
+        sum(len(chunk) for chunk in values)
+    else:
+        sum(1 for _ in values)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    array = np.arange(0, 1, 1 / SIZE, dtype="f")
+    for name, source in [("array", lambda: array), ("iterator", lambda: iter(array))]:
+        per_element = measure(False, source())
+        vectorized = measure(True, source())
+        print(f"{name}: per-element {per_element:.3f} s, vectorized {vectorized:.3f} s, "
+              f"speedup {per_element / vectorized:.1f}")
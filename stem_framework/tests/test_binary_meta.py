@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+from unittest import TestCase
+
+import numpy as np
+
+from stem import binary_meta
+from stem.envelope import Envelope
+from stem.meta import meta_view
+
+
+@dataclass
+class Range:
+    start: int
+    stop: int
+
+
+class BinaryMetaTest(TestCase):
+
+    def test_round_trip(self):
+        metas = [
+            None, True, 0, -1, 2 ** 63 - 1, -2 ** 63, 2 ** 100, -2 ** 70, 0.5, "", "строка", "x" * 1000,
+            b"\x00\xff", [1, [2, "3"]], (1, (2.0, None)), {"command": "run", "meta": {"a": [1, 2]}, 1: False},
+        ]
+        for meta in metas:
+            with self.subTest(repr(meta)[:20]):
+                decoded = binary_meta.loads(binary_meta.dumps(meta))
+                self.assertEqual(meta, decoded)
+                self.assertIs(type(meta), type(decoded))
+
+    def test_numpy(self):
+        for value in [np.float32(0.5), np.int64(-3), np.uint8(255), np.bool_(True), np.complex128(1j)]:
+            decoded = binary_meta.loads(binary_meta.dumps(value))
+            self.assertEqual(value, decoded)
+            self.assertEqual(value.dtype, decoded.dtype)
+        array = np.arange(12, dtype=">i4").reshape(3, 4)[:, ::2]
+        decoded = binary_meta.loads(binary_meta.dumps(dict(array=array)))["array"]
+        np.testing.assert_array_equal(array, decoded)
+        self.assertEqual(array.dtype, decoded.dtype)
+        with self.assertRaises(TypeError):
+            binary_meta.dumps(np.array([object()]))
+
+    def test_metas(self):
+        self.assertEqual(dict(start=0, stop=10), binary_meta.loads(binary_meta.dumps(Range(0, 10))))
+        view = meta_view(dict(a=dict(b=1), c=2)).without("c")
+        self.assertEqual(dict(a=dict(b=1)), binary_meta.loads(binary_meta.dumps(view)))
+        with self.assertRaises(TypeError):
+            binary_meta.dumps(object())
+
+    def test_malformed(self):
+        buffer = binary_meta.dumps(dict(command="powerfullity"))
+        unhashable_key = bytes([0xE1, 0xF0, 0x81]) # {[]: 1}
+        object_array = b"a\x02|O\x01" + (1).to_bytes(8, "big") + bytes(8)
+        unknown_dtype = b"n\x03xyz"
+        for malformed in [buffer[:-1], buffer + b"N", b"?", b"", unhashable_key, object_array, unknown_dtype]:
+            with self.assertRaises(ValueError):
+                binary_meta.loads(malformed)
+
+    def test_envelope(self):
+        meta = dict(command="run", shape=(3, 4), scale=np.float64(0.5), key=b"\x01")
+        buffer = Envelope(meta, b"data", meta_type="binary").to_bytes()
+        self.assertEqual(b"b", buffer[6:7])
+        envelope = Envelope.from_bytes(buffer)
+        self.assertEqual("binary", envelope.meta_type)
+        self.assertEqual(meta, envelope.meta)
+        self.assertEqual(b"data", envelope.data)
+        with self.assertRaises(ValueError):
+            Envelope(meta, meta_type="xml")
@@ -0,0 +1,240 @@
+import itertools
+import os
+import tempfile
+from collections import Counter
+from typing import Iterator
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from stem.cache import DiskCache, MemoryCache, MISSING, sizeof
+from stem.envelope import Envelope
+from stem.meta import Meta, get_meta_attr
+from stem.task import data, task
+from stem.task_master import TaskMaster
+from stem.task_runner import SimpleRunner, ThreadingRunner
+from stem.workspace import LocalWorkspace
+
+calls = Counter()
+
+
+@data
+def numbers(meta: Meta) -> Iterator[int]:
+    calls["numbers"] += 1
+    return iter(range(get_meta_attr(meta, "stop", 10)))
+
+
+@data
+def weights(meta: Meta) -> np.ndarray:
+    calls["weights"] += 1
+    return np.ones(10)
+
+
+@task
+def weighted(meta: Meta, numbers: Iterator[int], weights: np.ndarray) -> float:
+    calls["weighted"] += 1
+    return float(np.dot(np.fromiter(numbers, float), weights[:get_meta_attr(meta, "size", 10)]))
+
+
+workspace = LocalWorkspace("cached", dict(numbers=numbers, weights=weights, weighted=weighted))
+
+
+class DiskCacheTest(TestCase):
+
+    def setUp(self) -> None:
+        calls.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(self.directory.name)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_rerun(self):
+        for runner in [SimpleRunner(), ThreadingRunner()]:
+            with self.subTest(runner.__class__.__name__):
+                calls.clear()
+                self.cache.clear()
+                master = TaskMaster(runner, cache=self.cache)
+                self.assertEqual(45.0, master.execute({}, weighted, workspace).data)
+                self.assertEqual(45.0, master.execute({}, weighted, workspace).data)
+                self.assertEqual(Counter(numbers=1, weights=1, weighted=1), calls)
+
+    def test_meta_slice(self):
+        master = TaskMaster(SimpleRunner(), cache=self.cache)
+        master.execute({}, weighted, workspace).data
+        self.assertEqual(3, self.cache.misses)
+        self.assertEqual(3.0, master.execute(dict(size=3, numbers=dict(stop=3)), weighted, workspace).data)
+        # weights are reused, numbers and weighted are recomputed
+        self.assertEqual(Counter(numbers=2, weights=1, weighted=2), calls)
+        self.assertEqual(1, self.cache.hits)
+
+    def test_meta_without_fingerprint(self):
+        class Tag:
+            def __repr__(self):
+                return "Tag()"
+
+        master = TaskMaster(SimpleRunner(), cache=self.cache)
+        meta = dict(size=3, numbers=dict(stop=3))
+        self.assertEqual(3.0, master.execute(dict(meta, tag=Tag()), weighted, workspace).data)
+        self.assertEqual(3.0, master.execute(dict(meta, tag=Tag()), weighted, workspace).data)
+        # slices of dependencies are cached, result with the tag isn't
+        self.assertEqual(Counter(numbers=1, weights=1, weighted=2), calls)
+
+    def test_reopen(self):
+        TaskMaster(SimpleRunner(), cache=self.cache).execute({}, weighted, workspace).data
+        cache = DiskCache(self.directory.name)
+        self.assertEqual(45.0, TaskMaster(SimpleRunner(), cache=cache).execute({}, weighted, workspace).data)
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(0, cache.misses)
+
+    def test_edited_task(self):
+        master = TaskMaster(SimpleRunner(), cache=self.cache)
+        master.execute({}, weighted, workspace).data
+
+        @data
+        def weights(meta: Meta) -> np.ndarray:
+            calls["weights"] += 1
+            return np.full(10, 2.0)
+
+        edited = LocalWorkspace("cached", dict(numbers=numbers, weights=weights, weighted=weighted))
+        self.assertEqual(90.0, master.execute({}, weighted, edited).data)
+        # only edited task and its downstream are recomputed
+        self.assertEqual(Counter(numbers=1, weights=2, weighted=2), calls)
+        self.assertEqual(45.0, master.execute({}, weighted, workspace).data)
+        self.assertEqual(Counter(numbers=1, weights=2, weighted=2), calls)
+
+    def test_values(self):
+        for value in [b"0123", np.arange(12).reshape(3, 4), dict(a=[1, 2]), None]:
+            with self.subTest(repr(value)):
+                self.cache.put("key", value)
+                np.testing.assert_equal(value, self.cache.get("key"))
+        self.assertEqual([0, 1], self.cache.put("iterator", iter(range(2))))
+        self.assertEqual([0, 1], self.cache.get("iterator"))
+        self.assertIs(MISSING, self.cache.get("absent"))
+
+    def test_mmap(self):
+        max_size = Envelope._MAX_SIZE
+        Envelope._MAX_SIZE = 1024
+        try:
+            array = np.arange(10000)
+            self.cache.put("array", array)
+            np.testing.assert_array_equal(array, self.cache.get("array"))
+            with open(self.cache._file("array"), "rb") as file:
+                self.assertIsInstance(Envelope.read(file).data, memoryview)
+        finally:
+            Envelope._MAX_SIZE = max_size
+
+    def test_eviction(self):
+        cache = DiskCache(self.directory.name, max_size=3000)
+        for key in ["a", "b", "c"]:
+            cache.put(key, np.zeros(100))
+        cache.get("a")
+        cache.put("d", np.zeros(100))
+        self.assertLessEqual(cache.size, 3000)
+        self.assertIs(MISSING, cache.get("b"))
+        self.assertIsNot(MISSING, cache.get("a"))
+
+    def test_compression(self):
+        cache = DiskCache(self.directory.name, compression="zlib")
+        array = np.zeros((100, 100))
+        cache.put("array", array)
+        self.assertLess(cache.size, array.nbytes / 10)
+        np.testing.assert_array_equal(array, DiskCache(self.directory.name).get("array"))
+
+    def test_compressed_values(self):
+        for compression in [None, "zlib"]:
+            with self.subTest(compression):
+                cache = DiskCache(self.directory.name, compression=compression)
+                cache.put("bytes", bytes(10000))
+                cache.put("array", np.zeros(1000))
+                self.assertIs(bytes, type(cache.get("bytes")))
+                self.assertFalse(cache.get("array").flags.writeable)
+
+    def test_compressed_max_size(self):
+        cache = DiskCache(self.directory.name, compression="zlib")
+        with patch.object(Envelope, "_MAX_SIZE", 1000):
+            cache.put("array", np.zeros(1000))
+            np.testing.assert_array_equal(np.zeros(1000), cache.get("array"))
+        self.assertGreaterEqual(cache.size, 8000) # stored without compression
+        self.assertEqual([cache._file("array").name], os.listdir(self.directory.name))
+
+    def test_failed_write(self):
+        with patch.object(Envelope, "write_to", side_effect=OSError("No space left on device")):
+            self.assertEqual(b"data", self.cache.put("bytes", b"data"))
+        self.assertIs(MISSING, self.cache.get("bytes"))
+        self.assertEqual([], os.listdir(self.directory.name))
+
+
+class MemoryCacheTest(TestCase):
+
+    def setUp(self) -> None:
+        calls.clear()
+
+    def test_replay(self):
+        master = TaskMaster(SimpleRunner(), cache=MemoryCache())
+        for i in range(3):
+            with self.subTest(i):
+                result = master.execute({}, numbers, workspace).data
+                self.assertEqual(list(range(10)), list(result))
+        self.assertEqual(Counter(numbers=1), calls)
+
+    def test_rerun(self):
+        cache = MemoryCache()
+        master = TaskMaster(ThreadingRunner(), cache=cache)
+        for i in range(3):
+            self.assertEqual(45.0, master.execute({}, weighted, workspace).data)
+        self.assertEqual(Counter(numbers=1, weights=1, weighted=1), calls)
+        self.assertEqual(2, cache.hits)
+
+    def test_read_only(self):
+        cache = MemoryCache()
+        array = np.zeros(10)
+        self.assertIs(array, cache.put("array", array))
+        array[0] = 1 # the producer keeps own writable array
+        cached = cache.get("array")
+        self.assertEqual(0, cached[0])
+        with self.assertRaises(ValueError):
+            cached[0] = 1
+        self.assertIs(cached, cache.get("array"))
+
+    def test_mutable(self):
+        cache = MemoryCache()
+        value = [1, 2]
+        self.assertIs(value, cache.put("list", value))
+        value.append(3)
+        self.assertEqual([1, 2], cache.get("list"))
+        # hits share the stored value without copying
+        self.assertIs(cache.get("list"), cache.get("list"))
+        cache.put("iterator", iter([dict(a=1)]))
+        self.assertEqual([dict(a=1)], list(cache.get("iterator")))
+        cache.put("tuple", (1, "a"))
+        self.assertIs(cache.get("tuple"), cache.get("tuple"))
+
+    def test_budget(self):
+        cache = MemoryCache(max_bytes=3 * sizeof(np.zeros(100)))
+        for key in ["a", "b", "c"]:
+            cache.put(key, np.zeros(100))
+        cache.get("a")
+        cache.put("d", np.zeros(100))
+        self.assertEqual(3, len(cache))
+        self.assertLessEqual(cache.size, cache.max_bytes)
+        self.assertIs(MISSING, cache.get("b"))
+        self.assertIsNot(MISSING, cache.get("a"))
+
+        cache.put("large", np.zeros(1000))
+        self.assertIs(MISSING, cache.get("large"))
+
+    def test_large_iterator(self):
+        cache = MemoryCache(max_bytes=1000)
+        consumed = []
+
+        def numbers():
+            for i in itertools.count():
+                consumed.append(i)
+                yield i
+
+        result = cache.put("infinite", numbers())
+        self.assertLess(len(consumed), 100) # consumed only until the budget is exceeded
+        self.assertEqual(list(range(200)), list(itertools.islice(result, 200)))
+        self.assertIs(MISSING, cache.get("infinite"))
@@ -1,7 +1,13 @@
+import asyncio
 import io
-from unittest import TestCase
+import zlib
+from unittest import TestCase, IsolatedAsyncioTestCase
+from unittest.mock import patch, Mock, AsyncMock
 
-from stem.envelope import Envelope
+import numpy as np
+
+from stem.envelope import Envelope, AsyncPayload, Compression, AUTO, register_compression, \
+    unregister_compression
 
 
 class TestEnvelope(TestCase):
@@ -14,4 +20,193 @@ class TestEnvelope(TestCase):
         data = self.envelope.to_bytes()
         envelope = Envelope.from_bytes(data)
         self.assertDictEqual(self.envelope.meta, envelope.meta)
-        self.assertEqual(self.envelope.data, envelope.data)
\ No newline at end of file
+        self.assertEqual(self.envelope.data, envelope.data)
+
+    def test_zero_copy(self):
+        self.assertIs(bytes, type(self.envelope.to_bytes()))
+        buffer = self.envelope.to_buffer()
+        self.assertEqual(self.envelope.to_bytes(), buffer)
+        envelope = Envelope.from_bytes(buffer)
+        self.assertIsInstance(envelope.data, memoryview)
+        self.assertIs(buffer, envelope.data.obj)
+        self.assertTrue(envelope.data.readonly)
+
+    def test_stream(self):
+        output = io.BytesIO()
+        self.envelope.write_to(output)
+        self.assertEqual(self.envelope.to_bytes(), output.getvalue())
+        envelope = Envelope.read(io.BytesIO(output.getvalue()))
+        self.assertDictEqual(self.envelope.meta, envelope.meta)
+        self.assertEqual(self.data, envelope.data)
+
+    def test_array_data(self):
+        data = np.arange(12, dtype=np.float64).reshape(3, 4)
+        envelope = Envelope.from_bytes(Envelope(dict(), data).to_bytes())
+        self.assertEqual(data.nbytes, envelope.data.nbytes)
+        np.testing.assert_array_equal(data, np.frombuffer(envelope.data).reshape(3, 4))
+
+    def test_malformed(self):
+        buffer = self.envelope.to_bytes()
+        for malformed in [buffer[:10], b"!!" + buffer[2:], buffer[:-1]]:
+            with self.assertRaises(ValueError):
+                Envelope.from_bytes(malformed)
+
+
+class TestCompression(TestCase):
+
+    def setUp(self) -> None:
+        self.data = np.repeat(np.arange(100, dtype=np.float64), 100).tobytes()
+
+    def test_round_trip(self):
+        for compression, code in [("zlib", b"z"), ("lzma", b"x"), ("bz2", b"b")]:
+            with self.subTest(compression):
+                buffer = Envelope(dict(a=1), self.data, compression).to_bytes()
+                self.assertLess(len(buffer), len(self.data) / 10)
+                self.assertEqual(code, buffer[7:8])
+                for envelope in [Envelope.from_bytes(buffer), Envelope.read(io.BytesIO(buffer))]:
+                    self.assertEqual(compression, envelope.compression)
+                    self.assertDictEqual(dict(a=1), envelope.meta)
+                    self.assertEqual(self.data, envelope.data)
+
+    def test_auto(self):
+        random = np.random.default_rng(0).bytes(len(self.data))
+        cases = [(self.data, "zlib"), (random, None), (self.data[:100], None)]
+        for data, compression in cases:
+            envelope = Envelope.from_bytes(Envelope(dict(), data, AUTO).to_bytes())
+            self.assertEqual(compression, envelope.compression)
+            self.assertEqual(data, envelope.data)
+
+    def test_uncompressed_header(self):
+        self.assertEqual(b"DF02..", Envelope(dict(), self.data).to_bytes()[2:8])
+
+    def test_registry(self):
+        register_compression(Compression("raw_zlib", b"r", lambda: zlib.compressobj(wbits=-15),
+                                         lambda: zlib.decompressobj(wbits=-15)))
+        self.addCleanup(unregister_compression, "raw_zlib")
+        envelope = Envelope.from_bytes(Envelope(dict(), self.data, "raw_zlib").to_bytes())
+        self.assertEqual("raw_zlib", envelope.compression)
+        self.assertEqual(self.data, envelope.data)
+        with self.assertRaises(ValueError):
+            register_compression(Compression("other", b"z", zlib.compressobj, zlib.decompressobj))
+        with self.assertRaises(ValueError):
+            Envelope(dict(), self.data, "unknown")
+
+    def test_max_size(self):
+        for compression in ["zlib", "lzma", "bz2"]:
+            with self.subTest(compression):
+                buffer = Envelope(dict(), bytes(100000), compression).to_bytes()
+                with patch.object(Envelope, "_MAX_SIZE", 100000):
+                    self.assertEqual(bytes(100000), Envelope.from_bytes(buffer).data)
+                with patch.object(Envelope, "_MAX_SIZE", 99999), self.assertRaises(ValueError):
+                    Envelope.from_bytes(buffer)
+                with patch.object(Envelope, "_MAX_SIZE", 1000), self.assertRaises(ValueError):
+                    Envelope.read(io.BytesIO(buffer))
+        with patch.object(Envelope, "_MAX_SIZE", 1000), self.assertRaises(ValueError):
+            Envelope(dict(), bytes(100000), "zlib").to_bytes()
+        with patch.object(Envelope, "_MAX_SIZE", 1000):
+            self.assertEqual(b"DF02..", Envelope(dict(), bytes(100000), AUTO).to_bytes()[2:8])
+
+    def test_max_length(self):
+        with patch.object(Envelope, "_MAX_LENGTH", 1000):
+            self.assertEqual(1000, len(Envelope(dict(), bytes(1000)).to_bytes()) - Envelope._HEADER.size - 4)
+            with self.assertRaisesRegex(ValueError, "Data of envelope is 1001 bytes"):
+                Envelope(dict(), bytes(1001)).to_bytes()
+            with self.assertRaisesRegex(ValueError, "Meta of envelope"):
+                Envelope(dict(key="x" * 1000)).to_bytes()
+            output = io.BytesIO()
+            with self.assertRaises(ValueError):
+                Envelope(dict(), bytes(1001)).write_to(output)
+            self.assertEqual(b"", output.getvalue())
+
+    def test_truncated(self):
+        buffer = Envelope(dict(), self.data, "zlib").to_bytes()
+        truncated = buffer[:-12] + buffer[-2:] # header keeps the old length
+        with self.assertRaises(ValueError):
+            Envelope.read(io.BytesIO(truncated))
+
+
+class TestAsyncEnvelope(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.data = bytes(range(256)) * 100
+        self.envelope = Envelope(dict(a=1, b="b"), self.data)
+
+    @staticmethod
+    def reader(buffer) -> asyncio.StreamReader:
+        reader = asyncio.StreamReader()
+        reader.feed_data(buffer)
+        reader.feed_eof()
+        return reader
+
+    # bytes written by async_write_to through the loopback connection
+    async def written(self, envelope: Envelope, chunk_size: int) -> bytes:
+        received = asyncio.get_running_loop().create_future()
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            received.set_result(await reader.read())
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        async with server:
+            _, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            await envelope.async_write_to(writer, chunk_size)
+            writer.close()
+            await writer.wait_closed()
+            return await received
+
+    async def test_read(self):
+        envelope = await Envelope.async_read(self.reader(self.envelope.to_bytes()), chunk_size=1000)
+        self.assertDictEqual(self.envelope.meta, envelope.meta)
+        self.assertEqual(self.data, envelope.data)
+
+    async def test_write(self):
+        self.assertEqual(self.envelope.to_bytes(), await self.written(self.envelope, 1000))
+
+    async def test_stream(self):
+        reader = self.reader(self.envelope.to_bytes() * 2)
+        envelope = await Envelope.async_read(reader, stream=True, chunk_size=1000)
+        self.assertIsInstance(envelope.data, AsyncPayload)
+        self.assertEqual(len(self.data), envelope.data.nbytes)
+        chunks = [chunk async for chunk in envelope.data]
+        self.assertEqual(1000, max(len(chunk) for chunk in chunks))
+        self.assertEqual(self.data, b"".join(chunks))
+        self.assertEqual(self.data, (await Envelope.async_read(reader)).data) # stream is at the next envelope
+
+    async def test_forward(self):
+        received = await Envelope.async_read(self.reader(self.envelope.to_bytes()), stream=True, chunk_size=1000)
+        forwarded = Envelope(received.meta, received.data)
+        self.assertEqual(self.envelope.to_bytes(), await self.written(forwarded, 1000))
+
+    async def test_compressed_stream(self):
+        data = bytes(100000)
+        buffer = Envelope(dict(), data, "zlib").to_bytes()
+        envelope = await Envelope.async_read(self.reader(buffer), stream=True, chunk_size=10)
+        self.assertEqual(len(buffer) - 20, envelope.data.nbytes) # header, meta {} and ending
+        self.assertEqual(data, b"".join([chunk async for chunk in envelope.data]))
+        # forwarded without recompression
+        received = await Envelope.async_read(self.reader(buffer), stream=True, chunk_size=10)
+        self.assertEqual(buffer, await self.written(Envelope(received.meta, received.data), 10))
+        envelope = await Envelope.async_read(self.reader(await self.written(Envelope(dict(), data, "lzma"), 100)))
+        self.assertEqual(data, envelope.data)
+
+    async def test_max_size(self):
+        buffer = Envelope(dict(), bytes(100000), "zlib").to_bytes()
+        with patch.object(Envelope, "_MAX_SIZE", 1000), self.assertRaises(ValueError):
+            await Envelope.async_read(self.reader(buffer), chunk_size=10)
+        envelope = await Envelope.async_read(self.reader(buffer), stream=True, chunk_size=10)
+        with patch.object(Envelope, "_MAX_SIZE", 1000), self.assertRaises(ValueError):
+            async for _ in envelope.data:
+                pass
+
+    async def test_max_length(self):
+        writer = Mock(drain=AsyncMock())
+        with patch.object(Envelope, "_MAX_LENGTH", 1000), self.assertRaises(ValueError):
+            await Envelope(dict(), bytes(1001)).async_write_to(writer)
+        payload = AsyncPayload(Envelope._read_chunks_async(self.reader(b""), 0, 10), 2**32)
+        with self.assertRaises(ValueError):
+            await Envelope(dict(), payload).async_write_to(writer)
+        writer.write.assert_not_called()
+
+    async def test_truncated(self):
+        with self.assertRaises(asyncio.IncompleteReadError):
+            await Envelope.async_read(self.reader(self.envelope.to_bytes()[:-100]))
@@ -0,0 +1,108 @@
+import threading
+from functools import partial
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from stem.cache import node_key
+from stem.fingerprint import fingerprint, combine, _is_library, _library_version
+from stem.meta import Meta
+from stem.task import data, task, MapTask
+
+SCALE = 2
+WEIGHTS = [1, 2, 3]
+
+
+class Model:
+    def __init__(self, scale):
+        self.scale = scale
+
+
+def helper(x):
+    return x * SCALE
+
+
+def make_function(source: str, name: str = "f"):
+    namespace = dict(helper=helper)
+    exec(source, namespace)
+    return namespace[name]
+
+
+class FingerprintTest(TestCase):
+
+    def test_function(self):
+        f = make_function("def f(x):\n    return x + 1")
+        self.assertEqual(fingerprint(f), fingerprint(make_function("def f(x):\n    return x + 1")))
+        self.assertEqual(fingerprint(f), fingerprint(make_function("\n\n\ndef f(x):\n    return x + 1")))
+        self.assertNotEqual(fingerprint(f), fingerprint(make_function("def f(x):\n    return x + 2")))
+        self.assertNotEqual(fingerprint(f), fingerprint(make_function("def f(y):\n    return y + 1")))
+
+    def test_dependencies_of_function(self):
+        global SCALE
+        f = make_function("def f(x):\n    return helper(x)")
+        before = fingerprint(f)
+        SCALE = 3
+        try:
+            self.assertNotEqual(before, fingerprint(f))
+        finally:
+            SCALE = 2
+        self.assertEqual(before, fingerprint(f))
+
+    def test_mutable_values(self):
+        def closure(model):
+            return lambda x: x * model.scale
+
+        self.assertEqual(fingerprint(closure(Model(1))), fingerprint(closure(Model(1))))
+        self.assertNotEqual(fingerprint(closure(Model(1))), fingerprint(closure(Model(2))))
+        f = make_function("def f(x):\n    return x * WEIGHTS[0]")
+        f.__globals__["WEIGHTS"] = WEIGHTS
+        before = fingerprint(f)
+        WEIGHTS.append(4)
+        try:
+            self.assertNotEqual(before, fingerprint(f))
+        finally:
+            WEIGHTS.pop()
+        self.assertEqual(before, fingerprint(f))
+
+    def test_unpicklable(self):
+        lock = threading.Lock()
+        self.assertIsNone(fingerprint(lambda: lock))
+        self.assertIsNone(MapTask(lambda x: lock, "source").fingerprint)
+        self.assertIsNone(node_key("workspace.map_source", None, {}, []))
+
+    def test_values(self):
+        self.assertEqual(fingerprint(np.arange(3)), fingerprint(np.arange(3)))
+        self.assertNotEqual(fingerprint(np.arange(3)), fingerprint(np.arange(4)))
+        self.assertEqual(fingerprint({"a": 1, "b": {2, 3}}), fingerprint({"b": {3, 2}, "a": 1}))
+        self.assertNotEqual(fingerprint(partial(helper, 1)), fingerprint(partial(helper, 2)))
+        recursive = []
+        recursive.append(recursive)
+        fingerprint(recursive)
+
+    def test_task(self):
+        @data
+        def source(meta: Meta) -> list:
+            return [1, 2]
+
+        @task
+        def sink(meta: Meta, source: list) -> int:
+            return sum(source)
+
+        self.assertNotEqual(source.fingerprint, sink.fingerprint)
+        self.assertEqual(MapTask(helper, source).fingerprint, MapTask(helper, source).fingerprint)
+        self.assertNotEqual(MapTask(helper, source).fingerprint, MapTask(lambda x: x, source).fingerprint)
+        self.assertNotEqual(combine(source.fingerprint, [sink.fingerprint]), combine(source.fingerprint))
+
+    def test_task_fingerprint_cached(self):
+        task = MapTask(helper, "source")
+        computed = task.fingerprint
+        self.assertIs(computed, task.fingerprint)
+        self.assertEqual(computed, MapTask(helper, "source").fingerprint)
+
+    def test_library(self):
+        self.assertTrue(_is_library(np.sum))
+        self.assertIn("numpy==", _library_version("numpy"))
+        # installed plugins are user code: edits of their tasks change fingerprints
+        with patch("stem.fingerprint._plugin_packages", return_value=frozenset({"numpy"})):
+            self.assertFalse(_is_library(np.sum))
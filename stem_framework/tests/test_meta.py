@@ -1,7 +1,12 @@
 import dataclasses
+import json
+from typing import Optional
 from unittest import TestCase
 
-from stem.meta import MetaVerification, update_meta, get_meta_attr
+import numpy as np
+
+from stem.meta import MetaVerification, MetaFieldError, MetaView, SpecificationError, compile_specification, \
+    meta_fingerprint, update_meta, get_meta_attr, verify_batch, _validators, _MAX_VALIDATORS
 
 
 @dataclasses.dataclass
@@ -11,6 +16,11 @@ class Example:
     c: list = dataclasses.field(default_factory=list)
 
 
+@dataclasses.dataclass(frozen=True)
+class Frozen:
+    x: int = 0
+
+
 class CoreTest(TestCase):
 
     def test_get_meta_attr(self):
@@ -43,4 +53,135 @@ class CoreTest(TestCase):
         self.assertFalse(verification.checked_success)
 
         verification = MetaVerification.verify(example_dict, specification)
-        self.assertFalse(verification.checked_success)
\ No newline at end of file
+        self.assertFalse(verification.checked_success)
+
+    def test_verify_nested(self):
+        specification = (("range", (("start", int), ("stop", int))), ("example", Example), ("name", Optional[str]))
+        verification = MetaVerification.verify(dict(range=dict(start=0, stop=1), example=Example(), name=None),
+                                               specification)
+        self.assertTrue(verification.checked_success)
+
+        verification = MetaVerification.verify(dict(range=dict(start=0, stop="1"), example=dict(a=1)), specification)
+        self.assertFalse(verification.checked_success)
+        nested, example, name = verification.error
+        self.assertEqual([MetaFieldError("stop", (int,), str, "1")], list(nested.error))
+        self.assertEqual(["b", "c"], [error.required_key for error in example.error])
+        self.assertEqual(MetaFieldError("name", (str, type(None))), name)
+
+        with self.assertRaises(SpecificationError):
+            MetaVerification.verify({}, (("a", 1),))
+
+    def test_compiled_once(self):
+        specification = (("a", int),)
+        self.assertIs(compile_specification(specification), compile_specification(specification))
+        self.assertEqual((), compile_specification(specification)(dict(a=1)))
+
+    def test_compiled_bounded(self):
+        specification = (("a", int),)
+        validator = compile_specification(specification)
+        for i in range(_MAX_VALIDATORS):
+            compile_specification(((f"a{i}", int),))
+            compile_specification(specification)
+        self.assertLessEqual(len(_validators), _MAX_VALIDATORS)
+        self.assertIs(validator, compile_specification(specification))
+
+    def test_verify_batch(self):
+        specification = (("start", int), ("stop", int), ("step", (int, float)), ("range", (("size", int),)))
+        metas = [dict(start=i, stop=10, step=1, range=dict(size=i)) for i in range(5)]
+        metas[3]["stop"] = "10"
+        result = MetaVerification.verify_batch(metas, specification)
+        self.assertEqual([True, True, True, False, True], result.passed.tolist())
+        self.assertEqual([3], list(result.errors))
+        self.assertEqual("stop", result.errors[3].error[0].required_key)
+
+        columns = dict(start=np.arange(5), stop=np.full(5, 10), step=[1, 0.5, 1, None, 2],
+                       range=dict(size=np.arange(5)))
+        result = MetaVerification.verify_batch(columns, specification)
+        self.assertEqual([True, True, True, False, True], result.passed.tolist())
+        self.assertEqual([MetaFieldError("step", (int, float), type(None), None)], list(result.errors[3].error))
+        self.assertFalse(result.checked_success)
+
+        columns["stop"] = np.linspace(0, 1, 5)
+        self.assertEqual(5, len(MetaVerification.verify_batch(columns, specification).errors))
+        self.assertTrue(MetaVerification.verify_batch(dict(columns, stop=list(range(5)), step=np.ones(5)),
+                                                      specification).checked_success)
+
+    def test_verify_numpy_scalars(self):
+        specification = (("n", int), ("x", float))
+        columns = dict(n=np.array([1], dtype=np.int64), x=np.array([0.5], dtype=np.float32))
+        metas = [dict(n=np.int64(1), x=np.float32(0.5))]
+        self.assertTrue(verify_batch(columns, specification).checked_success)
+        self.assertTrue(verify_batch(metas, specification).checked_success)
+        self.assertTrue(verify_batch(dict(n=[np.int64(1)], x=[np.float32(0.5)]), specification).checked_success)
+        self.assertTrue(MetaVerification.verify(metas[0], specification).checked_success)
+        self.assertFalse(verify_batch([dict(n=np.float64(1), x=0.5)], specification).checked_success)
+
+    def test_meta_fingerprint(self):
+        example = Example(1, 2.0, [dict(x=1)])
+        self.assertEqual(meta_fingerprint(example), meta_fingerprint(dict(c=[dict(x=1)], b=2.0, a=1)))
+        self.assertEqual(meta_fingerprint(dict(a=1, b=dict(c=2))), meta_fingerprint(dict(b=dict(c=np.int64(2)), a=1)))
+        self.assertEqual(meta_fingerprint(dict(a=dict(x=1))), meta_fingerprint(dict(a=Frozen(1))))
+        self.assertNotEqual(meta_fingerprint(dict(a=1)), meta_fingerprint(dict(a=1.0)))
+        self.assertNotEqual(meta_fingerprint(dict(a=1)), meta_fingerprint(dict(a=True)))
+        self.assertNotEqual(meta_fingerprint(dict(a="1")), meta_fingerprint(dict(a=1)))
+        self.assertNotEqual(meta_fingerprint(dict(a=[1, 2])), meta_fingerprint(dict(a=[[1, 2]])))
+        self.assertEqual(meta_fingerprint({1: 1, "a": 2}), meta_fingerprint({"a": 2, 1: 1}))
+        self.assertNotEqual(meta_fingerprint({1: "a"}), meta_fingerprint({"1": "a"}))
+        self.assertNotEqual(meta_fingerprint({True: 1}), meta_fingerprint({"true": 1}))
+        self.assertNotEqual(meta_fingerprint({True: 1}), meta_fingerprint({1: 1}))
+        self.assertNotEqual(meta_fingerprint(dict(a=(1, 2))), meta_fingerprint(dict(a=[1, 2])))
+        self.assertNotEqual(meta_fingerprint(dict(a=b"1")), meta_fingerprint(dict(a="\0bytes:31")))
+        self.assertNotEqual(meta_fingerprint({"\0tuple": [1]}), meta_fingerprint(dict(a=(1,))["a"]))
+        self.assertEqual(meta_fingerprint({(1, 2): 1}), meta_fingerprint({(1, 2): 1}))
+        self.assertNotEqual(meta_fingerprint(dict(a=np.arange(3))), meta_fingerprint(dict(a=np.arange(4))))
+        with self.assertRaises(TypeError):
+            meta_fingerprint(dict(a=object()))
+
+    def test_meta_fingerprint_memoized(self):
+        frozen = Frozen(1)
+        fingerprint = meta_fingerprint(frozen)
+        self.assertEqual(fingerprint, frozen.__dict__["__stem_fingerprint__"])
+        self.assertEqual(fingerprint, meta_fingerprint(Frozen(1)))
+        with_list = Frozen([1])
+        fingerprint = meta_fingerprint(with_list)
+        with_list.x.append(2) # mutable field value isn't memoized
+        self.assertNotEqual(fingerprint, meta_fingerprint(with_list))
+        meta = dict(a=dict(x=1))
+        view = MetaView(meta)
+        fingerprint = meta_fingerprint(view)
+        meta["a"]["x"] = 2 # nested values of the view are shared with the meta, so it isn't memoized
+        self.assertNotEqual(fingerprint, meta_fingerprint(view))
+
+    def test_meta_view(self):
+        nested = dict(x=1)
+        meta = dict(a=1, sub=nested, example=Example(2))
+        view = MetaView(meta)
+        self.assertEqual(1, view["a"])
+        self.assertEqual(1, view.a)
+        self.assertIs(nested, view["sub"]._base)
+        self.assertIsInstance(view, dict)
+        self.assertEqual('{"a": 1, "example": {"a": 2, "b": 0.0, "c": []}, "sub": {"x": 1}}',
+                         json.dumps(view, sort_keys=True, default=dataclasses.asdict))
+        self.assertIsInstance(dict(view)["sub"], MetaView)
+        for change in [lambda: view.__setitem__("a", 2), lambda: view.pop("a"), lambda: view.setdefault("c", 1)]:
+            with self.assertRaises(TypeError):
+                change()
+        self.assertEqual(2, get_meta_attr(view.slice("example"), "a"))
+        self.assertEqual(0, len(view.slice("absent")))
+        with self.assertRaises(AttributeError):
+            view.a = 2
+
+        updated = update_meta(view, a=2, b=3)
+        self.assertEqual(dict(a=1, sub=dict(x=1), example=Example(2)), meta)
+        self.assertEqual(2, updated["a"])
+        self.assertEqual(["a", "sub", "example", "b"], list(updated))
+        self.assertIs(nested, updated["sub"]._base)
+        self.assertEqual(["a", "example"], list(view.without("sub")))
+        self.assertEqual(meta_fingerprint(meta), meta_fingerprint(view))
+        self.assertEqual(meta_fingerprint(dict(meta, a=2, b=3)), meta_fingerprint(updated))
+        self.assertTrue(MetaVerification.verify(view, (("a", int), ("sub", (("x", int),)))).checked_success)
+
+    def test_update_dict_meta(self):
+        meta = dict(a=0)
+        self.assertIs(meta, update_meta(meta, a=1, b=2))
+        self.assertEqual(dict(a=1, b=2), meta)
@@ -0,0 +1,117 @@
+import itertools
+from unittest import TestCase
+
+import numpy as np
+
+from stem import parallel
+from stem.parallel import parallel_map, tree_reduce, _ChunkSize, MAX_CHUNK_SIZE, TARGET_CHUNK_TIME
+from stem.task import MapTask, ReduceTask
+from tests.example_task import int_range
+
+
+def square(x):
+    return x * x
+
+
+def double(x):
+    return x * 2
+
+
+class ParallelMapTest(TestCase):
+
+    def test_ordered(self):
+        result = list(parallel_map(square, range(1000), workers=2))
+        self.assertEqual([x * x for x in range(1000)], result)
+
+    def test_unbounded(self):
+        squares = parallel_map(square, itertools.count(), workers=2, max_in_flight=2)
+        self.assertEqual([x * x for x in range(100)], list(itertools.islice(squares, 100)))
+        squares.close()
+
+    def test_vectorized(self):
+        chunks = [np.arange(i, i + 10) for i in range(0, 100, 10)]
+        result = list(parallel_map(double, chunks, workers=2, vectorized=True))
+        np.testing.assert_array_equal(np.arange(0, 200, 2), np.concatenate(result))
+
+    def test_unordered(self):
+        result = parallel_map(square, range(1000), workers=2, chunk_size=10, ordered=False)
+        self.assertEqual({x * x for x in range(1000)}, set(result))
+
+    def test_pool_reused(self):
+        list(parallel_map(square, range(10), workers=2))
+        pool = parallel._Pools._pools[2]
+        list(parallel_map(double, range(10), workers=2))
+        self.assertIs(pool, parallel._Pools._pools[2])
+
+    def test_unpicklable(self):
+        offset = 1
+        result = parallel_map(lambda x: x + offset, range(10), workers=2)
+        self.assertEqual(list(range(1, 11)), list(result))
+        chunks = [np.arange(i, i + 10) for i in range(0, 100, 10)]
+        result = parallel_map(lambda x: x * 2, chunks, workers=2, vectorized=True)
+        np.testing.assert_array_equal(np.arange(0, 200, 2), np.concatenate(list(result)))
+
+    def test_chunk_size(self):
+        size = _ChunkSize(None)
+        size.update(elapsed=TARGET_CHUNK_TIME, count=10)
+        self.assertEqual(10, size.size)
+        size.update(elapsed=0.0, count=10)
+        self.assertEqual(20, size.size)
+        size.update(elapsed=0.0, count=10)
+        size.update(elapsed=0.0, count=10)
+        self.assertEqual(80, size.size)
+        size.update(elapsed=0.0, count=10**9)
+        self.assertLessEqual(size.size, MAX_CHUNK_SIZE)
+
+        size = _ChunkSize(100)
+        size.update(elapsed=1.0, count=1)
+        self.assertEqual(100, size.size)
+
+    def test_map_task(self):
+        task = MapTask(lambda x: x * 10, int_range, parallelism=2)
+        self.assertEqual(list(range(0, 100, 10)), list(task.transform({}, int_range=int_range.data({}))))
+
+        task = MapTask(lambda x: x * 10, int_range, vectorized=True, chunk_size=3, concatenate=True, parallelism=2)
+        np.testing.assert_array_equal(np.arange(0, 100, 10), task.transform({}, int_range=np.arange(10)))
+
+
+class TreeReduceTest(TestCase):
+
+    def test_tree_reduce(self):
+        for n in [1, 2, 3, 7, 8, 100]:
+            with self.subTest(n):
+                letters = [chr(ord("a") + i % 26) for i in range(n)]
+                self.assertEqual("".join(letters), tree_reduce(lambda a, b: a + b, letters))
+        self.assertEqual(0, tree_reduce(lambda a, b: a + b, [], 0))
+        with self.assertRaises(TypeError):
+            tree_reduce(lambda a, b: a + b, [])
+
+    def test_associative_reduce_task(self):
+        for parallelism in [1, 2]:
+            with self.subTest(parallelism):
+                task = ReduceTask(lambda a, b: a + b, int_range, associative=True, chunk_size=3,
+                                  parallelism=parallelism)
+                self.assertEqual(45, task.transform({}, int_range=int_range.data({})))
+
+                task = ReduceTask(lambda a, b: a + b, int_range, associative=True, commutative=True,
+                                  chunk_size=3, parallelism=parallelism)
+                self.assertEqual(45, task.transform({}, int_range=range(10)))
+
+    def test_initial(self):
+        for parallelism in [1, 2]:
+            with self.subTest(parallelism):
+                task = ReduceTask(lambda a, b: a + b, int_range, associative=True, initial=10, chunk_size=3,
+                                  parallelism=parallelism)
+                self.assertEqual(55, task.transform({}, int_range=range(10)))
+                self.assertEqual(10, task.transform({}, int_range=range(0)))
+                task = ReduceTask(lambda a, b: a + b, int_range, associative=True, initial="^", chunk_size=3,
+                                  parallelism=parallelism)
+                self.assertEqual("^abcdefg", task.transform({}, int_range="abcdefg"))
+
+    def test_combiner(self):
+        mean = ReduceTask(lambda s, x: (s[0] + x, s[1] + 1), int_range, associative=True, identity=(0, 0),
+                          combiner=lambda a, b: (a[0] + b[0], a[1] + b[1]), chunk_size=4, parallelism=2)
+        self.assertEqual((45, 10), mean.transform({}, int_range=range(10)))
+        self.assertEqual((0, 0), mean.transform({}, int_range=range(0)))
+        mean.initial = (100, 1)
+        self.assertEqual((145, 11), mean.transform({}, int_range=range(10)))
@@ -0,0 +1,79 @@
+import json
+import sys
+import tempfile
+from pathlib import Path
+from importlib.metadata import EntryPoint
+from unittest import TestCase
+from unittest.mock import patch
+
+from stem.plugins import LazyWorkspace, PluginWorkspace, load_manifest, discover
+from stem.task_master import TaskMaster
+
+PLUGIN = '''
+from stem.meta import Meta
+from stem.task import data, task
+
+
+@data
+def {prefix}_source(meta: Meta) -> int:
+    return {value}
+
+
+@task
+def {prefix}_double(meta: Meta, {prefix}_source: int) -> int:
+    return 2 * {prefix}_source
+'''
+
+
+class PluginsTest(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        path = Path(self.directory.name)
+        for prefix, value in [("first", 1), ("second", 2)]:
+            (path / f"stem_test_plugin_{prefix}.py").write_text(PLUGIN.format(prefix=prefix, value=value))
+        sys.path.insert(0, self.directory.name)
+        self.manifest = path / "plugins.json"
+        self.manifest.write_text(json.dumps(dict(name="plugins", workspaces=[
+            dict(name=prefix, module=f"stem_test_plugin_{prefix}",
+                 tasks=[f"{prefix}_source", f"{prefix}_double"]) for prefix in ["first", "second"]])))
+
+    def tearDown(self) -> None:
+        sys.path.remove(self.directory.name)
+        for prefix in ["first", "second"]:
+            sys.modules.pop(f"stem_test_plugin_{prefix}", None)
+        self.directory.cleanup()
+
+    def test_structure_without_import(self):
+        workspace = load_manifest(self.manifest)
+        structure = workspace.structure()
+        self.assertEqual(["first", "second"], [sub["name"] for sub in structure["workspaces"]])
+        self.assertEqual(["first_source", "first_double"], structure["workspaces"][0]["tasks"])
+        self.assertNotIn("stem_test_plugin_first", sys.modules)
+
+    def test_lazy_resolve(self):
+        workspace = load_manifest(self.manifest)
+        task = workspace.find_task("second_double")
+        self.assertEqual("second_double", task.name)
+        self.assertIn("stem_test_plugin_second", sys.modules)
+        self.assertNotIn("stem_test_plugin_first", sys.modules)
+        self.assertIsNone(workspace.find_task("absent"))
+        self.assertNotIn("stem_test_plugin_first", sys.modules)
+        self.assertEqual(4, TaskMaster().execute({}, task, workspace).data)
+        self.assertIs(task, workspace.find_task("second.second_double"))
+
+    def test_undeclared_tasks(self):
+        workspace = PluginWorkspace("plugins", [LazyWorkspace("first", "stem_test_plugin_first")])
+        self.assertEqual("first_source", workspace.find_task("first_source").name)
+        self.assertIn("first_double", workspace.structure()["workspaces"][0]["tasks"])
+
+    def test_entry_point_tasks(self):
+        points = {"stem.workspaces": [EntryPoint(prefix, f"stem_test_plugin_{prefix}", "stem.workspaces")
+                                      for prefix in ["first", "second"]],
+                  "stem.workspaces.tasks": [EntryPoint(f"{prefix}_{name}", prefix, "stem.workspaces.tasks")
+                                            for prefix in ["first", "second"] for name in ["source", "double"]]}
+        with patch("stem.plugins.entry_points", lambda group: points[group]):
+            workspace = discover()
+        self.assertEqual(["second_source", "second_double"], workspace.structure()["workspaces"][1]["tasks"])
+        self.assertEqual("second_double", workspace.find_task("second_double").name)
+        self.assertNotIn("stem_test_plugin_first", sys.modules)
@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from stem.plugins import LazyWorkspace, PluginWorkspace
+from stem.snapshot import StructureSnapshot, SnapshotCache, describe_specification
+from stem.workspace import IWorkspace, LocalWorkspace
+from tests.example_task import int_range, int_scale
+
+MODULE = '''
+from stem.meta import Meta
+from stem.task import data
+
+
+@data
+def {name}(meta: Meta) -> int:
+    return 1
+'''
+
+
+class StructureSnapshotTest(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = SnapshotCache(Path(self.directory.name) / "cache")
+        self.module = Path(self.directory.name) / "stem_test_snapshot_module.py"
+        self.module.write_text(MODULE.format(name="first"))
+        sys.path.insert(0, self.directory.name)
+        self.loads = 0
+
+    def tearDown(self) -> None:
+        sys.path.remove(self.directory.name)
+        sys.modules.pop("stem_test_snapshot_module", None)
+        self.directory.cleanup()
+
+    def load(self) -> IWorkspace:
+        self.loads += 1
+        sys.modules.pop("stem_test_snapshot_module", None)
+        from importlib import import_module
+        return IWorkspace.module_workspace(import_module("stem_test_snapshot_module"))
+
+    def test_structure(self):
+        workspace = LocalWorkspace("root", dict(int_scale=int_scale), [LocalWorkspace("sub", dict(int_range=int_range))])
+        snapshot = StructureSnapshot.of(workspace)
+        self.assertEqual(["int_range", "data_scale"], snapshot.structure["tasks"]["int_scale"]["dependencies"])
+        self.assertEqual(["int_range"], list(snapshot.structure["workspaces"][0]["tasks"]))
+        self.assertEqual(snapshot.hash, StructureSnapshot.of(workspace).hash)
+        self.assertEqual(snapshot, StructureSnapshot.from_json(snapshot.to_json()))
+        self.assertTrue(snapshot.is_current)
+
+    def test_specification(self):
+        self.assertEqual({"start": "int", "step": ["int", "float"], "nested": {"a": "str"}},
+                         describe_specification((("start", int), ("step", (int, float)), ("nested", (("a", str),)))))
+
+    def test_cache(self):
+        first = self.cache.snapshot("module", self.load)
+        second = self.cache.snapshot("module", self.load)
+        self.assertEqual(1, self.loads)
+        self.assertEqual(first.hash, second.hash)
+        self.assertEqual(["first"], list(second.structure["tasks"]))
+
+        self.module.write_text(MODULE.format(name="second_task"))
+        stat = self.module.stat()
+        os.utime(self.module, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        third = self.cache.snapshot("module", self.load)
+        self.assertEqual(2, self.loads)
+        self.assertNotEqual(first.hash, third.hash)
+        self.assertEqual(["second_task"], list(third.structure["tasks"]))
+
+    def test_plugins_not_imported(self):
+        plugins = PluginWorkspace("plugins", [LazyWorkspace("declared", "stem_test_snapshot_module", None, ["first"])])
+        snapshot = StructureSnapshot.of(plugins)
+        self.assertNotIn("stem_test_snapshot_module", sys.modules)
+        self.assertEqual({"first": {"dependencies": None, "specification": None}},
+                         snapshot.structure["workspaces"][0]["tasks"])
@@ -0,0 +1,38 @@
+import time
+from unittest import TestCase
+
+from stem.stream import Stream, chunked
+
+
+class StreamTest(TestCase):
+
+    def test_chunked(self):
+        self.assertEqual([[0, 1, 2], [3, 4, 5], [6]], list(chunked(range(7), 3)))
+
+    def test_stream(self):
+        self.assertEqual(list(range(1000)), list(Stream(range(1000), maxsize=2, chunk_size=7)))
+        self.assertEqual([], list(Stream(iter(()))))
+
+    def test_error(self):
+        def source():
+            yield 1
+            raise ValueError("source")
+
+        stream = Stream(source())
+        with self.assertRaises(ValueError):
+            list(stream)
+
+    def test_backpressure(self):
+        produced = []
+
+        def source():
+            for i in range(1000):
+                produced.append(i)
+                yield i
+
+        stream = Stream(source(), maxsize=2, chunk_size=10)
+        self.assertEqual(0, next(stream))
+        time.sleep(0.2)
+        # chunk in the consumer, two chunks in the queue and one chunk blocked on put
+        self.assertLessEqual(len(produced), 40)
+        stream.close()
@@ -1,8 +1,11 @@
 from functools import reduce
 from unittest import TestCase
 
+import numpy as np
+
 from stem.task import Task, MapTask, FilterTask, ReduceTask
-from tests.example_task import IntRange, int_range, int_scale, data_scale
+from stem.task_master import TaskMaster
+from tests.example_task import IntRange, int_range, int_scale, data_scale, float_range
 
 
 class TaskTest(TestCase):
@@ -44,4 +47,37 @@ class TaskTest(TestCase):
         task = ReduceTask(lambda acc, x: acc + x, int_range)
         self.assertEqual(task.name, "reduce_int_range")
         self.assertEqual(reduce(lambda acc, x: acc + x, range(0, 10, 1)),
-                         task.transform({}, int_range=int_range.data({})))
\ No newline at end of file
+                         task.transform({}, int_range=int_range.data({})))
+
+    def test_vectorized_map_task(self):
+        task = MapTask(lambda x: x * 10, int_range, vectorized=True, chunk_size=4)
+        chunks = list(task.transform({}, int_range=int_range.data({})))
+        self.assertEqual([4, 4, 2], [len(chunk) for chunk in chunks])
+        np.testing.assert_array_equal(np.arange(0, 100, 10), np.concatenate(chunks))
+
+        task = MapTask(lambda x: x * 10, int_range, vectorized=True, chunk_size=4, concatenate=True)
+        np.testing.assert_array_equal(np.arange(0, 100, 10), task.transform({}, int_range=np.arange(10)))
+
+    def test_vectorized_filter_task(self):
+        task = FilterTask(lambda x: x % 2 == 0, int_range, vectorized=True, chunk_size=3, concatenate=True)
+        np.testing.assert_array_equal(np.arange(0, 10, 2), task.transform({}, int_range=int_range.data({})))
+
+    def test_vectorized_dtype(self):
+        task = MapTask(lambda x: x * 2, int_range, vectorized=True, chunk_size=3, concatenate=True)
+        result = task.transform({}, int_range=iter([1, 2.5, 3.75]))
+        self.assertEqual(np.float64, result.dtype)
+        np.testing.assert_array_equal([2, 5, 7.5], result)
+        with self.assertRaises(TypeError):
+            task.transform({}, int_range=iter([1, 2, 3, 4.5]))
+        with self.assertRaises(TypeError):
+            task.transform({}, int_range=iter([1, "2"]))
+
+        task = FilterTask(lambda x: x > 5, int_range, vectorized=True, concatenate=True)
+        self.assertEqual(np.int8, task.transform({}, int_range=np.empty(0, np.int8)).dtype)
+
+    def test_vectorized_chain(self):
+        scale = MapTask(lambda x: x * 10, float_range, vectorized=True, chunk_size=3)
+        positive = FilterTask(lambda x: x > 5, scale, vectorized=True, concatenate=True)
+        result = TaskMaster().execute({}, positive).data
+        expected = np.arange(0, 1, 0.1, dtype="f") * 10
+        np.testing.assert_array_equal(expected[expected > 5], result)
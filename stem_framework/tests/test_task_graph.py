@@ -0,0 +1,140 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterator
+from unittest import TestCase
+
+from stem.meta import Meta, MetaView, update_meta
+from stem.task import data, task
+from stem.task_graph import TaskGraph, CyclicDependencyError
+from stem.task_master import TaskMaster, TaskStatus
+from stem.task_runner import SimpleRunner, ThreadingRunner, ProcessingRunner
+from stem.task_tree import TaskNode
+from stem.workspace import LocalWorkspace
+
+calls = Counter()
+
+
+@data
+def source(meta: Meta) -> Iterator[int]:
+    calls["source"] += 1
+    return iter(range(10))
+
+
+@task
+def left(meta: Meta, source: Iterator[int]) -> int:
+    calls["left"] += 1
+    return sum(source)
+
+
+@task
+def right(meta: Meta, source: Iterator[int]) -> int:
+    calls["right"] += 1
+    return max(source)
+
+
+@task
+def top(meta: Meta, left: int, right: int) -> int:
+    calls["top"] += 1
+    return left + right
+
+
+@task
+def ping(meta: Meta, pong: int) -> int:
+    return pong
+
+
+@task
+def pong(meta: Meta, ping: int) -> int:
+    return ping
+
+
+@dataclass
+class Sides:
+    left: dict = field(default_factory=dict)
+    right: dict = field(default_factory=dict)
+
+
+diamond = LocalWorkspace("diamond", dict(source=source, left=left, right=right, top=top))
+
+
+class TaskGraphTest(TestCase):
+
+    def setUp(self) -> None:
+        calls.clear()
+
+    def test_deduplication(self):
+        graph = TaskGraph(TaskNode(top, diamond), {})
+        self.assertEqual(4, len(graph))
+        self.assertEqual("source", graph.order[0].name)
+        self.assertIs(graph.root, graph.order[-1])
+        self.assertEqual([["source"], ["left", "right"], ["top"]],
+                         [sorted(node.name for node in level) for level in graph.levels()])
+
+    def test_diamond_invoked_once(self):
+        for runner in [SimpleRunner(), ThreadingRunner(), ProcessingRunner()]:
+            with self.subTest(runner.__class__.__name__):
+                calls.clear()
+                result = TaskMaster(runner).execute({}, top, diamond)
+                self.assertEqual(45 + 9, result.data)
+                self.assertEqual(Counter(source=1, left=1, right=1, top=1), calls)
+
+    def test_cycle(self):
+        workspace = LocalWorkspace("cycle", dict(ping=ping, pong=pong))
+        with self.assertRaises(CyclicDependencyError):
+            TaskGraph(TaskNode(ping, workspace), {})
+
+    def test_cycle_is_dependencies_error(self):
+        workspace = LocalWorkspace("cycle", dict(ping=ping, pong=pong))
+        self.assertEqual(TaskStatus.DEPENDENCIES_ERROR, TaskMaster().execute({}, ping, workspace).status)
+
+
+class CompiledGraphTest(TestCase):
+
+    def test_topological_ids(self):
+        compiled = TaskNode(top, diamond).compiled
+        self.assertEqual(["source", "left", "right", "top"], [task.name for task in compiled.tasks])
+        self.assertEqual(3, compiled.root)
+        self.assertEqual([1, 2], list(compiled.dependencies(3)))
+        self.assertEqual([1, 2], list(compiled.consumers(0)))
+        self.assertEqual([], list(compiled.dependencies(0)))
+        self.assertFalse(compiled.has_errors)
+
+    def test_errors(self):
+        workspace = LocalWorkspace("broken", dict(ping=ping, pong=pong, left=left))
+        compiled = TaskNode(left, workspace).compiled
+        self.assertEqual((("left", "source"),), compiled.unresolved)
+        compiled = TaskNode(ping, workspace).compiled
+        self.assertEqual((("ping", "pong", "ping"),), compiled.cycles)
+        self.assertTrue(compiled.has_errors)
+
+    def test_meta_slices(self):
+        meta = dict(left=dict(source=dict(n=1)), right={})
+        graph = TaskGraph(TaskNode(top, diamond), meta)
+        nodes = {node.name: node for node in graph}
+        # tasks receive immutable views which share values of the meta
+        self.assertIsInstance(graph.root.meta, MetaView)
+        self.assertEqual(meta, graph.root.meta)
+        self.assertIs(meta["left"], nodes["left"].meta._base)
+        self.assertIs(meta["left"]["source"], dict.get(nodes["left"].meta, "source"))
+        # different slices of source are different nodes
+        self.assertEqual(5, len(graph))
+        self.assertCountEqual([{}, dict(n=1)], [node.meta for node in graph if node.name == "source"])
+
+    def test_immutable_meta(self):
+        @task
+        def updating(meta: Meta, left: int) -> int:
+            with self.assertRaises(TypeError):
+                meta["left"] = {}
+            return update_meta(meta, scale=2).scale * left
+
+        meta = dict(left=dict(source=dict(n=1)))
+        workspace = LocalWorkspace("updating", dict(source=source, left=left, updating=updating))
+        self.assertEqual(90, TaskMaster(ThreadingRunner()).execute(meta, updating, workspace).data)
+        self.assertEqual(dict(left=dict(source=dict(n=1))), meta)
+
+    def test_dataclass_meta(self):
+        meta = Sides(left=dict(source=dict(n=1)))
+        graph = TaskGraph(TaskNode(top, diamond), meta)
+        self.assertIs(meta, graph.root.meta._base)
+        self.assertEqual(meta.left, {node.name: node for node in graph}["left"].meta)
+        self.assertCountEqual([{}, dict(n=1)], [node.meta for node in graph if node.name == "source"])
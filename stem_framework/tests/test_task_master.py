@@ -1,9 +1,39 @@
+from collections import Counter
 from unittest import TestCase
 
-from stem.task_master import TaskMaster
-from stem.task_runner import SimpleRunner
+from stem.meta import Meta, get_meta_attr
+from stem.task import data, task
+from stem.task_graph import TaskGraph
+from stem.task_master import TaskMaster, TaskStatus
+from stem.task_runner import SimpleRunner, ThreadingRunner, AsyncRunner
+from stem.task_tree import TaskNode
+from stem.workspace import LocalWorkspace
 from tests.example_task import int_scale
 
+calls = Counter()
+
+
+@data
+def numbers(meta: Meta) -> list[int]:
+    calls["numbers"] += 1
+    return list(range(get_meta_attr(meta, "stop", 10)))
+
+
+@data
+def scale(meta: Meta) -> int:
+    calls["scale"] += 1
+    return get_meta_attr(meta, "factor", 2)
+
+
+@task
+def scaled_sum(meta: Meta, numbers: list[int], scale: int) -> int:
+    calls["scaled_sum"] += 1
+    return scale * sum(numbers)
+
+
+scaled_sum.specification = (("scale", (("factor", int),)),)
+workspace = LocalWorkspace("sweep", dict(numbers=numbers, scale=scale, scaled_sum=scaled_sum))
+
 
 class SimpleRunnerTest(TestCase):
 
@@ -14,4 +44,40 @@ class SimpleRunnerTest(TestCase):
         task_master = TaskMaster(self.runner)
         result = task_master.execute({}, int_scale)
         for i, r in zip(range(0, 100, 10), result.lazy_data()):
-            self.assertEqual(i, r)
\ No newline at end of file
+            self.assertEqual(i, r)
+
+
+class SweepTest(TestCase):
+
+    def setUp(self) -> None:
+        calls.clear()
+
+    def test_shared_subcomputations(self):
+        metas = [dict(scale=dict(factor=factor)) for factor in [1, 2, 3, 2]]
+        for runner in [SimpleRunner(), ThreadingRunner(), AsyncRunner()]:
+            with self.subTest(runner.__class__.__name__):
+                calls.clear()
+                result = TaskMaster(runner).sweep(metas, scaled_sum, workspace)
+                self.assertEqual(TaskStatus.CONTAINS_DATA, result.status)
+                self.assertEqual([45, 90, 135, 90], result.data)
+                # numbers is computed once, equal metas are computed once
+                self.assertEqual(Counter(numbers=1, scale=3, scaled_sum=3), calls)
+                self.assertEqual(7, result.nodes)
+                self.assertEqual(12, result.separate_nodes)
+                self.assertEqual(5, result.saved_nodes)
+
+    def test_empty(self):
+        result = TaskMaster().sweep([], scaled_sum, workspace)
+        self.assertEqual(TaskStatus.CONTAINS_DATA, result.status)
+        self.assertEqual([], result.data)
+        self.assertEqual(0, result.saved_nodes)
+        self.assertEqual(Counter(), calls)
+        with self.assertRaises(ValueError):
+            TaskGraph.sweep(TaskNode(scaled_sum, workspace), [])
+
+    def test_meta_errors(self):
+        metas = [dict(scale=dict(factor=1)), dict(scale=dict(factor="2")), {}]
+        result = TaskMaster().sweep(metas, scaled_sum, workspace)
+        self.assertEqual(TaskStatus.META_ERROR, result.status)
+        self.assertEqual([1, 2], list(result.meta_errors.errors))
+        self.assertEqual(Counter(), calls)
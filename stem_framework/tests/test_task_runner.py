@@ -1,10 +1,113 @@
-from unittest import TestCase
+import asyncio
+import itertools
+import os
+import time
+from typing import Iterator
+from unittest import TestCase, IsolatedAsyncioTestCase
+from unittest.mock import patch
 
+import numpy as np
+
+from stem.cache import MemoryCache
+from stem.meta import Meta
+from stem.shared import share, unshare, SharedValue, SharedBlocks
+from stem.task import data, task, FunctionTask
 from stem.task_master import TaskMaster
-from stem.task_runner import SimpleRunner, TaskRunner, ThreadingRunner, AsyncRunner, ProcessingRunner
+from stem.task_runner import SimpleRunner, TaskRunner, ThreadingRunner, AsyncRunner, ProcessingRunner, StreamingRunner
+from stem.workspace import IWorkspace, LocalWorkspace
 from tests.example_task import int_scale
 
 
+@data
+def process_id(meta: Meta) -> int:
+    return os.getpid()
+
+
+@data
+def large_array(meta: Meta) -> np.ndarray:
+    return np.arange(1 << 20, dtype="f8")
+
+
+@task
+def array_info(meta: Meta, large_array: np.ndarray, process_id: int) -> tuple:
+    return large_array, process_id, os.getpid()
+
+
+@task
+def array_sum(meta: Meta, large_array: np.ndarray) -> float:
+    return float(large_array.sum())
+
+
+@task
+def array_max(meta: Meta, large_array: np.ndarray) -> float:
+    return float(large_array.max())
+
+
+@task
+def array_stats(meta: Meta, array_sum: float, array_max: float) -> tuple:
+    return array_sum, array_max
+
+
+@data
+def naturals(meta: Meta) -> Iterator[int]:
+    return itertools.count()
+
+
+@task
+def first_ten(meta: Meta, naturals: Iterator[int]) -> list:
+    return list(itertools.islice(naturals, 10))
+
+
+@data
+async def slow_left(meta: Meta) -> int:
+    await asyncio.sleep(0.2)
+    return 1
+
+
+@data
+async def slow_right(meta: Meta) -> int:
+    await asyncio.sleep(0.2)
+    return 2
+
+
+@data
+def blocking_left(meta: Meta) -> int:
+    time.sleep(0.2)
+    return 3
+
+
+@data
+def blocking_right(meta: Meta) -> int:
+    time.sleep(0.2)
+    return 4
+
+
+@task
+async def slow_sum(meta: Meta, slow_left: int, slow_right: int, blocking_left: int, blocking_right: int) -> int:
+    return slow_left + slow_right + blocking_left + blocking_right
+
+
+@data
+def slow_source(meta: Meta) -> Iterator[int]:
+    for i in range(20):
+        time.sleep(0.01)
+        yield i
+
+
+@task
+def slow_stage(meta: Meta, slow_source: Iterator[int]) -> Iterator[int]:
+    for i in slow_source:
+        time.sleep(0.01)
+        yield 2 * i
+
+
+@task
+def slow_sink(meta: Meta, slow_stage: Iterator[int]) -> Iterator[int]:
+    for i in slow_stage:
+        time.sleep(0.01)
+        yield i + 1
+
+
 class RunnerTest(TestCase):
 
     def _run(self, runner: TaskRunner):
@@ -27,4 +130,127 @@ class RunnerTest(TestCase):
 
     def test_process(self):
         runner = ProcessingRunner()
-        self._run(runner)
\ No newline at end of file
+        self._run(runner)
+
+    def test_streaming(self):
+        runner = StreamingRunner()
+        self._run(runner)
+
+
+class ThreadingRunnerTest(TestCase):
+
+    def setUp(self) -> None:
+        self.order = []
+
+    def _node(self, name: str, *dependencies: str) -> FunctionTask:
+        def func(meta, **kwargs):
+            self.order.append(name)
+            return 1 + sum(kwargs.values())
+        return FunctionTask(name, func, dependencies)
+
+    def test_deep_tree_single_worker(self):
+        tasks = {"n0": self._node("n0")}
+        for i in range(1, 50):
+            tasks[f"n{i}"] = self._node(f"n{i}", f"n{i - 1}")
+        runner = ThreadingRunner()
+        runner.MAX_WORKERS = 1
+        result = TaskMaster(runner).execute({}, tasks["n49"], LocalWorkspace("chain", tasks)).data
+        self.assertEqual(50, result)
+        self.assertEqual(1, runner.statistics.workers)
+        self.assertEqual(50, runner.statistics.nodes)
+
+    def test_queue_depth(self):
+        tasks = {f"leaf{i}": self._node(f"leaf{i}") for i in range(10)}
+        tasks["root"] = self._node("root", *tasks)
+        runner = ThreadingRunner()
+        runner.MAX_WORKERS = 2
+        result = TaskMaster(runner).execute({}, tasks["root"], LocalWorkspace("fan", tasks)).data
+        self.assertEqual(11, result)
+        self.assertEqual(2, runner.statistics.max_running)
+        self.assertEqual(8, runner.statistics.max_queue_depth)
+
+    def test_critical_path_first(self):
+        tasks = dict(short=self._node("short"), a=self._node("a"))
+        tasks["b"] = self._node("b", "a")
+        tasks["root"] = self._node("root", "short", "b")
+        runner = ThreadingRunner()
+        runner.MAX_WORKERS = 1
+        TaskMaster(runner).execute({}, tasks["root"], LocalWorkspace("paths", tasks)).data
+        self.assertEqual(["a", "short", "b", "root"], self.order)
+
+
+class StreamingRunnerTest(TestCase):
+
+    def test_pipeline(self):
+        start = time.perf_counter()
+        result = list(TaskMaster(StreamingRunner(chunk_size=1)).execute({}, slow_sink).data)
+        elapsed = time.perf_counter() - start
+        self.assertEqual([2 * i + 1 for i in range(20)], result)
+        # stages overlap: 0.6 s sequentially
+        self.assertLess(elapsed, 0.45)
+
+    def test_cache(self):
+        cache = MemoryCache()
+        master = TaskMaster(StreamingRunner(), cache=cache)
+        # infinite stage isn't materialized by the cache
+        self.assertEqual(list(range(10)), master.execute({}, first_ten).data)
+        self.assertEqual(1, len(cache))
+        self.assertEqual(list(range(10)), master.execute({}, first_ten).data)
+        self.assertEqual(1, cache.hits)
+
+
+class AsyncRunnerTest(IsolatedAsyncioTestCase):
+
+    async def test_concurrent_branches(self):
+        start = time.perf_counter()
+        result = await TaskMaster(AsyncRunner()).execute_async({}, slow_sum)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(10, result.data)
+        self.assertLess(elapsed, 0.5)
+
+    async def test_sync_runner(self):
+        result = await TaskMaster(SimpleRunner()).execute_async({}, slow_sum)
+        self.assertEqual(10, result.data)
+
+
+class ProcessingRunnerTest(TestCase):
+
+    def test_processes(self):
+        workspace = IWorkspace.find_default_workspace(array_info)
+        result = TaskMaster(ProcessingRunner()).execute({}, array_info, workspace).data
+        array, source_pid, pid = result
+        self.assertNotEqual(os.getpid(), source_pid)
+        self.assertNotEqual(os.getpid(), pid)
+        np.testing.assert_array_equal(np.arange(1 << 20, dtype="f8"), array)
+
+    def test_shared_inputs(self):
+        blocks = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+        workspace = IWorkspace.find_default_workspace(array_stats)
+        with patch.object(SharedBlocks, "share", autospec=True, side_effect=SharedBlocks.share) as shared:
+            result = TaskMaster(ProcessingRunner()).execute({}, array_stats, workspace).data
+        # large_array is shared once for both consumers, results of array_sum and array_max are sent as is
+        self.assertEqual(3, shared.call_count)
+        n = 1 << 20
+        self.assertEqual((n * (n - 1) / 2, n - 1), result)
+        # the input shared with two consumers is unlinked after the graph
+        if os.path.isdir("/dev/shm"):
+            self.assertEqual(blocks, set(os.listdir("/dev/shm")))
+
+    def test_shared_memory(self):
+        array = np.arange(1000, dtype="i4").reshape(10, 100)
+        shared = share(array, threshold=0)
+        self.assertIsInstance(shared, SharedValue)
+        np.testing.assert_array_equal(array, unshare(shared, unlink=True))
+
+        shared = share(b"0123456789", threshold=0)
+        self.assertEqual(b"0123456789", unshare(shared, unlink=True))
+        self.assertEqual(b"0", share(b"0"))
+
+    def test_shared_blocks(self):
+        with SharedBlocks(threshold=0) as blocks:
+            shared = blocks.share(b"0123456789")
+            # receivers don't unlink blocks of the owner
+            self.assertEqual(b"0123456789", unshare(shared))
+            self.assertEqual(b"0123456789", unshare(shared))
+        with self.assertRaises(FileNotFoundError):
+            unshare(shared)
@@ -1,7 +1,10 @@
 from unittest import TestCase
 
 
+from stem.meta import Meta
+from stem.task import data, task
 from stem.task_tree import TaskTree
+from stem.workspace import LocalWorkspace
 from .example_task import int_range, int_scale
 
 
@@ -10,4 +13,37 @@ class TaskTreeTest(TestCase):
         self.task_node = TaskTree.build_node(int_scale)
 
     def test_task_tree(self):
-        self.assertEqual(self.task_node.dependencies[0].task, int_range)
\ No newline at end of file
+        self.assertEqual(self.task_node.dependencies[0].task, int_range)
+
+    def test_index(self):
+        tree = TaskTree(int_scale)
+        node = tree.find_task(int_range)
+        self.assertEqual(int_range, node.task)
+        self.assertIs(node, tree.resolve_node(int_range))
+        self.assertIs(tree.root, tree.resolve_node(int_scale))
+
+    def test_incremental(self):
+        tree = TaskTree()
+        self.assertIsNone(tree.find_task(int_range))
+        node = tree.resolve_node(int_scale)
+        self.assertIs(node, tree.resolve_node(int_scale))
+        self.assertIs(node.compiled, tree.resolve_node(int_scale).compiled)
+        self.assertEqual(int_range, tree.find_task(int_range).task)
+
+    def test_invalidation(self):
+        @task
+        def consumer(meta: Meta, source: int) -> int:
+            return source
+
+        @data
+        def source(meta: Meta) -> int:
+            return 1
+
+        workspace = LocalWorkspace("workspace", {"consumer": consumer})
+        node = TaskTree(consumer, workspace).root
+        self.assertEqual((("consumer", "source"),), node.compiled.unresolved)
+        compiled = node.compiled
+        self.assertIs(compiled, node.compiled)
+        workspace.add_task("source", source)
+        self.assertFalse(node.compiled.has_errors)
+        self.assertEqual((source, consumer), node.compiled.tasks)
@@ -1,3 +1,4 @@
+from copy import copy
 from unittest import TestCase
 
 from stem.workspace import Workspace, IWorkspace, ProxyTask, LocalWorkspace
@@ -64,4 +65,36 @@ class WorkspaceTest(TestCase):
                                'workspaces': [{'name': 'SubSubWorkspace',
                                                'tasks': ['sub_sub_int_range'],
                                                'workspaces': []}]}]}
-        self.assertDictEqual(ref, IntWorkspace.structure())
\ No newline at end of file
+        self.assertDictEqual(ref, IntWorkspace.structure())
+
+
+class WorkspaceIndexTest(TestCase):
+
+    def setUp(self) -> None:
+        self.leaf = LocalWorkspace("leaf", dict(int_range=int_range))
+        self.middle = LocalWorkspace("middle", {}, [self.leaf])
+        self.root = LocalWorkspace("root", {}, [self.middle])
+
+    def test_find_task(self):
+        self.assertIs(int_range, self.root.find_task("middle.leaf.int_range"))
+        self.assertIs(int_range, self.root.find_task("int_range"))
+        self.assertIs(int_range, self.root.find_task("middle.int_range"))
+        self.assertIsNone(self.root.find_task("leaf.int_range"))
+        self.assertIsNone(self.root.find_task("absent"))
+        self.assertIs(self.middle, self.root.get_workspace("middle"))
+
+    def test_invalidation(self):
+        self.assertIsNone(self.root.find_task("other"))
+        self.leaf.add_task("other", int_range)
+        self.assertIs(int_range, self.root.find_task("middle.leaf.other"))
+        self.root.add_workspace(LocalWorkspace("added", dict(added_range=int_range)))
+        self.assertIs(int_range, self.root.find_task("added.added_range"))
+        self.assertIs(int_range, self.root.find_task("added_range"))
+
+    def test_inherited_index(self):
+        self.assertIs(int_range, self.root.find_task("int_range"))
+        other = copy(self.root) # shares the index of the root as a subclass of the class-workspace
+        other._workspaces = [LocalWorkspace("other", dict(other_range=int_range))]
+        self.assertIsNone(other.find_task("int_range"))
+        self.assertIs(int_range, other.find_task("other.other_range"))
+        self.assertIs(int_range, self.root.find_task("middle.leaf.int_range"))